@@ -2,19 +2,34 @@ import streamlit as st
 import sqlite3
 from pathlib import Path
 import pandas as pd
+import numpy as np
 import datetime
 import shutil
-from io import BytesIO
+import zipfile
+import csv
+from io import BytesIO, StringIO
 import hashlib
+import base64
 import json
 import os
 import plotly.express as px
 import plotly.graph_objects as go
 from PIL import Image
-import fitz  # PyMuPDF
+from PIL import features as PIL_features
 import re
+import string
 from difflib import SequenceMatcher
 import time
+import threading
+import gc
+import atexit
+import queue
+import tempfile
+from contextlib import contextmanager
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from packaging.version import parse as parse_version
+import pdf_worker
 
 # --- Solusi: Atur st.set_page_config() hanya sekali di awal skrip ---
 # Gunakan logika kondisional untuk menentukan layout berdasarkan status login
@@ -402,16 +417,216 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Database helpers ---
+DB_POOL_SIZE = 16          # Jumlah maksimum koneksi yang dipinjam bersamaan (di luar nested)
+DB_POOL_TIMEOUT = 30.0     # Detik menunggu koneksi bebas sebelum menyerah
+DB_BUSY_TIMEOUT = 5.0      # Detik SQLite menunggu lock dilepas oleh writer lain
+
+def _sql_py_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Koneksi SQLite milik pool. close() tidak menutup koneksi fisik,
+    melainkan mengembalikannya ke pool sehingga pola lama
+    `conn = get_conn() ... conn.close()` tetap berlaku tanpa perubahan.
+    """
+    _pool = None
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        else:
+            self._pool.release(self)
+
+    def close_physical(self):
+        super().close()
+
+    def after_commit(self, callback):
+        """Jalankan `callback` setelah commit() berikutnya berhasil; dibuang bila transaksi di-rollback."""
+        self.__dict__.setdefault('_after_commit', []).append(callback)
+
+    def discard_after_commit(self):
+        self.__dict__.pop('_after_commit', None)
+
+    def commit(self):
+        super().commit()
+        for callback in self.__dict__.pop('_after_commit', None) or ():
+            callback()
+
+    def rollback(self):
+        self.discard_after_commit()
+        super().rollback()
+
+class SQLiteConnectionPool:
+    """
+    Pool koneksi SQLite per-proses.
+
+    - Pragma (WAL, synchronous, cache) diterapkan sekali saat koneksi dibuat.
+    - Koneksi yang sedang dipinjam terikat ke satu thread (thread script Streamlit);
+      koneksi idle boleh dipakai ulang oleh thread lain.
+    - Peminjaman nested dari thread yang sudah memegang koneksi tidak pernah
+      menunggu (overflow) agar tidak terjadi self-deadlock.
+    - Counter opens/reuse/wait tersedia lewat stats().
+    """
+
+    def __init__(self, db_path, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.db_path = str(db_path)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = []
+        self._in_use = {}  # id(conn) -> (thread ident, conn)
+        self._opening = 0  # slot yang sudah dipesan, koneksinya sedang dibuat
+        self._counters = {
+            'opened': 0,
+            'reused': 0,
+            'overflow': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'released': 0,
+            'reclaimed': 0,
+        }
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DB_BUSY_TIMEOUT,
+            check_same_thread=False,  # Aman: satu koneksi hanya dipinjam satu thread pada satu waktu
+            factory=PooledConnection
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-8000")
+        # lower() bawaan SQLite hanya melipat huruf ASCII; py_lower = str.lower Python
+        conn.create_function("py_lower", 1, _sql_py_lower, deterministic=True)
+        conn._pool = self
+        return conn
+
+    def _thread_holds_connection(self, ident):
+        return any(owner == ident for owner, _ in self._in_use.values())
+
+    def _reclaim_orphans(self):
+        """Ambil kembali koneksi yang lupa di-close oleh thread script yang sudah selesai."""
+        alive = {t.ident for t in threading.enumerate()}
+        for key, (owner, conn) in list(self._in_use.items()):
+            if owner in alive:
+                continue
+            del self._in_use[key]
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+            except sqlite3.Error:
+                conn.close_physical()
+            self._counters['reclaimed'] += 1
+
+    def acquire(self):
+        ident = threading.get_ident()
+        start = time.perf_counter()
+        waited = False
+        conn = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._counters['reused'] += 1
+                    break
+                if len(self._in_use) + self._opening < self.max_size:
+                    break
+                self._reclaim_orphans()
+                if self._idle:
+                    continue
+                if self._thread_holds_connection(ident):
+                    self._counters['overflow'] += 1
+                    break
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise sqlite3.OperationalError("Timeout menunggu koneksi database dari pool")
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                self._counters['waits'] += 1
+                self._counters['wait_time'] += time.perf_counter() - start
+            if conn is None:
+                self._opening += 1
+            else:
+                self._in_use[id(conn)] = (ident, conn)
+
+        if conn is None:
+            try:
+                conn = self._open()
+            finally:
+                with self._cond:
+                    self._opening -= 1
+                    if conn is None:
+                        self._cond.notify()
+                    else:
+                        self._counters['opened'] += 1
+                        self._in_use[id(conn)] = (ident, conn)
+        return conn
+
+    def release(self, conn):
+        with self._cond:
+            if self._in_use.pop(id(conn), None) is None:
+                # close() dipanggil dua kali pada koneksi yang sama - abaikan
+                return
+        # Callback milik transaksi yang tidak di-commit tidak boleh terbawa ke peminjam berikutnya
+        conn.discard_after_commit()
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close_physical()
+            with self._cond:
+                self._cond.notify()
+            return
+        with self._cond:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                conn = None
+            self._counters['released'] += 1
+            self._cond.notify()
+        if conn is not None:
+            # Koneksi overflow tidak disimpan
+            conn.close_physical()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._counters)
+            stats['in_use'] = len(self._in_use)
+            stats['idle'] = len(self._idle)
+        stats['wait_time_ms'] = round(stats.pop('wait_time') * 1000, 2)
+        checkouts = stats['opened'] + stats['reused']
+        stats['reuse_ratio'] = round(stats['reused'] / checkouts, 3) if checkouts else 0.0
+        return stats
+
+@st.cache_resource
+def get_db_pool():
+    """Satu pool untuk seluruh sesi dalam proses Streamlit ini."""
+    return SQLiteConnectionPool(DB_PATH)
+
 def get_conn():
-    return sqlite3.connect(DB_PATH)
+    return get_db_pool().acquire()
+
+def db_connection():
+    """Context manager: `with db_connection() as conn:` - koneksi otomatis kembali ke pool."""
+    return get_db_pool().connection()
 
 def fetchall(query, params=()):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute(query, params)
-    rows = c.fetchall()
-    cols = [d[0] for d in c.description]
-    conn.close()
+    with db_connection() as conn:
+        c = conn.cursor()
+        c.execute(query, params)
+        rows = c.fetchall()
+        cols = [d[0] for d in c.description]
     return [dict(zip(cols, row)) for row in rows]
 
 def parse_date_string(date_str):
@@ -428,16 +643,125 @@ def parse_date_string(date_str):
         except:
             return None
 
-def get_dynamic_doc_columns():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT name FROM dynamic_docs")
-    docs = [row[0] for row in c.fetchall()]
-    conn.close()
-    return docs
+# --- Registry Jenis Dokumen ---
+def doc_sql_key(doc_name):
+    """Nama dokumen -> kunci aman untuk nama kolom SQL / key widget / folder ('PAR. PROCESS' -> 'PAR_PROCESS')."""
+    return doc_name.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
 
-def init_db():
-    conn = get_conn()
+class DocType:
+    """Satu jenis dokumen. Immutable; dibagi antar sesi lewat registry yang di-cache."""
+    __slots__ = ('name', 'key', 'is_multiple', 'is_default', 'path_field', 'sql_columns', 'export_columns')
+
+    def __init__(self, name, is_default=False):
+        key = doc_sql_key(name)
+        is_multiple = name in MULTIPLE_FILE_DOCS
+        if is_multiple:
+            sql_suffixes = ('paths', 'delegated_to', 'start_date', 'end_date', 'delegated_to_list')
+            export_suffixes = ('PATHS', 'DELEGATED_TO', 'START_DATE', 'END_DATE')
+        else:
+            sql_suffixes = ('path', 'date', 'delegated_to', 'start_date', 'end_date', 'delegated_to_list')
+            export_suffixes = ('PATH', 'DATE', 'DELEGATED_TO', 'START_DATE', 'END_DATE')
+        set_attr = object.__setattr__
+        set_attr(self, 'name', name)
+        set_attr(self, 'key', key)
+        set_attr(self, 'is_multiple', is_multiple)
+        set_attr(self, 'is_default', is_default)
+        # Field sel load_df yang menandakan dokumen sudah ada file-nya
+        set_attr(self, 'path_field', 'paths' if is_multiple else 'path')
+        # Nama kolom skema lebar lama (projects.<key>_<suffix>), dipakai migrasi
+        set_attr(self, 'sql_columns', tuple(f"{key}_{suffix}" for suffix in sql_suffixes))
+        # Nama kolom pada export Excel
+        set_attr(self, 'export_columns', tuple(f"{name} - {suffix}" for suffix in export_suffixes))
+
+    def __setattr__(self, attr, value):
+        raise AttributeError(f"DocType '{self.name}' tidak bisa diubah")
+
+    def __repr__(self):
+        return f"DocType({self.name!r}, multiple={self.is_multiple})"
+
+    def is_filled(self, cell):
+        """True jika sel load_df untuk dokumen ini sudah berisi file."""
+        return bool(cell and cell.get(self.path_field))
+
+class DocTypeRegistry:
+    """Daftar jenis dokumen (default + dynamic_docs) berurutan, dengan lookup per nama."""
+    __slots__ = ('types', 'names', '_by_name', '_by_key', '_by_upper', '_prefix_re')
+
+    def __init__(self, dynamic_names=()):
+        types = [DocType(name, is_default=True) for name in DEFAULT_DOC_COLUMNS]
+        seen = set(DEFAULT_DOC_COLUMNS)
+        for name in dynamic_names:
+            if name not in seen:
+                seen.add(name)
+                types.append(DocType(name))
+        set_attr = object.__setattr__
+        set_attr(self, 'types', tuple(types))
+        set_attr(self, 'names', tuple(t.name for t in types))
+        set_attr(self, '_by_name', {t.name: t for t in types})
+        set_attr(self, '_by_key', {t.key: t for t in types})
+        # Pencocok awalan nama file: satu regex alternation, nama terpanjang lebih dulu
+        # agar "FMEA PROCESS" tidak tertutup oleh "FMEA" (urutan sama panjang tetap urutan registry)
+        by_upper = {}
+        for t in types:
+            by_upper.setdefault(t.name.upper(), t)
+        prefixes = sorted(by_upper, key=len, reverse=True)
+        set_attr(self, '_by_upper', by_upper)
+        set_attr(self, '_prefix_re', re.compile("|".join(re.escape(p) for p in prefixes if p) or r"(?!)", re.IGNORECASE))
+
+    def __setattr__(self, attr, value):
+        raise AttributeError("DocTypeRegistry tidak bisa diubah")
+
+    def __iter__(self):
+        return iter(self.types)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def get(self, name, default=None):
+        return self._by_name.get(name, default)
+
+    def by_key(self, key, default=None):
+        return self._by_key.get(key, default)
+
+    def key(self, name):
+        """Kunci SQL sebuah dokumen; nama yang tidak terdaftar tetap diturunkan dengan aturan yang sama."""
+        doc_type = self._by_name.get(name)
+        return doc_type.key if doc_type else doc_sql_key(name)
+
+    def is_multiple(self, name):
+        doc_type = self._by_name.get(name)
+        return doc_type.is_multiple if doc_type else name in MULTIPLE_FILE_DOCS
+
+    def match_prefix(self, text):
+        """Jenis dokumen terpanjang yang menjadi awalan `text` (tanpa membedakan huruf besar/kecil), atau None."""
+        match = self._prefix_re.match(text)
+        return self._by_upper[match.group(0).upper()] if match else None
+
+    @property
+    def dynamic_names(self):
+        return tuple(t.name for t in self.types if not t.is_default)
+
+def load_doc_type_registry(conn):
+    """Bangun registry dari dynamic_docs lewat koneksi yang diberikan (dipakai migrasi & load_df)."""
+    return DocTypeRegistry(row[0] for row in conn.execute("SELECT name FROM dynamic_docs ORDER BY rowid"))
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_doc_type_registry(dynamic_docs_version):
+    with db_connection() as conn:
+        return load_doc_type_registry(conn)
+
+def get_doc_registry():
+    """Registry jenis dokumen, di-cache lintas sesi dan diinvalidasi oleh data_version dynamic_docs."""
+    return _cached_doc_type_registry(get_data_versions(('dynamic_docs',)))
+
+def _migration_001_initial_schema(conn):
+    """Skema awal (users, projects lebar, audit, revisi, preferensi) + default users."""
     c = conn.cursor()
     
     schema_users = (
@@ -454,26 +778,19 @@ def init_db():
     c.execute(schema_users)
     c.execute("CREATE TABLE IF NOT EXISTS dynamic_docs (name TEXT PRIMARY KEY)")
 
-    current_docs = get_dynamic_doc_columns()
+    # Baca lewat koneksi migrasi sendiri (bukan get_doc_registry) agar tetap satu transaksi
+    doc_types = load_doc_type_registry(c)
     
     # Kolom untuk single file
-    single_file_docs = [doc for doc in DEFAULT_DOC_COLUMNS + current_docs if doc not in MULTIPLE_FILE_DOCS]
     doc_fields_single = [
-        f"{col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_path TEXT, "
-        f"{col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_date TEXT"
-        f", {col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_delegated_to TEXT"
-        f", {col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_start_date TEXT"
-        f", {col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_end_date TEXT"
-        for col in single_file_docs
+        ", ".join(f"{col} TEXT" for col in doc_type.sql_columns[:5])
+        for doc_type in doc_types if not doc_type.is_multiple
     ]
     
     # Kolom untuk multiple files (menyimpan JSON string dari path)
     doc_fields_multiple = [
-        f"{col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_paths TEXT"
-        f", {col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_delegated_to TEXT"
-        f", {col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_start_date TEXT"
-        f", {col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_end_date TEXT"
-        for col in MULTIPLE_FILE_DOCS
+        ", ".join(f"{col} TEXT" for col in doc_type.sql_columns[:4])
+        for doc_type in doc_types if doc_type.is_multiple
     ]
     
     all_doc_fields = doc_fields_single + doc_fields_multiple
@@ -545,36 +862,11 @@ def init_db():
     if 'created_by' not in cols_info:
         c.execute("ALTER TABLE projects ADD COLUMN created_by TEXT")
     
-    all_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-    for col in all_docs:
-        key = col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-        
-        if col in MULTIPLE_FILE_DOCS:
-            if f"{key}_paths" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_paths TEXT")
-            if f"{key}_delegated_to" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_delegated_to TEXT")
-            if f"{key}_start_date" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_start_date TEXT")
-            if f"{key}_end_date" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_end_date TEXT")
-        else:
-            if f"{key}_path" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_path TEXT")
-            if f"{key}_date" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_date TEXT")
-            if f"{key}_delegated_to" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_delegated_to TEXT")
-            if f"{key}_start_date" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_start_date TEXT")
-            if f"{key}_end_date" not in cols_info:
-                c.execute(f"ALTER TABLE projects ADD COLUMN {key}_end_date TEXT")
-
-    # Tambahkan kolom list delegasi untuk semua dokumen jika belum ada
-    for col in all_docs:
-        key = col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-        if f"{key}_delegated_to_list" not in cols_info:
-            c.execute(f"ALTER TABLE projects ADD COLUMN {key}_delegated_to_list TEXT")
+    # Lengkapi kolom lebar yang belum ada (termasuk list delegasi untuk semua dokumen)
+    for doc_type in doc_types:
+        for col in doc_type.sql_columns:
+            if col not in cols_info:
+                c.execute(f"ALTER TABLE projects ADD COLUMN {col} TEXT")
 
     # Cek apakah tabel users kosong, jika ya tambahkan default users
     c.execute("SELECT COUNT(*) FROM users")
@@ -584,8 +876,377 @@ def init_db():
         # Hanya tambahkan default users jika tabel kosong
         add_default_users(c)
 
-    conn.commit()
-    conn.close()
+def _migration_002_project_documents(conn):
+    """
+    Tabel project_documents (format panjang: satu baris per proyek x dokumen)
+    menggantikan kolom lebar {key}_path/_paths/_date/_delegated_to/... di projects.
+    Data lama disalin per batch; kolom lebar dibiarkan (tidak dipakai lagi).
+    """
+    c = conn.cursor()
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS project_documents ("
+        "project_id INTEGER NOT NULL,"
+        "doc_name TEXT NOT NULL,"
+        "file_path TEXT,"
+        "file_paths TEXT,"
+        "upload_date TEXT,"
+        "delegated_to TEXT,"
+        "delegated_to_list TEXT,"
+        "start_date TEXT,"
+        "end_date TEXT,"
+        "has_file INTEGER NOT NULL DEFAULT 0,"
+        "PRIMARY KEY (project_id, doc_name)"
+        ")"
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_project_documents_doc ON project_documents(doc_name, has_file)")
+
+    cols_info = {info[1] for info in c.execute("PRAGMA table_info(projects)").fetchall()}
+    doc_types = load_doc_type_registry(c)
+
+    # Peta kolom lebar yang benar-benar ada untuk setiap dokumen
+    suffix_to_field = {
+        'path': 'file_path', 'paths': 'file_paths', 'date': 'upload_date',
+        'delegated_to': 'delegated_to', 'delegated_to_list': 'delegated_to_list',
+        'start_date': 'start_date', 'end_date': 'end_date',
+    }
+    select_cols = []
+    doc_sources = []
+    for doc_type in doc_types:
+        sources = {}
+        for suffix, field in suffix_to_field.items():
+            col = f"{doc_type.key}_{suffix}"
+            if col in cols_info:
+                sources[field] = len(select_cols) + 1  # +1 karena kolom 0 adalah id
+                select_cols.append(col)
+        if sources:
+            doc_sources.append((doc_type, sources))
+    if not select_cols:
+        return
+
+    batch_size = 500
+    last_id = 0
+    insert_sql = (
+        "INSERT OR IGNORE INTO project_documents (project_id, doc_name, file_path, file_paths, upload_date, "
+        "delegated_to, delegated_to_list, start_date, end_date, has_file) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    )
+    while True:
+        rows = c.execute(
+            f"SELECT id, {', '.join(select_cols)} FROM projects WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        records = []
+        for row in rows:
+            for doc_type, sources in doc_sources:
+                values = {field: row[idx] for field, idx in sources.items()}
+                if not any(v not in (None, '') for v in values.values()):
+                    continue
+                paths = _parse_json_list(values.get('file_paths'))
+                delegates = _parse_json_list(values.get('delegated_to_list'))
+                has_file = bool(paths) if doc_type.is_multiple else bool(values.get('file_path'))
+                records.append((
+                    row[0], doc_type.name, values.get('file_path') or None,
+                    json.dumps(paths) if paths else None, values.get('upload_date'),
+                    values.get('delegated_to'), json.dumps(delegates) if delegates else None,
+                    values.get('start_date'), values.get('end_date'), int(has_file)
+                ))
+        c.executemany(insert_sql, records)
+        last_id = rows[-1][0]
+
+def _create_data_version_triggers(c, table):
+    """Trigger INSERT/UPDATE/DELETE yang menaikkan counter data_version untuk satu tabel."""
+    c.execute("INSERT OR IGNORE INTO data_version (table_name, version) VALUES (?, 0)", (table,))
+    for op in ('INSERT', 'UPDATE', 'DELETE'):
+        c.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_data_version_{table}_{op.lower()} "
+            f"AFTER {op} ON {table} BEGIN "
+            f"UPDATE data_version SET version = version + 1 WHERE table_name = '{table}'; "
+            f"END"
+        )
+
+def _migration_003_data_version(conn):
+    """Counter perubahan per tabel untuk invalidasi cache lintas sesi (mis. load_df)."""
+    c = conn.cursor()
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS data_version ("
+        "table_name TEXT PRIMARY KEY,"
+        "version INTEGER NOT NULL DEFAULT 0"
+        ")"
+    )
+    for table in ('projects', 'project_documents', 'preferences', 'dynamic_docs'):
+        _create_data_version_triggers(c, table)
+
+def _migration_004_data_version_all_tables(conn):
+    """Perluas counter data_version ke tabel revisi, user, dan audit log."""
+    c = conn.cursor()
+    for table in ('revision_history', 'users', 'audit_logs'):
+        _create_data_version_triggers(c, table)
+
+def _migration_005_indexes(conn):
+    """Index sekunder untuk query panas (lihat QUERY_PLAN_REGISTRY untuk pemeriksaannya)."""
+    c = conn.cursor()
+    # Lookup revisi per dokumen, MAX(revision_number), pending per dokumen
+    c.execute("CREATE INDEX IF NOT EXISTS idx_revision_history_doc ON revision_history(project_id, doc_column, revision_number)")
+    # Antrian approval: hanya baris pending, urut waktu
+    c.execute("CREATE INDEX IF NOT EXISTS idx_revision_history_pending ON revision_history(timestamp) WHERE revision_number = -1")
+    # Log terbaru (ORDER BY timestamp DESC LIMIT n) dan statistik upload per aksi
+    c.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs(timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_action ON audit_logs(action, user_id)")
+    # Tenggat proyek mendekat
+    c.execute("CREATE INDEX IF NOT EXISTS idx_projects_status_end ON projects(status, project_end_date)")
+    c.execute("ANALYZE")
+
+def _migration_006_file_metadata(conn):
+    """Metadata & thumbnail file upload, diisi background job setelah upload."""
+    c = conn.cursor()
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS file_metadata ("
+        "file_path TEXT PRIMARY KEY,"
+        "file_size INTEGER,"
+        "content_hash TEXT,"
+        "page_count INTEGER,"
+        "width INTEGER,"
+        "height INTEGER,"
+        "thumbnail BLOB,"
+        "thumbnail_format TEXT,"
+        "error TEXT,"
+        "generated_at TEXT"
+        ")"
+    )
+
+def _migration_007_file_blobs(conn):
+    """Content-addressed store: blob per SHA-256 + referensi path -> blob (refcount)."""
+    c = conn.cursor()
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS file_blobs ("
+        "sha256 TEXT PRIMARY KEY,"
+        "size INTEGER NOT NULL,"
+        "refcount INTEGER NOT NULL DEFAULT 0,"
+        "created_at TEXT"
+        ")"
+    )
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS file_blob_refs ("
+        "file_path TEXT PRIMARY KEY,"
+        "sha256 TEXT NOT NULL REFERENCES file_blobs(sha256)"
+        ")"
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_file_blob_refs_sha ON file_blob_refs(sha256)")
+
+def _migration_008_revision_checksum(conn):
+    """Checksum SHA-256 dan ukuran file pada setiap baris revisi (diisi ingest_upload)."""
+    c = conn.cursor()
+    cols_info = {info[1] for info in c.execute("PRAGMA table_info(revision_history)").fetchall()}
+    if 'file_sha256' not in cols_info:
+        c.execute("ALTER TABLE revision_history ADD COLUMN file_sha256 TEXT")
+    if 'file_size' not in cols_info:
+        c.execute("ALTER TABLE revision_history ADD COLUMN file_size INTEGER")
+
+def _migration_009_jobs(conn):
+    """Antrian job latar (mis. auto upload) beserta hasil per file, tahan restart proses."""
+    c = conn.cursor()
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "kind TEXT NOT NULL,"
+        "status TEXT NOT NULL DEFAULT 'queued',"  # queued, running, done, failed, canceled
+        "created_by TEXT,"
+        "created_at TEXT,"
+        "started_at TEXT,"
+        "finished_at TEXT,"
+        "heartbeat_at REAL,"
+        "total INTEGER NOT NULL DEFAULT 0,"
+        "processed INTEGER NOT NULL DEFAULT 0,"
+        "cancel_requested INTEGER NOT NULL DEFAULT 0,"
+        "params TEXT,"
+        "error TEXT"
+        ")"
+    )
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS job_items ("
+        "job_id INTEGER NOT NULL REFERENCES jobs(id),"
+        "seq INTEGER NOT NULL,"
+        "file_name TEXT,"
+        "staged_path TEXT,"
+        "file_sha256 TEXT,"
+        "status TEXT NOT NULL DEFAULT 'queued',"
+        "doc_type TEXT,"
+        "project_id INTEGER,"
+        "similarity REAL,"
+        "revision REAL,"
+        "file_path TEXT,"
+        "message TEXT,"
+        "finished_at TEXT,"
+        "PRIMARY KEY (job_id, seq)"
+        ")"
+    )
+    # Worker mengambil job tertua yang masih antri; UI menampilkan job milik user
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_by ON jobs(created_by, kind, id)")
+
+# Kunci kanonik part number: huruf besar ASCII tanpa pemisah, sehingga
+# "bs-062a-2", "BS 062A 2" dan "BS062A2" bertemu di satu nilai.
+# part_no_key() dan part_no_key_sql() harus selalu identik.
+PART_NO_KEY_IGNORED = " -_./"
+_PART_NO_KEY_TABLE = str.maketrans(string.ascii_lowercase, string.ascii_uppercase, PART_NO_KEY_IGNORED)
+
+def part_no_key(part_no):
+    """Kunci kanonik part number (None jika kosong)."""
+    return (part_no or "").translate(_PART_NO_KEY_TABLE) or None
+
+def part_no_key_sql(column):
+    """Ekspresi SQL setara part_no_key() (UPPER bawaan SQLite juga hanya ASCII)."""
+    expr = column
+    for char in PART_NO_KEY_IGNORED:
+        expr = f"REPLACE({expr}, '{char}', '')"
+    return f"NULLIF(UPPER({expr}), '')"
+
+def _migration_010_part_no_key(conn):
+    """Kolom projects.part_no_key terindeks, dijaga trigger saat insert/update part_no."""
+    c = conn.cursor()
+    cols_info = {info[1] for info in c.execute("PRAGMA table_info(projects)").fetchall()}
+    if 'part_no_key' not in cols_info:
+        c.execute("ALTER TABLE projects ADD COLUMN part_no_key TEXT")
+    c.execute(f"UPDATE projects SET part_no_key = {part_no_key_sql('part_no')}")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_projects_part_no_key ON projects(part_no_key)")
+    for op in ('INSERT', 'UPDATE OF part_no'):
+        c.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_projects_part_no_key_{op.split()[0].lower()} "
+            f"AFTER {op} ON projects BEGIN "
+            f"UPDATE projects SET part_no_key = {part_no_key_sql('NEW.part_no')} WHERE id = NEW.id; "
+            f"END"
+        )
+
+def _migration_011_upload_aliases(conn):
+    """
+    Alias auto upload yang sudah dikonfirmasi: (nama part, part number, jenis dokumen)
+    -> proyek. Baris revisi pending menyimpan kunci alias hasil parse nama file agar
+    alias bisa dicatat saat file disetujui. Alias terhapus otomatis bila proyeknya
+    dihapus atau item/part_no-nya diubah.
+    """
+    c = conn.cursor()
+    c.execute(
+        "CREATE TABLE IF NOT EXISTS upload_aliases ("
+        "part_name_key TEXT NOT NULL,"
+        "part_no_key TEXT NOT NULL DEFAULT '',"
+        "doc_type TEXT NOT NULL,"
+        "project_id INTEGER NOT NULL REFERENCES projects(id),"
+        "confirmations INTEGER NOT NULL DEFAULT 1,"
+        "confirmed_by TEXT,"
+        "confirmed_at TEXT,"
+        "PRIMARY KEY (part_name_key, part_no_key, doc_type)"
+        ")"
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_upload_aliases_project ON upload_aliases(project_id)")
+    c.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_upload_aliases_project_delete AFTER DELETE ON projects BEGIN "
+        "DELETE FROM upload_aliases WHERE project_id = OLD.id; "
+        "END"
+    )
+    c.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_upload_aliases_project_rename AFTER UPDATE OF item, part_no ON projects "
+        "WHEN OLD.item IS NOT NEW.item OR OLD.part_no IS NOT NEW.part_no BEGIN "
+        "DELETE FROM upload_aliases WHERE project_id = OLD.id; "
+        "END"
+    )
+    cols_info = {info[1] for info in c.execute("PRAGMA table_info(revision_history)").fetchall()}
+    for column in ('alias_part_name', 'alias_part_no'):
+        if column not in cols_info:
+            c.execute(f"ALTER TABLE revision_history ADD COLUMN {column} TEXT")
+
+def _migration_012_job_archive_member(conn):
+    """Nama anggota arsip untuk item job auto upload ZIP (file diambil langsung dari arsip)."""
+    c = conn.cursor()
+    cols_info = {info[1] for info in c.execute("PRAGMA table_info(job_items)").fetchall()}
+    if 'archive_member' not in cols_info:
+        c.execute("ALTER TABLE job_items ADD COLUMN archive_member TEXT")
+
+def _migration_013_job_claim_token(conn):
+    """Token pemilik claim job: worker yang job-nya sudah diambil alih tidak boleh menulis lagi."""
+    c = conn.cursor()
+    cols_info = {info[1] for info in c.execute("PRAGMA table_info(jobs)").fetchall()}
+    if 'claim_token' not in cols_info:
+        c.execute("ALTER TABLE jobs ADD COLUMN claim_token TEXT")
+
+def _migration_014_job_result(conn):
+    """Hasil job (JSON) yang ditulis bersama status akhir, mis. daftar volume arsip ekspor."""
+    c = conn.cursor()
+    cols_info = {info[1] for info in c.execute("PRAGMA table_info(jobs)").fetchall()}
+    if 'result' not in cols_info:
+        c.execute("ALTER TABLE jobs ADD COLUMN result TEXT")
+
+# Daftar migrasi berurutan: (versi, fungsi). Versi tersimpan di PRAGMA user_version.
+# Setiap langkah harus idempotent karena database lama (user_version = 0) sudah
+# memiliki sebagian skema. Tambahkan langkah baru di akhir, jangan ubah yang lama.
+MIGRATIONS = [
+    (1, _migration_001_initial_schema),
+    (2, _migration_002_project_documents),
+    (3, _migration_003_data_version),
+    (4, _migration_004_data_version_all_tables),
+    (5, _migration_005_indexes),
+    (6, _migration_006_file_metadata),
+    (7, _migration_007_file_blobs),
+    (8, _migration_008_revision_checksum),
+    (9, _migration_009_jobs),
+    (10, _migration_010_part_no_key),
+    (11, _migration_011_upload_aliases),
+    (12, _migration_012_job_archive_member),
+    (13, _migration_013_job_claim_token),
+    (14, _migration_014_job_result),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_migrations(conn):
+    """Jalankan migrasi yang belum diterapkan, satu transaksi per langkah."""
+    applied = []
+    for version, migrate in MIGRATIONS:
+        # BEGIN IMMEDIATE mengunci writer lain (proses lain) selama migrasi
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version <= current:
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            applied.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
+
+@st.cache_resource(show_spinner=False)
+def _schema_ready(db_path):
+    """Latch per-proses: migrasi hanya dicek sekali per deploy, bukan setiap rerun."""
+    with db_connection() as conn:
+        applied = run_migrations(conn)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    return {'version': version, 'applied': applied}
+
+def init_db():
+    return _schema_ready(str(DB_PATH))
+
+def get_all_data_versions():
+    """Semua counter data_version sebagai {table_name: version}, satu query."""
+    with db_connection() as conn:
+        return dict(conn.execute("SELECT table_name, version FROM data_version").fetchall())
+
+def get_data_versions(tables):
+    """
+    Versi data beberapa tabel dalam satu query, sebagai tuple sesuai urutan `tables`.
+    Dipakai sebagai kunci cache lintas sesi: tuple berubah = data berubah.
+    """
+    placeholders = ', '.join(['?'] * len(tables))
+    with db_connection() as conn:
+        rows = conn.execute(
+            f"SELECT table_name, version FROM data_version WHERE table_name IN ({placeholders})",
+            list(tables)
+        ).fetchall()
+    versions = dict(rows)
+    return tuple(versions.get(table, 0) for table in tables)
 
 def add_default_users(cursor):
     for user_data in DEFAULT_USERS:
@@ -599,18 +1260,99 @@ def add_default_users(cursor):
         except sqlite3.IntegrityError:
             continue
 
-def log_audit(user_id, action, details={}):
-    conn = get_conn()
-    c = conn.cursor()
-    timestamp = datetime.datetime.now().isoformat()
-    # Filter out null or empty values for a cleaner log
-    clean_details = {k: v for k, v in details.items() if v is not None and v != ''}
-    if clean_details:
-        details_json = json.dumps(clean_details)
-        c.execute("INSERT INTO audit_logs (timestamp, user_id, action, details) VALUES (?, ?, ?, ?)",
-                  (timestamp, user_id, action, details_json))
-        conn.commit()
-    conn.close()
+# --- Audit Log (buffered) ---
+AUDIT_FLUSH_SIZE = 50        # flush bila buffer mencapai sekian event
+AUDIT_FLUSH_INTERVAL = 2.0   # ... atau event tertua sudah menunggu sekian detik
+AUDIT_INSERT_SQL = "INSERT INTO audit_logs (timestamp, user_id, action, details) VALUES (?, ?, ?, ?)"
+
+class AuditLogWriter:
+    """
+    Penulis audit_logs per proses. Event ditampung lalu ditulis dalam satu transaksi
+    saat akhir request atau saat buffer penuh/terlalu lama.
+    Jika pemanggil memberikan koneksi, event ikut transaksi pemanggil (commit bersama data).
+    """
+
+    def __init__(self, max_batch=AUDIT_FLUSH_SIZE, max_delay=AUDIT_FLUSH_INTERVAL):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._oldest = None
+        self._stats = {'buffered': 0, 'joined': 0, 'written': 0, 'flushes': 0, 'failed_flushes': 0}
+
+    @staticmethod
+    def make_row(user_id, action, details):
+        """Baris audit_logs siap insert, atau None jika detail kosong (tidak dicatat)."""
+        # Filter out null or empty values for a cleaner log
+        clean_details = {k: v for k, v in (details or {}).items() if v is not None and v != ''}
+        if not clean_details:
+            return None
+        return (datetime.datetime.now().isoformat(), user_id, action, json.dumps(clean_details))
+
+    def write(self, user_id, action, details, conn=None):
+        row = self.make_row(user_id, action, details)
+        if row is None:
+            return
+        if conn is not None:
+            # Ikut transaksi pemanggil; commit dilakukan pemanggil bersama perubahan datanya
+            conn.execute(AUDIT_INSERT_SQL, row)
+            with self._lock:
+                self._stats['joined'] += 1
+            return
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(row)
+            self._stats['buffered'] += 1
+            due = len(self._pending) >= self.max_batch or time.monotonic() - self._oldest >= self.max_delay
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Tulis semua event yang tertampung dalam satu transaksi. Mengembalikan jumlah baris."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending, self._oldest = self._pending, [], None
+            if not rows:
+                return 0
+            try:
+                with db_connection() as conn:
+                    conn.executemany(AUDIT_INSERT_SQL, rows)
+                    conn.commit()
+            except sqlite3.Error as e:
+                # Kembalikan ke buffer agar dicoba lagi pada flush berikutnya
+                with self._lock:
+                    self._pending[:0] = rows
+                    self._oldest = time.monotonic()
+                    self._stats['failed_flushes'] += 1
+                print(f"❌ Gagal menulis audit log: {e}")
+                return 0
+            with self._lock:
+                self._stats['written'] += len(rows)
+                self._stats['flushes'] += 1
+            return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+@st.cache_resource
+def get_audit_writer():
+    writer = AuditLogWriter()
+    # Jangan kehilangan event yang masih di buffer saat proses berhenti
+    atexit.register(writer.flush)
+    return writer
+
+def log_audit(user_id, action, details={}, conn=None):
+    """
+    Catat event audit. Tanpa `conn` event masuk buffer (ditulis batch);
+    dengan `conn` event ikut transaksi pemanggil dan tersimpan saat pemanggil commit.
+    """
+    get_audit_writer().write(user_id, action, details, conn=conn)
+
+def flush_audit_log():
+    return get_audit_writer().flush()
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -618,46 +1360,55 @@ def hash_password(password):
 def verify_password(password, hashed_password):
     return hash_password(password) == hashed_password
 
-def get_user_by_id(user_id):
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    user = c.fetchone()
-    conn.close()
+@st.cache_data(show_spinner=False, max_entries=512)
+def _cached_user_by_id(user_id, users_version):
+    with db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+        user = c.fetchone()
     if user:
         cols = [d[0] for d in c.description]
         return dict(zip(cols, user))
     return None
 
-def get_all_users():
-    conn = get_conn()
-    df = pd.read_sql_query("SELECT id, full_name, department, section, role, is_approved FROM users", conn)
-    conn.close()
+def get_user_by_id(user_id):
+    return _cached_user_by_id(user_id, get_data_versions(('users',)))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cached_all_users(users_version):
+    with db_connection() as conn:
+        df = pd.read_sql_query("SELECT id, full_name, department, section, role, is_approved FROM users", conn)
     return df
 
-def get_all_pids():
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT full_name FROM users WHERE is_approved = 1")
-    pids = [row[0] for row in c.fetchall()]
-    conn.close()
+def get_all_users():
+    return _cached_all_users(get_data_versions(('users',)))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cached_all_pids(users_version):
+    with db_connection() as conn:
+        pids = [row[0] for row in conn.execute("SELECT full_name FROM users WHERE is_approved = 1")]
     return pids
 
+def get_all_pids():
+    return _cached_all_pids(get_data_versions(('users',)))
+
 def get_audit_logs():
-    conn = get_conn()
-    df = pd.read_sql_query("SELECT * FROM audit_logs ORDER BY timestamp DESC", conn)
-    conn.close()
+    with db_connection() as conn:
+        df = pd.read_sql_query("SELECT * FROM audit_logs ORDER BY timestamp DESC", conn)
     return df
 
 # --- Preferensi Delegasi Otomatis ---
-def get_all_preferences():
-    conn = get_conn()
-    df = pd.read_sql_query("SELECT doc_name, delegated_to FROM preferences", conn)
-    conn.close()
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cached_all_preferences(preferences_version):
+    with db_connection() as conn:
+        df = pd.read_sql_query("SELECT doc_name, delegated_to FROM preferences", conn)
     if df.empty:
         return []
     return df.to_dict(orient='records')
 
+def get_all_preferences():
+    return _cached_all_preferences(get_data_versions(('preferences',)))
+
 def upsert_preference(doc_name, delegated_to, user_id):
     conn = get_conn()
     c = conn.cursor()
@@ -678,6 +1429,7 @@ def apply_preferences_to_all_projects(user_id):
         # Get all preferences
         prefs = get_all_preferences()
         if not prefs:
+            conn.close()
             return 0, "Tidak ada preferensi untuk diterapkan"
         
         # Get all projects
@@ -706,31 +1458,24 @@ def apply_preferences_to_all_projects(user_id):
             if not delegated_list:
                 continue
             
-            # Prepare update values
-            delegated_json = json.dumps(delegated_list)
-            delegated_single = delegated_list[0]
-            
-            key = doc_name.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-            
             # Update all projects
             for project in projects:
                 project_id = project[0]
                 
-                # Update both delegated_to and delegated_to_list columns
-                sql = f"UPDATE projects SET {key}_delegated_to = ?, {key}_delegated_to_list = ? WHERE id = ?"
-                c.execute(sql, (delegated_single, delegated_json, project_id))
+                # Update both delegated_to and delegated_to_list
+                save_project_document(c, project_id, doc_name,
+                                      delegated_to=delegated_list[0], delegated_to_list=delegated_list)
             
             updated_count += 1
             updated_details.append(f"{doc_name} → {', '.join(delegated_list)}")
         
-        conn.commit()
-        
-        # Log audit
+        # Log audit (satu transaksi dengan update delegasi)
         log_audit(user_id, "apply preferensi ke semua proyek", {
             "total_projects": len(projects),
             "total_docs_updated": updated_count,
             "details": updated_details
-        })
+        }, conn=conn)
+        conn.commit()
         
         return len(projects), f"Berhasil update {updated_count} dokumen untuk {len(projects)} proyek"
         
@@ -752,12 +1497,6 @@ def get_revision_history(project_id, doc_column):
     conn = get_conn()
     c = conn.cursor()
     
-    # Debug: Check what's in the table
-    print(f"🔍 DEBUG - get_revision_history called with project_id={project_id}, doc_column={doc_column}")
-    c.execute("SELECT * FROM revision_history WHERE project_id = ?", (project_id,))
-    all_revs = c.fetchall()
-    print(f"🔍 DEBUG - All revisions for project {project_id}: {all_revs}")
-    
     # Join dengan tabel users untuk mendapatkan full_name
     c.execute("""
         SELECT rh.*, u.full_name 
@@ -770,8 +1509,6 @@ def get_revision_history(project_id, doc_column):
     cols = [d[0] for d in c.description]
     conn.close()
     
-    print(f"🔍 DEBUG - Found {len(rows)} rows for doc_column={doc_column}")
-    
     if rows:
         result = []
         for row in rows:
@@ -794,11 +1531,6 @@ def register_user(user_id, password, full_name, department, section):
         conn.commit()
         conn.close()
         log_audit(user_id, "registrasi akun baru", {"full_name": full_name, "department": department})
-        # Invalidate cache untuk refresh user list
-        if 'cached_pids' in st.session_state:
-            del st.session_state['cached_pids']
-        if 'cached_pids_manage' in st.session_state:
-            del st.session_state['cached_pids_manage']
         return True
     except sqlite3.IntegrityError:
         conn.close()
@@ -815,11 +1547,6 @@ def approve_user(user_id, admin_id):
     conn.commit()
     conn.close()
     log_audit(admin_id, "menyetujui pengguna", {"approved_user_id": user_id})
-    # Invalidate cache untuk refresh user list
-    if 'cached_pids' in st.session_state:
-        del st.session_state['cached_pids']
-    if 'cached_pids_manage' in st.session_state:
-        del st.session_state['cached_pids_manage']
 
 def update_user_role(user_id, new_role, admin_id):
     conn = get_conn()
@@ -1023,12 +1750,12 @@ def show_dashboard():
     with col5:
         # Hitung proyek yang hampir selesai (progress >= 80% tapi belum Done)
         near_completion = 0
-        all_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-        total_docs = len(all_docs)
+        doc_types = get_doc_registry()
+        total_docs = len(doc_types)
         
         for _, row in df_view.iterrows():
             if row['STATUS'] not in ['Done', 'Canceled']:
-                completed = sum(1 for col in all_docs if row.get(col, {}).get('path' if col not in MULTIPLE_FILE_DOCS else 'paths'))
+                completed = sum(1 for doc_type in doc_types if doc_type.is_filled(row.get(doc_type.name)))
                 progress = (completed / total_docs * 100) if total_docs > 0 else 0
                 if progress >= 80:
                     near_completion += 1
@@ -1231,20 +1958,11 @@ def show_preferences_page():
         st.info("💡 Atur delegasi default untuk dokumen tertentu (bisa lebih dari 1 user)")
     with col_refresh:
         if st.button("🔄 Refresh Data", help="Muat ulang daftar user terbaru"):
-            st.session_state['pref_refresh'] = True
             st.rerun()
     
-    # Cache preferences dan users di session_state untuk menghindari query berulang
-    # Auto-refresh jika cache tidak ada (user baru approved/registered)
-    if ('cached_prefs' not in st.session_state or 
-        'cached_pids' not in st.session_state or 
-        st.session_state.get('pref_refresh', False)):
-        st.session_state['cached_prefs'] = get_all_preferences()
-        st.session_state['cached_pids'] = get_all_pids()
-        st.session_state['pref_refresh'] = False
-    
-    prefs = st.session_state['cached_prefs']
-    pids = st.session_state['cached_pids']
+    # Preferensi dan daftar user di-cache lintas sesi, otomatis segar saat data_version berubah
+    prefs = get_all_preferences()
+    pids = get_all_pids()
     
     if prefs:
         st.markdown("##### Preferensi Saat Ini")
@@ -1268,8 +1986,7 @@ def show_preferences_page():
     
     st.markdown("---")
     st.markdown("##### Tambah/Perbarui Preferensi")
-    all_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-    pref_doc = st.selectbox("Dokumen", all_docs, key="pref_doc_select")
+    pref_doc = st.selectbox("Dokumen", get_doc_registry().names, key="pref_doc_select")
     
     # Get existing preference untuk dokumen ini
     existing_pref = next((p for p in prefs if p['doc_name'] == pref_doc), None)
@@ -1295,8 +2012,6 @@ def show_preferences_page():
             users_json = json.dumps(pref_users)
             upsert_preference(pref_doc, users_json, st.session_state['user_id'])
             st.success(f"✅ Preferensi tersimpan: **{pref_doc}** → {', '.join(pref_users)}")
-            # Refresh cache agar data terbaru muncul
-            st.session_state['pref_refresh'] = True
             st.rerun()
         else:
             st.error("❌ Pilih minimal 1 user untuk delegasi!")
@@ -1340,8 +2055,6 @@ def show_preferences_page():
         if st.button("🗑️ Hapus Preferensi"):
             delete_preference(doc_to_remove, st.session_state['user_id'])
             st.success("✅ Preferensi dihapus.")
-            # Refresh cache agar data terbaru muncul
-            st.session_state['pref_refresh'] = True
             st.rerun()
     else:
         st.info("Tidak ada preferensi untuk dihapus.")
@@ -1360,48 +2073,18 @@ def export_data_page():
         
         # Export semua data
         if st.button("📥 Download Excel", type="primary"):
-            rows = []
-            for _, r in df_view.iterrows():
-                base = {c: r[c] for c in ['NO', 'ITEM', 'PART NO', 'PROJECT', 'CUSTOMER', 'STATUS', 'PIC', 'PROJECT START DATE', 'PROJECT END DATE']}
-                all_doc_cols = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-                for col in all_doc_cols:
-                    cell = r.get(col, {})
-                    if col in MULTIPLE_FILE_DOCS:
-                        base[col + ' - PATHS'] = json.dumps(cell.get('paths')) if cell.get('paths') else ""
-                    else:
-                        base[col + ' - PATH'] = cell.get('path', "")
-                        base[col + ' - DATE'] = cell.get('date', "")
-                    
-                    base[col + ' - DELEGATED_TO'] = cell.get('delegated_to', "")
-                    base[col + ' - START_DATE'] = cell.get('start_date', "")
-                    base[col + ' - END_DATE'] = cell.get('end_date', "")
-                rows.append(base)
-            out_df = pd.DataFrame(rows)
-            buf = BytesIO()
-            out_df.to_excel(buf, index=False)
-            buf.seek(0)
-            st.download_button('📥 Download .xlsx', data=buf, file_name='project_monitor_export.xlsx', mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            export_bytes = build_project_export_xlsx()
+            st.download_button('📥 Download .xlsx', data=export_bytes, file_name='project_monitor_export.xlsx', mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             st.success("File siap diunduh!")
 
 def add_dynamic_doc_column(col_name, user_id):
     conn = get_conn()
     c = conn.cursor()
-    key = col_name.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-    
-    is_multiple = col_name in MULTIPLE_FILE_DOCS
+    is_multiple = DocType(col_name).is_multiple
     
     try:
+        # Data dokumen tersimpan di project_documents, jadi tidak perlu ALTER TABLE
         c.execute("INSERT INTO dynamic_docs (name) VALUES (?)", (col_name,))
-        if is_multiple:
-            c.execute(f"ALTER TABLE projects ADD COLUMN {key}_paths TEXT")
-        else:
-            c.execute(f"ALTER TABLE projects ADD COLUMN {key}_path TEXT")
-            c.execute(f"ALTER TABLE projects ADD COLUMN {key}_date TEXT")
-        
-        c.execute(f"ALTER TABLE projects ADD COLUMN {key}_delegated_to TEXT")
-        c.execute(f"ALTER TABLE projects ADD COLUMN {key}_start_date TEXT")
-        c.execute(f"ALTER TABLE projects ADD COLUMN {key}_end_date TEXT")
-        
         conn.commit()
         log_audit(user_id, "menambah kolom dokumen", {"doc_name": col_name, "is_multiple": is_multiple})
         return True
@@ -1417,74 +2100,12 @@ def add_dynamic_doc_column(col_name, user_id):
 def delete_doc_column(col_name, user_id):
     conn = get_conn()
     c = conn.cursor()
-    key = col_name.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
     
     try:
         # Hapus dari tabel dynamic_docs jika ada
         c.execute("DELETE FROM dynamic_docs WHERE name = ?", (col_name,))
-        
-        st.warning("Menghapus kolom memerlukan pembuatan ulang tabel. Ini akan memakan waktu sejenap.")
-        
-        all_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-        new_docs = [doc for doc in all_docs if doc != col_name]
-
-        # Buat daftar kolom baru
-        new_cols_to_copy = []
-        base_cols_to_copy = ['id', 'item', 'part_no', 'project', 'customer', 'status', 'pic', 'project_start_date', 'project_end_date', 'created_at']
-        new_cols_to_copy.extend(base_cols_to_copy)
-        
-        doc_fields_single = []
-        doc_fields_multiple = []
-
-        for doc in new_docs:
-            doc_key = doc.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-            if doc in MULTIPLE_FILE_DOCS:
-                doc_fields_multiple.append(f"{doc_key}_paths TEXT")
-                doc_fields_multiple.append(f"{doc_key}_delegated_to TEXT")
-                doc_fields_multiple.append(f"{doc_key}_start_date TEXT")
-                doc_fields_multiple.append(f"{doc_key}_end_date TEXT")
-                new_cols_to_copy.append(f"{doc_key}_paths")
-                new_cols_to_copy.append(f"{doc_key}_delegated_to")
-                new_cols_to_copy.append(f"{doc_key}_start_date")
-                new_cols_to_copy.append(f"{doc_key}_end_date")
-            else:
-                doc_fields_single.append(f"{doc_key}_path TEXT")
-                doc_fields_single.append(f"{doc_key}_date TEXT")
-                doc_fields_single.append(f"{doc_key}_delegated_to TEXT")
-                doc_fields_single.append(f"{doc_key}_start_date TEXT")
-                doc_fields_single.append(f"{doc_key}_end_date TEXT")
-                new_cols_to_copy.append(f"{doc_key}_path")
-                new_cols_to_copy.append(f"{doc_key}_date")
-                new_cols_to_copy.append(f"{doc_key}_delegated_to")
-                new_cols_to_copy.append(f"{doc_key}_start_date")
-                new_cols_to_copy.append(f"{doc_key}_end_date")
-        
-        all_new_doc_fields = doc_fields_single + doc_fields_multiple
-
-        schema_temp_projects = (
-            "CREATE TABLE temp_projects ("
-            "id INTEGER PRIMARY KEY AUTOINCREMENT,"
-            "item TEXT,"
-            "part_no TEXT,"
-            "project TEXT,"
-            "customer TEXT,"
-            "status TEXT,"
-            "pic TEXT,"
-            "project_start_date TEXT,"
-            "project_end_date TEXT,"
-            f"{', '.join(all_new_doc_fields)}, created_at TEXT"
-            ")"
-        )
-        c.execute(schema_temp_projects)
-
-        c.execute(f"""
-            INSERT INTO temp_projects({', '.join(new_cols_to_copy)})
-            SELECT {', '.join(new_cols_to_copy)}
-            FROM projects
-        """)
-
-        c.execute("DROP TABLE projects")
-        c.execute("ALTER TABLE temp_projects RENAME TO projects")
+        # Hapus data dokumen di semua proyek (cukup DELETE, tanpa membuat ulang tabel)
+        c.execute("DELETE FROM project_documents WHERE doc_name = ?", (col_name,))
         
         conn.commit()
         log_audit(user_id, "menghapus kolom dokumen", {"doc_name": col_name})
@@ -1496,126 +2117,371 @@ def delete_doc_column(col_name, user_id):
     finally:
         conn.close()
 
+# --- Dokumen Proyek (tabel project_documents) ---
+PROJECT_DOCUMENT_FIELDS = ('file_path', 'file_paths', 'upload_date', 'delegated_to', 'delegated_to_list', 'start_date', 'end_date')
+
+def _parse_json_list(raw):
+    """JSON list tersimpan -> list Python; string tunggal dianggap list satu elemen."""
+    if raw is None or raw == "":
+        return []
+    try:
+        value = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return []
+    if isinstance(value, str):
+        return [value]
+    return value if isinstance(value, list) else []
+
+def _empty_project_document():
+    return {
+        'file_path': None, 'file_paths': [], 'upload_date': None,
+        'delegated_to': None, 'delegated_to_list': [],
+        'start_date': None, 'end_date': None, 'has_file': False
+    }
+
+def _project_document_from_row(row):
+    """row: (file_path, file_paths, upload_date, delegated_to, delegated_to_list, start_date, end_date, has_file)"""
+    return {
+        'file_path': row[0],
+        'file_paths': _parse_json_list(row[1]),
+        'upload_date': row[2],
+        'delegated_to': row[3],
+        'delegated_to_list': _parse_json_list(row[4]),
+        'start_date': row[5],
+        'end_date': row[6],
+        'has_file': bool(row[7])
+    }
+
+def get_project_documents(project_id):
+    """Semua dokumen satu proyek: {doc_name: record}. Dokumen yang belum punya baris tidak ikut."""
+    with db_connection() as conn:
+        rows = conn.execute(
+            f"SELECT doc_name, {', '.join(PROJECT_DOCUMENT_FIELDS)}, has_file FROM project_documents WHERE project_id = ?",
+            (project_id,)
+        ).fetchall()
+    return {row[0]: _project_document_from_row(row[1:]) for row in rows}
+
+def get_project_document(project_id, doc_name, cursor=None):
+    """Satu dokumen proyek; record kosong jika belum ada barisnya."""
+    sql = f"SELECT {', '.join(PROJECT_DOCUMENT_FIELDS)}, has_file FROM project_documents WHERE project_id = ? AND doc_name = ?"
+    if cursor is not None:
+        row = cursor.execute(sql, (project_id, doc_name)).fetchone()
+    else:
+        with db_connection() as conn:
+            row = conn.execute(sql, (project_id, doc_name)).fetchone()
+    return _project_document_from_row(row) if row else _empty_project_document()
+
+def save_project_document(cursor, project_id, doc_name, **fields):
+    """
+    Upsert sebagian field dokumen proyek dalam transaksi milik pemanggil.
+    file_paths / delegated_to_list boleh berupa list (disimpan sebagai JSON).
+    has_file dihitung ulang hanya jika field file ikut diubah.
+    """
+    unknown = set(fields) - set(PROJECT_DOCUMENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Field dokumen tidak dikenal: {sorted(unknown)}")
+    values = dict(fields)
+    for list_field in ('file_paths', 'delegated_to_list'):
+        if isinstance(values.get(list_field), list):
+            values[list_field] = json.dumps(values[list_field]) if values[list_field] else None
+    if 'file_paths' in values:
+        values['has_file'] = int(bool(_parse_json_list(values['file_paths'])))
+    elif 'file_path' in values:
+        values['has_file'] = int(bool(values['file_path']))
+
+    columns = list(values)
+    placeholders = ', '.join(['?'] * (len(columns) + 2))
+    updates = ', '.join(f"{col} = excluded.{col}" for col in columns)
+    cursor.execute(
+        f"INSERT INTO project_documents (project_id, doc_name, {', '.join(columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT(project_id, doc_name) DO UPDATE SET {updates}",
+        [project_id, doc_name] + [values[col] for col in columns]
+    )
+
+def count_completed_documents(cursor, project_id, doc_names):
+    """Jumlah dokumen (dari doc_names) yang sudah memiliki file untuk satu proyek."""
+    if not doc_names:
+        return 0
+    placeholders = ', '.join(['?'] * len(doc_names))
+    cursor.execute(
+        f"SELECT COUNT(*) FROM project_documents WHERE project_id = ? AND has_file = 1 AND doc_name IN ({placeholders})",
+        [project_id] + list(doc_names)
+    )
+    return cursor.fetchone()[0]
+
 # --- Fungsi Manajemen Proyek ---
-def load_df():
-    conn = get_conn()
-    df = pd.read_sql_query("SELECT * FROM projects", conn)
-    
-    # Load preferensi delegasi
-    preferences_df = pd.read_sql_query("SELECT doc_name, delegated_to FROM preferences", conn)
-    conn.close()
-    
-    # Buat dictionary untuk mapping preferensi (support multiple users)
-    preferences_map = {}
-    if not preferences_df.empty:
-        for _, pref in preferences_df.iterrows():
-            try:
-                # Parse JSON untuk multiple users
-                users_list = json.loads(pref['delegated_to']) if pref['delegated_to'] else []
-                if isinstance(users_list, str):
-                    users_list = [users_list]
-                users_str = ", ".join(users_list) if users_list else None
-                preferences_map[pref['doc_name']] = users_str
-            except (json.JSONDecodeError, TypeError):
-                # Fallback ke string biasa jika bukan JSON
-                preferences_map[pref['doc_name']] = pref['delegated_to']
-    
-    current_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-    if df.empty:
-        return pd.DataFrame(columns=BASE_COLUMNS + current_docs)
+# Tabel yang menentukan isi load_df(); perubahan di salah satunya menginvalidasi cache
+PROJECT_FRAME_TABLES = ('projects', 'project_documents', 'preferences', 'dynamic_docs')
 
-    display_rows = []
-    for _, r in df.iterrows():
-        row = {
-            'NO': r['id'],
-            'ITEM': r['item'],
-            'PART NO': r['part_no'],
-            'PROJECT': r['project'],
-            'CUSTOMER': r.get('customer', 'N/A'),
-            'STATUS': r.get('status', 'N/A'),
-            'PIC': r.get('pic', 'N/A'),
-            'PROJECT START DATE': r.get('project_start_date', 'N/A'),
-            'PROJECT END DATE': r.get('project_end_date', 'N/A')
-        }
-        for col in current_docs:
-            key = col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-            
-            if col in MULTIPLE_FILE_DOCS:
-                raw_paths = r.get(f"{key}_paths")
-                if raw_paths is None or raw_paths == "":
-                    paths = []
-                else:
-                    try:
-                        paths = json.loads(raw_paths)
-                    except json.JSONDecodeError:
-                        paths = []
-                doc_status = "✅ Lengkap" if paths else "⏳ Belum Selesai"
-                delegated_json = r.get(f"{key}_delegated_to_list")
-                try:
-                    delegated_list = json.loads(delegated_json) if delegated_json else []
-                except json.JSONDecodeError:
-                    delegated_list = []
-                
-                # Fallback ke single delegated_to jika list kosong
-                if not delegated_list:
-                    single_delegated = r.get(f"{key}_delegated_to", None)
-                    if single_delegated and single_delegated != "None":
-                        delegated_list = [single_delegated]
-                
-                # Fallback ke preferensi default jika masih kosong
-                if not delegated_list:
-                    pref_value = preferences_map.get(col, None)
-                    if pref_value and pref_value != "None":
-                        # Pref value bisa berupa string comma-separated
-                        delegated_list = [u.strip() for u in pref_value.split(',')] if ',' in pref_value else [pref_value]
-                
-                delegated_display = ", ".join(delegated_list) if delegated_list else "N/A"
-                
-                row[col] = {
-                    'paths': paths,
-                    'status': doc_status,
-                    'delegated_to': delegated_display,
-                    'delegated_to_list': delegated_list,
-                    'start_date': r.get(f"{key}_start_date", r.get('project_start_date')), 
-                    'end_date': r.get(f"{key}_end_date", r.get('project_end_date'))
+def _decode_json_lists(values):
+    """
+    Decode kolom JSON list sekaligus: nilai non-kosong digabung menjadi satu array JSON
+    dan di-parse dengan satu json.loads. Jika ada nilai rusak, fallback per item.
+    """
+    values = list(values)
+    present = [i for i, v in enumerate(values) if v is not None and v != ""]
+    decoded = [[] for _ in values]
+    if not present:
+        return decoded
+    try:
+        parsed = json.loads('[' + ','.join(values[i] for i in present) + ']')
+        if len(parsed) != len(present):
+            raise ValueError("jumlah elemen tidak cocok")
+    except (json.JSONDecodeError, TypeError, ValueError):
+        parsed = [_parse_json_list(values[i]) for i in present]
+    for i, value in zip(present, parsed):
+        if isinstance(value, str):
+            value = [value]
+        decoded[i] = value if isinstance(value, list) else []
+    return decoded
+
+def _load_preference_lists(conn):
+    """Preferensi delegasi per dokumen sebagai list nama (kosong/'None' diabaikan)."""
+    pref_lists = {}
+    for doc_name, raw in conn.execute("SELECT doc_name, delegated_to FROM preferences"):
+        try:
+            # Parse JSON untuk multiple users
+            users_list = json.loads(raw) if raw else []
+            if isinstance(users_list, str):
+                users_list = [users_list]
+            pref_value = ", ".join(users_list) if users_list else None
+        except (json.JSONDecodeError, TypeError):
+            # Fallback ke string biasa jika bukan JSON
+            pref_value = raw
+        if pref_value and pref_value != "None":
+            # Pref value bisa berupa string comma-separated
+            pref_lists[doc_name] = [u.strip() for u in pref_value.split(',')] if ',' in pref_value else [pref_value]
+    return pref_lists
+
+@contextmanager
+def _gc_paused():
+    """Matikan cyclic GC sementara saat membangun ratusan ribu dict/list kecil sekaligus."""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+def _build_project_frame(conn):
+    """
+    Bangun DataFrame tampilan proyek secara kolom: satu query per tabel, JSON di-decode
+    sekaligus, lalu setiap kolom dokumen dibentuk dari array yang sudah disejajarkan.
+    """
+    with _gc_paused():
+        return _build_project_frame_columns(conn)
+
+def _build_project_frame_columns(conn):
+    doc_types = load_doc_type_registry(conn)
+    projects = pd.read_sql_query(
+        "SELECT id, item, part_no, project, customer, status, pic, project_start_date, project_end_date FROM projects",
+        conn
+    )
+    if projects.empty:
+        return pd.DataFrame(columns=BASE_COLUMNS + list(doc_types.names))
+
+    doc_rows = conn.execute(
+        f"SELECT project_id, doc_name, {', '.join(PROJECT_DOCUMENT_FIELDS)} FROM project_documents"
+    ).fetchall()
+    pref_lists = _load_preference_lists(conn)
+
+    # Transpose sekali ke kolom, decode JSON per kolom (bukan per sel)
+    if doc_rows:
+        (doc_pids, doc_names, file_path_col, file_paths_col, upload_date_col,
+         delegated_col, delegated_list_col, start_col, end_col) = zip(*doc_rows)
+    else:
+        doc_pids = doc_names = file_path_col = file_paths_col = upload_date_col = ()
+        delegated_col = delegated_list_col = start_col = end_col = ()
+    file_paths_col = _decode_json_lists(file_paths_col)
+    # Delegasi: list -> fallback single delegated_to
+    delegated_list_col = [
+        lst if lst else ([single] if single and single != "None" else [])
+        for lst, single in zip(_decode_json_lists(delegated_list_col), delegated_col)
+    ]
+
+    # Kelompokkan indeks baris dokumen per doc_name, dengan posisi baris proyeknya
+    project_pos = {pid: i for i, pid in enumerate(projects['id'].tolist())}
+    docs_by_name = {}
+    for row_idx, (pid, name) in enumerate(zip(doc_pids, doc_names)):
+        pos = project_pos.get(pid)
+        if pos is not None:
+            docs_by_name.setdefault(name, []).append((pos, row_idx))
+
+    n = len(projects)
+    columns = {
+        'NO': projects['id'],
+        'ITEM': projects['item'],
+        'PART NO': projects['part_no'],
+        'PROJECT': projects['project'],
+        'CUSTOMER': projects['customer'],
+        'STATUS': projects['status'],
+        'PIC': projects['pic'],
+        'PROJECT START DATE': projects['project_start_date'],
+        'PROJECT END DATE': projects['project_end_date'],
+    }
+    for doc_type in doc_types:
+        col = doc_type.name
+        is_multiple = doc_type.is_multiple
+        paths = [None] * n
+        dates = [None] * n
+        delegates = [None] * n
+        starts = [None] * n
+        ends = [None] * n
+
+        path_source = file_paths_col if is_multiple else file_path_col
+        for pos, row_idx in docs_by_name.get(col, ()):
+            paths[pos] = path_source[row_idx]
+            dates[pos] = upload_date_col[row_idx]
+            delegates[pos] = delegated_list_col[row_idx]
+            starts[pos] = start_col[row_idx]
+            ends[pos] = end_col[row_idx]
+
+        # Fallback ke preferensi default jika delegasi masih kosong
+        pref = pref_lists.get(col, [])
+        delegates = [d if d else list(pref) for d in delegates]
+        displays = [", ".join(d) if d else "N/A" for d in delegates]
+
+        if is_multiple:
+            columns[col] = [
+                {
+                    'paths': p or [],
+                    'status': "✅ Lengkap" if p else "⏳ Belum Selesai",
+                    'delegated_to': disp,
+                    'delegated_to_list': d,
+                    'start_date': sd,
+                    'end_date': ed
                 }
-            else:
-                path = r.get(f"{key}_path", None)
-                doc_status = "✅ Lengkap" if path else "⏳ Belum Selesai"
-                delegated_json = r.get(f"{key}_delegated_to_list")
-                try:
-                    delegated_list = json.loads(delegated_json) if delegated_json else []
-                except json.JSONDecodeError:
-                    delegated_list = []
-                
-                # Fallback ke single delegated_to jika list kosong
-                if not delegated_list:
-                    single_delegated = r.get(f"{key}_delegated_to", None)
-                    if single_delegated and single_delegated != "None":
-                        delegated_list = [single_delegated]
-                
-                # Fallback ke preferensi default jika masih kosong
-                if not delegated_list:
-                    pref_value = preferences_map.get(col, None)
-                    if pref_value and pref_value != "None":
-                        # Pref value bisa berupa string comma-separated
-                        delegated_list = [u.strip() for u in pref_value.split(',')] if ',' in pref_value else [pref_value]
-                
-                delegated_display = ", ".join(delegated_list) if delegated_list else "N/A"
-                
-                row[col] = {
-                    'path': path, 
-                    'date': r.get(f"{key}_date", None), 
-                    'status': doc_status,
-                    'delegated_to': delegated_display,
-                    'delegated_to_list': delegated_list,
-                    'start_date': r.get(f"{key}_start_date", r.get('project_start_date')), 
-                    'end_date': r.get(f"{key}_end_date", r.get('project_end_date'))
+                for p, d, disp, sd, ed in zip(paths, delegates, displays, starts, ends)
+            ]
+        else:
+            columns[col] = [
+                {
+                    'path': p,
+                    'date': dt,
+                    'status': "✅ Lengkap" if p else "⏳ Belum Selesai",
+                    'delegated_to': disp,
+                    'delegated_to_list': d,
+                    'start_date': sd,
+                    'end_date': ed
                 }
-        display_rows.append(row)
-    
-    display_df = pd.DataFrame(display_rows)
-    return display_df
+                for p, dt, d, disp, sd, ed in zip(paths, dates, delegates, displays, starts, ends)
+            ]
+
+    return pd.DataFrame(columns)
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_project_frame(versions):
+    with db_connection() as conn:
+        return _build_project_frame(conn)
+
+def load_df():
+    """
+    DataFrame tampilan proyek (sel dokumen berupa dict). Hasil di-cache lintas sesi
+    dan dikunci pada counter data_version, jadi data yang tidak berubah tidak di-parse ulang.
+    Sel dict dipakai bersama antar sesi: baca saja, jangan diubah.
+    """
+    frame = _cached_project_frame(get_data_versions(PROJECT_FRAME_TABLES))
+    return frame.copy(deep=False)
+
+def _build_project_frame_rowwise(conn):
+    """Implementasi lama (iterrows + json.loads per sel). Hanya dipakai benchmark_load_df sebagai pembanding."""
+    df = pd.read_sql_query("SELECT id, item, part_no, project, customer, status, pic, project_start_date, project_end_date FROM projects", conn)
+    doc_rows = conn.execute(f"SELECT project_id, doc_name, {', '.join(PROJECT_DOCUMENT_FIELDS)}, 0 FROM project_documents").fetchall()
+    pref_lists = _load_preference_lists(conn)
+    doc_types = load_doc_type_registry(conn)
+    documents = {(row[0], row[1]): _project_document_from_row(row[2:]) for row in doc_rows}
+    display_rows = []
+    for _, r in df.iterrows():
+        row = {'NO': r['id'], 'ITEM': r['item'], 'PART NO': r['part_no'], 'PROJECT': r['project'],
+               'CUSTOMER': r['customer'], 'STATUS': r['status'], 'PIC': r['pic'],
+               'PROJECT START DATE': r['project_start_date'], 'PROJECT END DATE': r['project_end_date']}
+        for doc_type in doc_types:
+            col = doc_type.name
+            doc = documents.get((r['id'], col), _empty_project_document())
+            delegated_list = doc['delegated_to_list'] or ([doc['delegated_to']] if doc['delegated_to'] and doc['delegated_to'] != "None" else [])
+            delegated_list = delegated_list or list(pref_lists.get(col, []))
+            delegated_display = ", ".join(delegated_list) if delegated_list else "N/A"
+            if doc_type.is_multiple:
+                row[col] = {'paths': doc['file_paths'], 'status': "✅ Lengkap" if doc['file_paths'] else "⏳ Belum Selesai",
+                            'delegated_to': delegated_display, 'delegated_to_list': delegated_list,
+                            'start_date': doc['start_date'], 'end_date': doc['end_date']}
+            else:
+                row[col] = {'path': doc['file_path'], 'date': doc['upload_date'],
+                            'status': "✅ Lengkap" if doc['file_path'] else "⏳ Belum Selesai",
+                            'delegated_to': delegated_display, 'delegated_to_list': delegated_list,
+                            'start_date': doc['start_date'], 'end_date': doc['end_date']}
+        display_rows.append(row)
+    return pd.DataFrame(display_rows)
+
+def benchmark_load_df(n_projects=5000, n_docs=30, fill_ratio=0.6, seed=42):
+    """
+    Benchmark load_df pada database sintetis in-memory (n_projects x n_docs).
+    Membandingkan implementasi row-wise lama, build kolom-wise, dan cache hit.
+    """
+    import random
+    rng = random.Random(seed)
+    conn = sqlite3.connect(":memory:")
+    run_migrations(conn)
+
+    extra_docs = [f"DOC TAMBAHAN {i}" for i in range(max(0, n_docs - len(DEFAULT_DOC_COLUMNS)))]
+    conn.executemany("INSERT INTO dynamic_docs (name) VALUES (?)", [(d,) for d in extra_docs])
+    doc_types = load_doc_type_registry(conn).types[:n_docs]
+    all_docs = [doc_type.name for doc_type in doc_types]
+    conn.executemany(
+        "INSERT INTO projects (id, item, part_no, project, customer, status, pic, project_start_date, project_end_date) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i, f"ITEM {i}", f"PN-{i:05d}", f"PROJECT {i % 50}", f"CUST {i % 7}", rng.choice(PROJECT_STATUS),
+          f"PIC {i % 13}", '01-01-2025', '31-12-2025') for i in range(1, n_projects + 1)]
+    )
+    conn.execute("INSERT INTO preferences (doc_name, delegated_to) VALUES (?, ?)", (all_docs[0], json.dumps(["PIC 1"])))
+    doc_rows = []
+    for pid in range(1, n_projects + 1):
+        for doc_type in doc_types:
+            doc = doc_type.name
+            if rng.random() > fill_ratio:
+                continue
+            delegates = json.dumps([f"PIC {rng.randrange(13)}"]) if rng.random() < 0.5 else None
+            if doc_type.is_multiple:
+                doc_rows.append((pid, doc, None, json.dumps([f"files/project_{pid}/a.pdf", f"files/project_{pid}/b.pdf"]),
+                                 None, None, delegates, None, None, 1))
+            else:
+                doc_rows.append((pid, doc, f"files/project_{pid}/{doc}.pdf", None, '01-02-2025',
+                                 None, delegates, '01-01-2025', None, 1))
+    conn.executemany(
+        "INSERT INTO project_documents (project_id, doc_name, file_path, file_paths, upload_date, delegated_to, "
+        "delegated_to_list, start_date, end_date, has_file) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        doc_rows
+    )
+    conn.commit()
+
+    start = time.perf_counter()
+    legacy = _build_project_frame_rowwise(conn)
+    rowwise_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame = _build_project_frame(conn)
+    columnar_s = time.perf_counter() - start
+
+    # Cache hit = baca counter versi + shallow copy frame yang sudah ada
+    start = time.perf_counter()
+    conn.execute("SELECT table_name, version FROM data_version").fetchall()
+    frame.copy(deep=False)
+    cached_s = time.perf_counter() - start
+
+    identical = legacy.astype(str).equals(frame.astype(str))
+    conn.close()
+    return {
+        'projects': n_projects,
+        'doc_types': len(all_docs),
+        'document_rows': len(doc_rows),
+        'rowwise_s': round(rowwise_s, 3),
+        'columnar_s': round(columnar_s, 3),
+        'cached_ms': round(cached_s * 1000, 3),
+        'speedup_columnar': round(rowwise_s / columnar_s, 1) if columnar_s else None,
+        'speedup_cached': round(rowwise_s / cached_s) if cached_s else None,
+        'identical_output': identical,
+    }
 
 def insert_row(item, part_no, project, customer, status, pic, project_start_date, project_end_date, user_id):
     conn = get_conn()
@@ -1639,18 +2505,16 @@ def insert_row(item, part_no, project, customer, status, pic, project_start_date
                 delegates = json.loads(raw) if isinstance(raw, str) else (raw or [])
             except json.JSONDecodeError:
                 delegates = [raw] if raw else []
-            key = doc_name.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-            delegated_json = json.dumps(delegates) if delegates else None
-            delegated_single = delegates[0] if delegates else None
-            c.execute(f"UPDATE projects SET {key}_delegated_to = ?, {key}_delegated_to_list = ? WHERE id = ?", (delegated_single, delegated_json, new_project_id))
+            if isinstance(delegates, str):
+                delegates = [delegates]
+            save_project_document(c, new_project_id, doc_name,
+                                  delegated_to=delegates[0] if delegates else None,
+                                  delegated_to_list=delegates)
         # commit setelah seluruh update preferensi
-        conn.commit()
     except Exception as e:
         # Jangan gagalkan penambahan proyek bila preferensi gagal
-        conn.commit()
         st.warning(f"Preferensi delegasi gagal diterapkan: {e}")
 
-    conn.close()
     log_audit(user_id, "menambah proyek", {
         "project_id": int(new_project_id),
         "project_name": project,
@@ -1658,7 +2522,10 @@ def insert_row(item, part_no, project, customer, status, pic, project_start_date
         "part_no": part_no,
         "customer": customer,
         "pic": pic
-    })
+    }, conn=conn)
+    # commit sekali: proyek, preferensi, dan audit log
+    conn.commit()
+    conn.close()
 
 def delete_row(row_id, user_id):
     conn = get_conn()
@@ -1666,30 +2533,31 @@ def delete_row(row_id, user_id):
     c.execute("SELECT project, item, part_no FROM projects WHERE id = ?", (row_id,))
     result = c.fetchone()
     project_name, item, part_no = result if result else ("N/A", "N/A", "N/A")
+    c.execute("DELETE FROM project_documents WHERE project_id = ?", (row_id,))
     c.execute("DELETE FROM projects WHERE id = ?", (row_id,))
-    conn.commit()
-    conn.close()
     log_audit(user_id, "menghapus proyek", {
         "project_id": int(row_id),
         "project_name": project_name,
         "item": item,
         "part_no": part_no
-    })
+    }, conn=conn)
+    conn.commit()
+    conn.close()
 
 def update_row(row_id, item, part_no, project, customer, status, pic, project_start_date, project_end_date, user_id):
     conn = get_conn()
     c = conn.cursor()
     sql = "UPDATE projects SET item = ?, part_no = ?, project = ?, customer = ?, status = ?, pic = ?, project_start_date = ?, project_end_date = ? WHERE id = ?"
     c.execute(sql, (item, part_no, project, customer, status, pic, project_start_date, project_end_date, row_id))
-    conn.commit()
-    conn.close()
     log_audit(user_id, "mengedit proyek", {
         "project_id": int(row_id),
         "project_name": project,
         "item": item,
         "part_no": part_no,
         "status": status
-    })
+    }, conn=conn)
+    conn.commit()
+    conn.close()
 
 def update_row_delegation(row_id, doc_col, delegated_to, start_date, end_date, user_id):
     conn = get_conn()
@@ -1702,8 +2570,6 @@ def update_row_delegation(row_id, doc_col, delegated_to, start_date, end_date, u
     item = proj_row[1] if proj_row else None
     part_no = proj_row[2] if proj_row else None
     
-    key = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-    
     # Normalisasi ke list
     if isinstance(delegated_to, list):
         delegated_list = [d for d in delegated_to if d]
@@ -1711,163 +2577,232 @@ def update_row_delegation(row_id, doc_col, delegated_to, start_date, end_date, u
         delegated_list = [delegated_to]
     else:
         delegated_list = []
-    delegated_json = json.dumps(delegated_list) if delegated_list else None
-    delegated_single = delegated_list[0] if delegated_list else None
 
-    sql = f"UPDATE projects SET {key}_delegated_to = ?, {key}_delegated_to_list = ?, {key}_start_date = ?, {key}_end_date = ? WHERE id = ?"
-    c.execute(sql, (delegated_single, delegated_json, start_date, end_date, row_id))
-    conn.commit()
-    conn.close()
+    save_project_document(c, row_id, doc_col,
+                          delegated_to=delegated_list[0] if delegated_list else None,
+                          delegated_to_list=delegated_list,
+                          start_date=start_date, end_date=end_date)
     
     # Hanya log jika ada perubahan delegasi
     if delegated_list:
-        log_audit(user_id, "mendelegasikan dokumen", {"project_id": int(row_id), "project_name": project_name, "item": item, "part_no": part_no, "doc_column": doc_col, "delegated_to": delegated_list, "start_date": start_date, "end_date": end_date})
+        log_audit(user_id, "mendelegasikan dokumen", {"project_id": int(row_id), "project_name": project_name, "item": item, "part_no": part_no, "doc_column": doc_col, "delegated_to": delegated_list, "start_date": start_date, "end_date": end_date}, conn=conn)
+    conn.commit()
+    conn.close()
 
-def check_and_update_project_status(project_id, user_id):
+def update_project_status_if_complete(project_id, user_id):
     """
     Mengecek kelengkapan semua dokumen dalam proyek.
     Jika semua dokumen sudah terisi/lengkap, otomatis update status menjadi 'Done'.
+    Tidak menulis ke UI (aman dari worker job); error dilempar ke pemanggil.
+    Returns: True jika status proyek baru saja diubah menjadi 'Done'.
     """
-    conn = get_conn()
-    c = conn.cursor()
-    
-    try:
+    with db_connection() as conn:
+        c = conn.cursor()
+        
         # Get current project status
         c.execute("SELECT status FROM projects WHERE id = ?", (project_id,))
         result = c.fetchone()
-        if not result:
-            conn.close()
-            return
+        # Skip jika proyek tidak ada, sudah Done atau Canceled
+        if not result or result[0] in ['Done', 'Canceled']:
+            return False
         
         current_status = result[0]
         
-        # Skip jika sudah Done atau Canceled
-        if current_status in ['Done', 'Canceled']:
-            conn.close()
-            return
-        
         # Get all document columns
-        all_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
+        all_docs = get_doc_registry().names
         
-        # Check completeness
-        all_complete = True
-        
-        for doc_col in all_docs:
-            key = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-            
-            if doc_col in MULTIPLE_FILE_DOCS:
-                # Check multiple file documents
-                c.execute(f"SELECT {key}_paths FROM projects WHERE id = ?", (project_id,))
-                res = c.fetchone()
-                if res and res[0]:
-                    try:
-                        paths = json.loads(res[0])
-                        if not paths:  # Empty list
-                            all_complete = False
-                            break
-                    except (json.JSONDecodeError, TypeError):
-                        all_complete = False
-                        break
-                else:
-                    all_complete = False
-                    break
-            else:
-                # Check single file documents
-                c.execute(f"SELECT {key}_path FROM projects WHERE id = ?", (project_id,))
-                res = c.fetchone()
-                if not res or not res[0]:
-                    all_complete = False
-                    break
+        # Check completeness - satu query terindeks di project_documents
+        if count_completed_documents(c, project_id, all_docs) != len(all_docs):
+            return False
         
-        # Update status jika semua dokumen lengkap
-        if all_complete and current_status != 'Done':
-            c.execute("UPDATE projects SET status = ? WHERE id = ?", ('Done', project_id))
-            conn.commit()
-            log_audit(user_id, "auto-update status proyek", {
-                "project_id": project_id, 
-                "old_status": current_status, 
-                "new_status": "Done",
-                "reason": "Semua dokumen lengkap"
-            })
-            
+        c.execute("UPDATE projects SET status = ? WHERE id = ?", ('Done', project_id))
+        log_audit(user_id, "auto-update status proyek", {
+            "project_id": project_id, 
+            "old_status": current_status, 
+            "new_status": "Done",
+            "reason": "Semua dokumen lengkap"
+        }, conn=conn)
+        conn.commit()
+        return True
+
+def check_and_update_project_status(project_id, user_id):
+    """update_project_status_if_complete + notifikasi di UI (hanya dari thread script Streamlit)."""
+    try:
+        if update_project_status_if_complete(project_id, user_id):
             # Tampilkan notifikasi di UI
             st.success(f"🎉 **Proyek #{project_id} otomatis diubah menjadi Done!** Semua dokumen sudah lengkap.")
-    
     except Exception as e:
         st.warning(f"Gagal auto-update status: {e}")
-    finally:
-        conn.close()
 
 def approve_uploaded_file(row_id, doc_col, temp_path, user_id):
-    conn = get_conn()
-    c = conn.cursor()
-    
-    # Fetch project details for logging
-    c.execute("SELECT project, item, part_no FROM projects WHERE id = ?", (row_id,))
-    proj_row = c.fetchone()
-    project_name = proj_row[0] if proj_row else None
-    item = proj_row[1] if proj_row else None
-    part_no = proj_row[2] if proj_row else None
-    
-    key = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-    
-    # Check if this is a multiple file document
-    if doc_col in MULTIPLE_FILE_DOCS:
-        # For multiple file documents, add to existing paths JSON
-        c.execute(f"SELECT {key}_paths FROM projects WHERE id = ?", (row_id,))
-        current_paths_json = c.fetchone()[0]
-        
-        current_paths = []
-        if current_paths_json:
-            try:
-                current_paths = json.loads(current_paths_json)
-            except json.JSONDecodeError:
-                current_paths = []
-        
-        # Add new file to paths - gunakan relative path
-        current_paths.append(get_relative_path(temp_path))
-        
-        # Update projects table with new paths
-        sql = f"UPDATE projects SET {key}_paths = ? WHERE id = ?"
-        c.execute(sql, (json.dumps(current_paths), row_id))
-        
-        # Delete pending entry from revision_history
-        c.execute("DELETE FROM revision_history WHERE project_id = ? AND doc_column = ? AND revision_number = -1 AND file_path = ?", 
-                  (row_id, doc_col, temp_path))
-        
-    else:
-        # For single file documents, use revision system
-        c.execute("SELECT MAX(revision_number) FROM revision_history WHERE project_id = ? AND doc_column = ?", (row_id, doc_col))
-        max_rev = c.fetchone()[0]
-        new_rev = (max_rev or 0) + 1
-        
-        # Hapus entry pending
-        c.execute("DELETE FROM revision_history WHERE project_id = ? AND doc_column = ? AND revision_number = -1", (row_id, doc_col))
+    """Setujui satu file pending (jalur yang sama dengan approve massal)."""
+    result = approve_pending_files(
+        [{'project_id': row_id, 'doc_column': doc_col, 'file_path': temp_path}], user_id
+    )
+    if result['errors']:
+        raise Exception(result['errors'][0]['error'])
+    for project_id in result['completed_projects']:
+        st.success(f"🎉 **Proyek #{project_id} otomatis diubah menjadi Done!** Semua dokumen sudah lengkap.")
 
-        # Update revision_history with the new revision number - gunakan relative path
-        relative_path = get_relative_path(temp_path)
-        c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by) VALUES (?, ?, ?, ?, ?, ?)",
-                  (row_id, doc_col, new_rev, relative_path, datetime.datetime.now().isoformat(), st.session_state['user_id']))
+BULK_APPROVAL_CHUNK = 200  # proyek per transaksi
 
-        # Update projects table with the new file path and date
-        sql = f"UPDATE projects SET {key}_path = ?, {key}_date = ? WHERE id = ?"
-        c.execute(sql, (relative_path, datetime.date.today().strftime('%d-%m-%Y'), row_id))
+def approve_pending_files(items, user_id, progress_callback=None, chunk_size=BULK_APPROVAL_CHUNK):
+    """
+    Setujui banyak file pending sekaligus.
+    items: list dict {'project_id', 'doc_column', 'file_path', 'timestamp' (opsional)}.
 
-    conn.commit()
-    conn.close()
-    
-    log_audit(user_id, "menyetujui dokumen", {
-        "project_id": int(row_id), 
-        "project_name": project_name, 
-        "item": item, 
-        "part_no": part_no, 
-        "doc_column": doc_col, 
-        "approved_file": temp_path,
-        "is_multiple_file_doc": doc_col in MULTIPLE_FILE_DOCS
-    })
-    
-    # Auto-update status jika semua dokumen lengkap
-    check_and_update_project_status(row_id, user_id)
+    Item dikelompokkan per proyek dan diproses per chunk proyek dalam satu transaksi:
+    nomor revisi, path dokumen, audit log, dan status proyek (sekali per proyek).
+    progress_callback(selesai, total) dipanggil setelah setiap chunk.
+    """
+    result = {'approved': 0, 'failed': 0, 'projects': 0, 'completed_projects': [], 'errors': []}
+    if not items:
+        return result
+
+    by_project = {}
+    for item in items:
+        by_project.setdefault(int(item['project_id']), []).append(item)
+    project_ids = list(by_project)
+    doc_types = get_doc_registry()
+    total = len(items)
+    processed = 0
+
+    for start in range(0, len(project_ids), chunk_size):
+        chunk = project_ids[start:start + chunk_size]
+        chunk_count = sum(len(by_project[pid]) for pid in chunk)
+        try:
+            with db_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    missing, completed = _approve_pending_chunk(conn, chunk, by_project, doc_types, user_id)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            missing_count = sum(len(by_project[pid]) for pid in missing)
+            for pid in missing:
+                result['errors'].append({'project_id': pid, 'error': f"Proyek #{pid} tidak ditemukan"})
+            result['approved'] += chunk_count - missing_count
+            result['failed'] += missing_count
+            result['projects'] += len(chunk) - len(missing)
+            result['completed_projects'].extend(completed)
+        except Exception as e:
+            result['failed'] += chunk_count
+            result['errors'].extend({'project_id': pid, 'error': str(e)} for pid in chunk)
+        processed += chunk_count
+        if progress_callback:
+            progress_callback(processed, total)
+    return result
+
+def _approve_pending_chunk(conn, project_ids, by_project, doc_types, user_id):
+    """Satu transaksi approve untuk sekumpulan proyek. Mengembalikan (proyek_hilang, proyek_jadi_done)."""
+    c = conn.cursor()
+    placeholders = ', '.join(['?'] * len(project_ids))
+    projects = {
+        row[0]: row[1:]
+        for row in c.execute(f"SELECT id, project, item, part_no, status FROM projects WHERE id IN ({placeholders})", project_ids)
+    }
+    missing = [pid for pid in project_ids if pid not in projects]
+    project_ids = [pid for pid in project_ids if pid in projects]
+    if not project_ids:
+        return missing, []
+    placeholders = ', '.join(['?'] * len(project_ids))
+
+    # Satu query untuk revisi terakhir dan path dokumen semua proyek di chunk
+    max_revs = {
+        (pid, doc): rev for pid, doc, rev in c.execute(
+            f"SELECT project_id, doc_column, MAX(revision_number) FROM revision_history "
+            f"WHERE project_id IN ({placeholders}) GROUP BY project_id, doc_column", project_ids)
+    }
+    current_paths = {
+        (pid, doc): _parse_json_list(paths) for pid, doc, paths in c.execute(
+            f"SELECT project_id, doc_name, file_paths FROM project_documents WHERE project_id IN ({placeholders})", project_ids)
+    }
+
+    # Checksum dari baris pending ikut pindah ke baris revisi yang disetujui;
+    # kunci alias auto upload dicatat sebagai alias terkonfirmasi
+    checksums = {}
+    alias_keys = {}
+    for path, sha256, size, alias_part_name, alias_part_no in c.execute(
+            f"SELECT file_path, file_sha256, file_size, alias_part_name, alias_part_no FROM revision_history "
+            f"WHERE revision_number = -1 AND project_id IN ({placeholders})", project_ids):
+        checksums[path] = (sha256, size)
+        if alias_part_name is not None:
+            alias_keys[path] = (alias_part_name, alias_part_no or "")
+
+    now = datetime.datetime.now().isoformat()
+    today = datetime.date.today().strftime('%d-%m-%Y')
+    delete_pending_file = []
+    delete_pending_doc = []
+    insert_revisions = []
+    confirmed_aliases = []
+    for pid in project_ids:
+        project_name, item, part_no, _ = projects[pid]
+        by_doc = {}
+        for pending in by_project[pid]:
+            by_doc.setdefault(pending['doc_column'], []).append(pending)
+        for doc_col, pendings in by_doc.items():
+            # Yang paling baru diunggah menjadi file aktif
+            pendings.sort(key=lambda p: p.get('timestamp') or '')
+            is_multiple = doc_types.is_multiple(doc_col)
+            if is_multiple:
+                paths = list(current_paths.get((pid, doc_col), []))
+                for pending in pendings:
+                    paths.append(get_relative_path(pending['file_path']))
+                    delete_pending_file.append((pid, doc_col, pending['file_path']))
+                save_project_document(c, pid, doc_col, file_paths=paths)
+            else:
+                max_rev = max_revs.get((pid, doc_col))
+                for pending in pendings:
+                    new_rev = (max_rev or 0) + 1
+                    max_rev = new_rev
+                    relative_path = get_relative_path(pending['file_path'])
+                    insert_revisions.append((pid, doc_col, new_rev, relative_path, now, user_id,
+                                             *checksums.get(pending['file_path'], (None, None))))
+                delete_pending_doc.append((pid, doc_col))
+                save_project_document(c, pid, doc_col, file_path=relative_path, upload_date=today)
+            for pending in pendings:
+                if pending['file_path'] in alias_keys:
+                    confirmed_aliases.append((*alias_keys[pending['file_path']], doc_col, pid))
+                log_audit(user_id, "menyetujui dokumen", {
+                    "project_id": pid,
+                    "project_name": project_name,
+                    "item": item,
+                    "part_no": part_no,
+                    "doc_column": doc_col,
+                    "approved_file": pending['file_path'],
+                    "is_multiple_file_doc": is_multiple
+                }, conn=conn)
+
+    c.executemany("DELETE FROM revision_history WHERE project_id = ? AND doc_column = ? AND revision_number = -1 AND file_path = ?",
+                  delete_pending_file)
+    c.executemany("DELETE FROM revision_history WHERE project_id = ? AND doc_column = ? AND revision_number = -1",
+                  delete_pending_doc)
+    c.executemany("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by, file_sha256, file_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                  insert_revisions)
+    record_upload_aliases(conn, confirmed_aliases, user_id)
+
+    # Status proyek dihitung ulang sekali per proyek (satu query untuk seluruh chunk)
+    completed = []
+    all_docs = doc_types.names
+    if all_docs:
+        doc_placeholders = ', '.join(['?'] * len(all_docs))
+        filled = c.execute(
+            f"SELECT project_id, COUNT(*) FROM project_documents WHERE project_id IN ({placeholders}) "
+            f"AND has_file = 1 AND doc_name IN ({doc_placeholders}) GROUP BY project_id",
+            project_ids + list(all_docs)
+        ).fetchall()
+        completed = [pid for pid, count in filled
+                     if count == len(all_docs) and projects[pid][3] not in ('Done', 'Canceled')]
+    c.executemany("UPDATE projects SET status = 'Done' WHERE id = ?", [(pid,) for pid in completed])
+    for pid in completed:
+        log_audit(user_id, "auto-update status proyek", {
+            "project_id": pid,
+            "old_status": projects[pid][3],
+            "new_status": "Done",
+            "reason": "Semua dokumen lengkap"
+        }, conn=conn)
+    return missing, completed
     
 def reject_uploaded_file(project_id, doc_column, file_path, user_id):
     conn = get_conn()
@@ -1880,9 +2815,18 @@ def reject_uploaded_file(project_id, doc_column, file_path, user_id):
     item = proj_row[1] if proj_row else None
     part_no = proj_row[2] if proj_row else None
 
+    # File auto upload ditolak: alias yang mengarahkannya ke proyek ini tidak lagi dipercaya
+    c.execute(
+        "DELETE FROM upload_aliases WHERE project_id = ? AND doc_type = ? AND (part_name_key, part_no_key) IN ("
+        "SELECT alias_part_name, COALESCE(alias_part_no, '') FROM revision_history "
+        "WHERE project_id = ? AND doc_column = ? AND file_path = ? AND alias_part_name IS NOT NULL)",
+        (project_id, doc_column, project_id, doc_column, file_path)
+    )
     # Hapus entri dari revision_history
     c.execute("DELETE FROM revision_history WHERE project_id = ? AND doc_column = ? AND file_path = ?",
               (project_id, doc_column, file_path))
+    c.execute("DELETE FROM file_metadata WHERE file_path = ?", (file_path,))
+    cas_release(file_path, conn)
     
     # Hapus file fisik dari direktori
     try:
@@ -1890,9 +2834,9 @@ def reject_uploaded_file(project_id, doc_column, file_path, user_id):
     except OSError as e:
         st.warning(f"Gagal menghapus file fisik: {e}")
     
+    log_audit(user_id, "menolak dokumen", {"project_id": int(project_id), "project_name": project_name, "item": item, "part_no": part_no, "doc_column": doc_column, "rejected_file": file_path}, conn=conn)
     conn.commit()
     conn.close()
-    log_audit(user_id, "menolak dokumen", {"project_id": int(project_id), "project_name": project_name, "item": item, "part_no": part_no, "doc_column": doc_column, "rejected_file": file_path})
 
 
 def cancel_pending_file(project_id, doc_column, user_id):
@@ -1926,10 +2870,12 @@ def cancel_pending_file(project_id, doc_column, user_id):
                     "DELETE FROM revision_history WHERE project_id = ? AND doc_column = ? AND revision_number = -1 AND file_path = ?",
                     (project_id, doc_column, file_path)
                 )
+                c.execute("DELETE FROM file_metadata WHERE file_path = ?", (file_path,))
+                cas_release(file_path, conn)
 
+        log_audit(user_id, "membatalkan pengajuan dokumen", {"project_id": project_id, "doc_column": doc_column}, conn=conn)
         conn.commit()
         conn.close()
-        log_audit(user_id, "membatalkan pengajuan dokumen", {"project_id": project_id, "doc_column": doc_column})
         return True
     except Exception as e:
         conn.close()
@@ -1949,24 +2895,23 @@ def upload_file_and_save_as_pending(project_id, doc_column, uploaded_file, user_
     part_no = proj_row[2] if proj_row else None
 
     dest_dir = FILES_DIR / f"project_{project_id}" / "temp_uploads"
-    dest_dir.mkdir(parents=True, exist_ok=True)
     
     safe_name = uploaded_file.name
     dest_path = dest_dir / f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{safe_name}"
     
-    with open(dest_path, "wb") as f:
-        shutil.copyfileobj(uploaded_file, f)
+    stored = ingest_upload(uploaded_file, dest_path, conn=conn)
     
     # Simpan sebagai relative path untuk kompatibilitas intranet
-    relative_path = get_relative_path(dest_path)
+    relative_path = stored['relative_path']
     
-    c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by) VALUES (?, ?, ?, ?, ?, ?)",
-              (project_id, doc_column, -1, relative_path, datetime.datetime.now().isoformat(), user_id))
+    c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by, file_sha256, file_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+              (project_id, doc_column, -1, relative_path, datetime.datetime.now().isoformat(), user_id, stored['sha256'], stored['size']))
     
+    log_audit(user_id, "mengunggah file pending", {"project_id": int(project_id), "project_name": project_name, "item": item, "part_no": part_no, "doc_column": doc_column, "file_path": str(dest_path), "file_name": safe_name}, conn=conn)
     conn.commit()
     conn.close()
     
-    log_audit(user_id, "mengunggah file pending", {"project_id": int(project_id), "project_name": project_name, "item": item, "part_no": part_no, "doc_column": doc_column, "file_path": str(dest_path), "file_name": safe_name})
+    schedule_file_metadata([relative_path])
     
     return str(dest_path)
 
@@ -1981,34 +2926,22 @@ def upload_multiple_files_for_doc(project_id, doc_column, uploaded_files, user_i
     item = proj_row[1] if proj_row else None
     part_no = proj_row[2] if proj_row else None
     
-    key = doc_column.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-    
-    c.execute(f"SELECT {key}_paths FROM projects WHERE id = ?", (project_id,))
-    current_paths_json = c.fetchone()[0]
-
-    current_paths = []
-    if current_paths_json:
-        try:
-            current_paths = json.loads(current_paths_json)
-        except json.JSONDecodeError:
-            current_paths = []
-
+    current_paths = get_project_document(project_id, doc_column, cursor=c)['file_paths']
     
     new_paths = []
     
     for uploaded_file in uploaded_files:
-        dest_dir = FILES_DIR / f"project_{project_id}" / doc_column.replace(' ', '_')
-        dest_dir.mkdir(parents=True, exist_ok=True)
+        dest_dir = FILES_DIR / f"project_{project_id}" / doc_sql_key(doc_column)
         
         # Buat nama file unik dengan timestamp dan nama asli
         unique_name = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{uploaded_file.name}"
         dest_path = dest_dir / unique_name
         
-        with open(dest_path, "wb") as f:
-            shutil.copyfileobj(uploaded_file, f)
+        # Checksum & ukuran tercatat di file_blobs (dokumen multiple tidak punya baris revisi)
+        stored = ingest_upload(uploaded_file, dest_path, conn=conn)
         
         # Gunakan relative path untuk kompatibilitas intranet
-        new_paths.append(get_relative_path(dest_path))
+        new_paths.append(stored['relative_path'])
         
         log_audit(user_id, "mengunggah file", {
             "project_id": int(project_id),
@@ -2018,18 +2951,19 @@ def upload_multiple_files_for_doc(project_id, doc_column, uploaded_files, user_i
             "doc_column": doc_column,
             "file_name": uploaded_file.name,
             "file_path": str(dest_path)
-        })
+        }, conn=conn)
     
     # Gabungkan path baru dengan path lama
     updated_paths = current_paths + new_paths
     
-    # Simpan kembali ke database dalam format JSON
-    sql = f"UPDATE projects SET {key}_paths = ? WHERE id = ?"
-    c.execute(sql, (json.dumps(updated_paths), project_id))
+    # Simpan kembali ke database dalam format JSON; path dan semua audit log-nya satu commit
+    save_project_document(c, project_id, doc_column, file_paths=updated_paths)
     
     conn.commit()
     conn.close()
     
+    schedule_file_metadata(new_paths)
+    
     # Auto-update status jika semua dokumen lengkap
     check_and_update_project_status(project_id, user_id)
     
@@ -2047,21 +2981,14 @@ def delete_file_from_multiple_doc(project_id, doc_column, file_path, user_id):
     item = proj_row[1] if proj_row else None
     part_no = proj_row[2] if proj_row else None
     
-    key = doc_column.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
     try:
-        c.execute(f"SELECT {key}_paths, {key}_delegated_to FROM projects WHERE id = ?", (project_id,))
-        res = c.fetchone()
-        if not res:
+        if not proj_row:
             conn.close()
             st.error("Proyek tidak ditemukan.")
             return False
-        paths_json, delegated_to = res
-        current_paths = []
-        if paths_json:
-            try:
-                current_paths = json.loads(paths_json)
-            except json.JSONDecodeError:
-                current_paths = []
+        doc = get_project_document(project_id, doc_column, cursor=c)
+        current_paths = doc['file_paths']
+        delegated_to = doc['delegated_to']
         role = st.session_state.get('user_role')
         current_user = get_user_by_id(user_id)
         current_name = current_user['full_name'] if current_user else None
@@ -2079,10 +3006,12 @@ def delete_file_from_multiple_doc(project_id, doc_column, file_path, user_id):
             os.remove(file_path)
         except OSError:
             pass
-        c.execute(f"UPDATE projects SET {key}_paths = ? WHERE id = ?", (json.dumps(updated_paths), project_id))
+        save_project_document(c, project_id, doc_column, file_paths=updated_paths)
+        c.execute("DELETE FROM file_metadata WHERE file_path = ?", (file_path,))
+        cas_release(file_path, conn)
+        log_audit(user_id, "menghapus file dokumen multiple", {"project_id": int(project_id), "project_name": project_name, "item": item, "part_no": part_no, "doc_column": doc_column, "deleted_file": file_path}, conn=conn)
         conn.commit()
         conn.close()
-        log_audit(user_id, "menghapus file dokumen multiple", {"project_id": int(project_id), "project_name": project_name, "item": item, "part_no": part_no, "doc_column": doc_column, "deleted_file": file_path})
         return True
     except Exception as e:
         conn.close()
@@ -2091,16 +3020,692 @@ def delete_file_from_multiple_doc(project_id, doc_column, file_path, user_id):
 
 
 def get_row_details(row_id):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM projects WHERE id = ?', (row_id,))
-    row = cur.fetchone()
-    cols = [d[0] for d in cur.description]
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT * FROM projects WHERE id = ?', (row_id,))
+        row = cur.fetchone()
+        cols = [d[0] for d in cur.description]
     if row:
         return dict(zip(cols, row))
     return None
 
+def resolve_file_path(file_path):
+    """Path absolut untuk file upload; path relatif dianggap dari root aplikasi."""
+    path = Path(file_path)
+    if not path.is_absolute():
+        path = Path(__file__).parent / path
+    return path
+
+def get_file_size(file_path):
+    """Ukuran file dalam bytes tanpa membaca isinya, None jika tidak ada."""
+    try:
+        path = resolve_file_path(file_path)
+        return path.stat().st_size if path.is_file() else None
+    except OSError:
+        return None
+
+# Streamlit >= 1.52 menerima callable sebagai `data` download_button dan baru
+# memanggilnya saat tombol diklik (on_click="ignore" sudah ada sejak 1.43).
+# Versi lama butuh bytes saat render, jadi kita pakai tombol "siapkan" dua
+# langkah sebagai fallback.
+DEFERRED_DOWNLOADS_MIN_VERSION = "1.52.0"
+DEFERRED_DOWNLOADS = parse_version(st.__version__) >= parse_version(DEFERRED_DOWNLOADS_MIN_VERSION)
+
+def deferred_download_button(label, build_data, file_name, key, mime=None, help=None,
+                             use_container_width=True, type="secondary"):
+    """
+    download_button yang tidak membaca data saat render.
+    `build_data` adalah callable tanpa argumen yang mengembalikan bytes;
+    dipanggil hanya ketika user benar-benar mengklik tombol.
+    """
+    if DEFERRED_DOWNLOADS:
+        return st.download_button(
+            label=label,
+            data=lambda: build_data() or b'',
+            file_name=file_name,
+            mime=mime,
+            key=key,
+            help=help,
+            on_click="ignore",
+            use_container_width=use_container_width,
+            type=type
+        )
+
+    ready_key = f"{key}__ready"
+    if not st.session_state.get(ready_key):
+        if st.button(label, key=f"{key}__prepare", help=help,
+                     use_container_width=use_container_width, type=type):
+            st.session_state[ready_key] = True
+            st.rerun()
+        return False
+    clicked = st.download_button(
+        label=label,
+        data=build_data() or b'',
+        file_name=file_name,
+        mime=mime,
+        key=key,
+        help=help,
+        use_container_width=use_container_width,
+        type=type
+    )
+    if clicked:
+        st.session_state.pop(ready_key, None)
+    return clicked
+
+def file_download_button(label, file_path, key, file_name=None, mime=None, help=None,
+                         use_container_width=True, type="secondary",
+                         unavailable_help="❌ File tidak dapat diakses. File mungkin telah dipindah atau dihapus dari server."):
+    """
+    Tombol download untuk satu file di disk. Saat render hanya dicek keberadaannya;
+    isi file dibaca lewat get_file_content ketika tombol diklik.
+    Mengembalikan False dan menampilkan tombol disabled jika file tidak ada.
+    """
+    file_name = file_name or Path(file_path).name
+    if get_file_size(file_path) is None:
+        st.button(label, disabled=True, key=key, help=unavailable_help,
+                  use_container_width=use_container_width)
+        return False
+    deferred_download_button(
+        label, lambda: get_file_content(file_path), file_name, key,
+        mime=mime, help=help, use_container_width=use_container_width, type=type
+    )
+    return True
+
+# --- Content-addressed store (dedup file upload) ---
+CAS_DIR = FILES_DIR / ".cas"
+# Folder internal di bawah FILES_DIR yang bukan file upload
+FILES_INTERNAL_DIRS = {'.cas', '.page_cache', '.bundles', '.exports', '.jobs'}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def file_sha256(file_path):
+    """(sha256 hex, ukuran bytes) dari file, dibaca per chunk."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def cas_blob_path(sha256):
+    return CAS_DIR / sha256[:2] / sha256
+
+def _link_into_place(source, target):
+    """Ganti `target` dengan hardlink ke `source` secara atomik."""
+    tmp = target.with_name(f".tmp-link-{os.getpid()}-{threading.get_ident()}-{target.name}")
+    os.link(source, tmp)
+    os.replace(tmp, target)
+
+def _cas_add_ref(conn, file_path, sha256, size):
+    """Catat referensi path -> blob dan sesuaikan refcount; ikut transaksi pemanggil."""
+    row = conn.execute("SELECT sha256 FROM file_blob_refs WHERE file_path = ?", (file_path,)).fetchone()
+    if row and row[0] == sha256:
+        return
+    if row:
+        _cas_drop_ref(conn, file_path)
+    conn.execute(
+        "INSERT INTO file_blobs (sha256, size, refcount, created_at) VALUES (?, ?, 1, ?) "
+        "ON CONFLICT(sha256) DO UPDATE SET refcount = refcount + 1",
+        (sha256, size, datetime.datetime.now().isoformat())
+    )
+    conn.execute("INSERT INTO file_blob_refs (file_path, sha256) VALUES (?, ?)", (file_path, sha256))
+
+def _cas_drop_ref(conn, file_path):
+    """
+    Hapus referensi dan kurangi refcount; ikut transaksi pemanggil. Blob yang
+    refcount-nya habis baru dihapus dari disk setelah transaksi di-commit
+    (lihat cas_purge_blobs), sehingga rollback tidak meninggalkan referensi ke
+    blob yang sudah hilang. Returns: sha256 yang dilepas, atau None.
+    """
+    row = conn.execute("SELECT sha256 FROM file_blob_refs WHERE file_path = ?", (file_path,)).fetchone()
+    if not row:
+        return None
+    sha256 = row[0]
+    conn.execute("DELETE FROM file_blob_refs WHERE file_path = ?", (file_path,))
+    conn.execute("UPDATE file_blobs SET refcount = refcount - 1 WHERE sha256 = ?", (sha256,))
+    remaining = conn.execute("SELECT refcount FROM file_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+    if remaining is not None and remaining[0] <= 0:
+        conn.execute("DELETE FROM file_blobs WHERE sha256 = ?", (sha256,))
+        # Koneksi tanpa hook (bukan dari pool): blob yatim dibersihkan dedupe_files_dir
+        if hasattr(conn, 'after_commit'):
+            conn.after_commit(lambda: cas_purge_blobs([sha256]))
+    return sha256
+
+def cas_purge_blobs(shas):
+    """
+    Hapus blob yang sudah tidak direferensikan. Dipanggil setelah commit; refcount
+    dicek ulang di bawah BEGIN IMMEDIATE karena transaksi lain bisa saja sudah
+    menambah referensi baru ke isi yang sama sejak blob dilepas.
+    Returns: jumlah blob yang dihapus.
+    """
+    removed = 0
+    with db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sha256 in shas:
+                row = conn.execute("SELECT refcount FROM file_blobs WHERE sha256 = ?", (sha256,)).fetchone()
+                if row is not None and row[0] > 0:
+                    continue
+                try:
+                    cas_blob_path(sha256).unlink()
+                    removed += 1
+                except OSError:
+                    pass
+        finally:
+            conn.rollback()
+    return removed
+
+def cas_adopt(file_path, conn, sha256=None):
+    """
+    Masukkan file upload ke content-addressed store. Path lama tetap dipakai
+    (disimpan di DB), tetapi dijadikan hardlink ke blob `.cas/<sha[:2]>/<sha>`,
+    sehingga isi yang sama hanya tersimpan sekali di disk.
+    Referensi dicatat lewat `conn` (commit oleh pemanggil).
+    Returns:
+        dict(sha256, size, reclaimed) atau None jika filesystem tidak mendukung hardlink.
+    """
+    path = resolve_file_path(file_path)
+    if sha256 is None:
+        sha256, size = file_sha256(path)
+    else:
+        size = path.stat().st_size
+    blob = cas_blob_path(sha256)
+    reclaimed = 0
+    try:
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, blob)
+        except FileExistsError:
+            # Isi yang sama sudah ada: ganti file ini dengan hardlink ke blob
+            if not os.path.samefile(blob, path):
+                if path.stat().st_nlink == 1:
+                    reclaimed = size
+                _link_into_place(blob, path)
+    except OSError as e:
+        print(f"⚠️ Dedup dilewati untuk {file_path}: {e}")
+        return None
+    _cas_add_ref(conn, get_relative_path(path), sha256, size)
+    return {'sha256': sha256, 'size': size, 'reclaimed': reclaimed}
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+def ingest_upload(uploaded_file, dest_path, conn=None):
+    """
+    Penulis upload bersama untuk semua jalur upload. Isi file di-stream per chunk
+    ke file sementara di folder tujuan sambil menghitung SHA-256 dan ukuran dalam
+    lintasan yang sama, lalu di-rename atomik ke dest_path. Jika `conn` diberikan,
+    file langsung dimasukkan ke content-addressed store tanpa membaca ulang.
+    Returns:
+        dict(path, relative_path, sha256, size)
+    """
+    dest_path = Path(dest_path)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+    
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=dest_path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: uploaded_file.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        # mkstemp membuat file 0600; samakan dengan file upload biasa
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, dest_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    
+    stored = {'path': dest_path, 'relative_path': get_relative_path(dest_path), 'sha256': digest.hexdigest(), 'size': size}
+    if conn is not None:
+        cas_adopt(dest_path, conn, sha256=stored['sha256'])
+    return stored
+
+def cas_release(file_path, conn):
+    """Lepas referensi file yang dihapus; dipanggil bersama DELETE baris revisinya."""
+    return _cas_drop_ref(conn, get_relative_path(resolve_file_path(file_path)))
+
+def iter_upload_files():
+    """Semua file upload di FILES_DIR, tanpa folder internal (cache, bundle, CAS)."""
+    for root, dirs, files in os.walk(FILES_DIR):
+        if Path(root) == FILES_DIR:
+            dirs[:] = [d for d in dirs if d not in FILES_INTERNAL_DIRS]
+        for name in files:
+            if not name.startswith('.tmp-'):
+                yield Path(root) / name
+
+def dedupe_files_dir(progress_callback=None):
+    """
+    Dedup seluruh FILES_DIR ke content-addressed store (dipicu Admin dari Diagnostik).
+    - Referensi ke file yang sudah hilang dihapus dan refcount dihitung ulang.
+    - Setiap file upload di-hash dan dijadikan hardlink ke blob-nya.
+    - Blob tanpa referensi dihapus.
+    Returns:
+        dict(files, blobs, duplicates, reclaimed_bytes, skipped, removed_refs)
+    """
+    report = {'files': 0, 'blobs': 0, 'duplicates': 0, 'reclaimed_bytes': 0, 'skipped': 0, 'removed_refs': 0}
+    with db_connection() as conn:
+        for (file_path,) in conn.execute("SELECT file_path FROM file_blob_refs").fetchall():
+            if not resolve_file_path(file_path).exists():
+                _cas_drop_ref(conn, file_path)
+                report['removed_refs'] += 1
+        conn.commit()
+    
+    paths = list(iter_upload_files())
+    with db_connection() as conn:
+        for done, path in enumerate(paths, start=1):
+            try:
+                result = cas_adopt(path, conn)
+            except OSError as e:
+                print(f"⚠️ Gagal dedup {path}: {e}")
+                result = None
+            if result is None:
+                report['skipped'] += 1
+            else:
+                report['files'] += 1
+                if result['reclaimed']:
+                    report['duplicates'] += 1
+                    report['reclaimed_bytes'] += result['reclaimed']
+            if done % 200 == 0:
+                conn.commit()
+            if progress_callback:
+                progress_callback(done, len(paths))
+        conn.commit()
+        
+        # Blob yatim: ada di disk tapi tidak direferensikan
+        known = {row[0] for row in conn.execute("SELECT sha256 FROM file_blobs WHERE refcount > 0")}
+    cas_purge_blobs([blob.name for blob in CAS_DIR.glob('*/*') if blob.name not in known])
+    report['blobs'] = len(known)
+    return report
+
+def get_cas_stats():
+    row = fetchall(
+        "SELECT COUNT(*) AS blobs, COALESCE(SUM(size), 0) AS stored_bytes, "
+        "COALESCE(SUM(size * refcount), 0) AS logical_bytes, COALESCE(SUM(refcount), 0) AS refs FROM file_blobs"
+    )[0]
+    row['saved_bytes'] = row['logical_bytes'] - row['stored_bytes']
+    return row
+
+# --- Bundle ZIP "Download All" (di-cache per manifest) ---
+BUNDLE_DIR = FILES_DIR / ".bundles"
+BUNDLE_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Format yang sudah terkompresi disimpan apa adanya; DEFLATE hanya membuang CPU
+STORED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.zip', '.7z', '.rar', '.xlsx', '.docx', '.pptx'}
+
+def zip_write_file(zip_file, file_path, arcname):
+    """Tambahkan satu file ke ZIP (dibaca per chunk oleh zipfile, tidak dimuat utuh ke RAM)."""
+    compress_type = zipfile.ZIP_STORED if Path(file_path).suffix.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    zip_file.write(file_path, arcname, compress_type=compress_type)
+
+def bundle_manifest(entries):
+    """
+    Manifest (arcname, path, size, mtime) dari file yang masih ada beserta hash-nya.
+    Hash berubah jika ada file ditambah, dihapus, atau diganti.
+    """
+    manifest = []
+    for arcname, file_path in entries:
+        try:
+            st_ = resolve_file_path(file_path).stat()
+        except OSError:
+            continue
+        manifest.append((arcname, str(file_path), st_.st_size, st_.st_mtime_ns))
+    return manifest, hashlib.sha256(json.dumps(manifest).encode()).hexdigest()
+
+def build_bundle(entries):
+    """
+    Path ZIP untuk list (arcname, file_path). Dibangun sekali per manifest lalu
+    dipakai ulang; ditulis ke file sementara di BUNDLE_DIR (bukan RAM) dan
+    di-rename atomik agar sesi lain tidak melihat ZIP setengah jadi.
+    """
+    manifest, digest = bundle_manifest(entries)
+    bundle_path = BUNDLE_DIR / f"{digest}.zip"
+    if bundle_path.exists():
+        try:
+            os.utime(bundle_path)
+        except OSError:
+            pass
+        return bundle_path
+    
+    BUNDLE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=BUNDLE_DIR, prefix='.tmp-', suffix='.zip')
+    try:
+        with os.fdopen(fd, 'wb') as f, zipfile.ZipFile(f, 'w') as zip_file:
+            for arcname, file_path, _, _ in manifest:
+                try:
+                    zip_write_file(zip_file, resolve_file_path(file_path), arcname)
+                except OSError:
+                    pass
+        os.replace(tmp_name, bundle_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    prune_bundle_cache(keep=bundle_path)
+    return bundle_path
+
+BUNDLE_ENTRY_TABLES = ('project_documents', 'revision_history', 'dynamic_docs')
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _cached_project_bundle_entries(project_id, versions):
+    doc_types = get_doc_registry()
+    with db_connection() as conn:
+        multi_paths = dict(conn.execute(
+            "SELECT doc_name, file_paths FROM project_documents WHERE project_id = ? AND has_file = 1", (project_id,)
+        ).fetchall())
+        revisions = conn.execute(
+            "SELECT doc_column, revision_number, file_path FROM revision_history "
+            "WHERE project_id = ? AND revision_number != -1 ORDER BY revision_number DESC",
+            (project_id,)
+        ).fetchall()
+    revisions_by_doc = {}
+    for doc_column, revision_number, file_path in revisions:
+        revisions_by_doc.setdefault(doc_column, []).append((revision_number, file_path))
+    
+    entries = []
+    for col_name in doc_types.names:
+        if doc_types.is_multiple(col_name):
+            for file_path in _parse_json_list(multi_paths.get(col_name)):
+                entries.append((f"{col_name}/{Path(file_path).name}", file_path))
+        else:
+            for revision_number, file_path in revisions_by_doc.get(col_name, []):
+                entries.append((f"{col_name}/Rev{revision_number}_{Path(file_path).name}", file_path))
+    return [(arcname, file_path) for arcname, file_path in entries if get_file_size(file_path) is not None]
+
+def get_project_bundle_entries(project_id):
+    """
+    List (arcname, file_path) untuk "Download All" satu proyek: semua file dokumen
+    multiple dan semua revisi yang sudah disetujui. Di-cache pada data_version
+    sehingga rerun tidak mengulang query per tipe dokumen maupun stat per file.
+    """
+    return _cached_project_bundle_entries(int(project_id), get_data_versions(BUNDLE_ENTRY_TABLES))
+
+def prune_bundle_cache(keep=None):
+    """Hapus bundle yang paling lama tidak diunduh selama total melebihi BUNDLE_CACHE_MAX_BYTES."""
+    entries = []
+    for path in BUNDLE_DIR.glob('*.zip'):
+        if path.name.startswith('.tmp-'):
+            continue
+        try:
+            st_ = path.stat()
+        except OSError:
+            continue
+        entries.append((st_.st_mtime, st_.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda e: e[0]):
+        if total <= BUNDLE_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+
+# --- Ekspor dokumen multi-proyek ---
+EXPORT_DIR = FILES_DIR / ".exports"
+EXPORT_READ_WORKERS = 4
+EXPORT_PREFETCH_BYTES = 64 * 1024 * 1024  # total isi file yang boleh dibaca di muka (RAM)
+EXPORT_STREAM_THRESHOLD = 8 * 1024 * 1024  # file lebih besar ditulis per chunk, tidak di-prefetch
+EXPORT_RETENTION_DAYS = 7
+EXPORT_QUERY_CHUNK = 500  # project_id per query IN (...)
+# Arsip dipecah menjadi volume ZIP mandiri sebesar ini; satu volume dibaca utuh
+# ke memori saat tombol download-nya diklik (download_button Streamlit)
+EXPORT_VOLUME_BYTES = 100 * 1024 * 1024
+EXPORT_PROGRESS_INTERVAL = 1.0  # detik, jarak minimal update progress job ekspor ke DB
+EXPORT_INDEX_COLUMNS = [
+    'project_id', 'item', 'part_no', 'project', 'customer', 'status',
+    'document', 'revision', 'file_name', 'volume', 'archive_path', 'size_bytes', 'keterangan'
+]
+
+def _export_folder_name(project):
+    parts = [f"{project['id']:04d}", project['customer'], project['part_no'], project['project']]
+    return "_".join(str(p or 'NA').replace(' ', '_').replace('/', '-').replace('\\', '-') for p in parts)
+
+def collect_export_entries(customers=None, statuses=None, part_no_query="", date_from=None, date_to=None,
+                           doc_names=None, latest_only=False):
+    """
+    File yang sudah disetujui untuk proyek yang lolos filter, siap dimasukkan ke arsip.
+    Dokumen single: revisi (>= 0) dari revision_history; dokumen multiple: file_paths di project_documents.
+    Returns:
+        List of dict (field proyek + document, revision, file_path, archive_path), urut per proyek.
+    """
+    sql = "SELECT id, item, part_no, project, customer, status, project_start_date, project_end_date FROM projects WHERE 1 = 1"
+    params = []
+    if customers:
+        sql += f" AND customer IN ({','.join('?' * len(customers))})"
+        params.extend(customers)
+    if statuses:
+        sql += f" AND status IN ({','.join('?' * len(statuses))})"
+        params.extend(statuses)
+    if part_no_query:
+        sql += " AND instr(lower(part_no), ?) > 0"
+        params.append(part_no_query.strip().lower())
+    projects = fetchall(sql + " ORDER BY id", params)
+    
+    if date_from or date_to:
+        # Tanggal tersimpan sebagai teks DD-MM-YYYY, jadi rentang dicek di Python (irisan periode proyek)
+        def in_range(project):
+            start = parse_date_string(project['project_start_date'])
+            end = parse_date_string(project['project_end_date'])
+            return (not date_to or start is None or start <= date_to) and (not date_from or end is None or end >= date_from)
+        projects = [p for p in projects if in_range(p)]
+    if not projects:
+        return []
+    
+    doc_types = get_doc_registry()
+    wanted_docs = [d for d in (doc_names or doc_types.names) if d in doc_types]
+    single_docs = [d for d in wanted_docs if not doc_types.is_multiple(d)]
+    multi_docs = [d for d in wanted_docs if doc_types.is_multiple(d)]
+    by_project = {p['id']: p for p in projects}
+    files = {pid: [] for pid in by_project}
+    
+    project_ids = list(by_project)
+    for start in range(0, len(project_ids), EXPORT_QUERY_CHUNK):
+        chunk = project_ids[start:start + EXPORT_QUERY_CHUNK]
+        id_marks = ','.join('?' * len(chunk))
+        if single_docs:
+            rev_filter = (
+                " AND rh.revision_number = (SELECT MAX(r2.revision_number) FROM revision_history r2"
+                " WHERE r2.project_id = rh.project_id AND r2.doc_column = rh.doc_column)"
+                if latest_only else ""
+            )
+            rows = fetchall(
+                f"SELECT rh.project_id, rh.doc_column, rh.revision_number, rh.file_path FROM revision_history rh "
+                f"WHERE rh.revision_number >= 0 AND rh.project_id IN ({id_marks}) "
+                f"AND rh.doc_column IN ({','.join('?' * len(single_docs))}){rev_filter} "
+                f"ORDER BY rh.project_id, rh.doc_column, rh.revision_number",
+                chunk + single_docs
+            )
+            for row in rows:
+                files[row['project_id']].append((row['doc_column'], row['revision_number'], row['file_path']))
+        if multi_docs:
+            rows = fetchall(
+                f"SELECT pd.project_id, pd.doc_name, je.value AS file_path FROM project_documents pd, json_each(pd.file_paths) je "
+                f"WHERE json_valid(pd.file_paths) AND pd.project_id IN ({id_marks}) "
+                f"AND pd.doc_name IN ({','.join('?' * len(multi_docs))}) ORDER BY pd.project_id, pd.doc_name, je.key",
+                chunk + multi_docs
+            )
+            for row in rows:
+                files[row['project_id']].append((row['doc_name'], None, row['file_path']))
+    
+    entries = []
+    for pid, project in by_project.items():
+        folder = _export_folder_name(project)
+        for document, revision, file_path in files[pid]:
+            file_name = Path(file_path).name
+            prefix = f"Rev{revision}_" if revision is not None else ""
+            entries.append(dict(
+                project_id=pid, item=project['item'], part_no=project['part_no'], project=project['project'],
+                customer=project['customer'], status=project['status'], document=document, revision=revision,
+                file_path=file_path, file_name=file_name,
+                archive_path=f"{folder}/{document.replace('/', '-')}/{prefix}{file_name}"
+            ))
+    return entries
+
+def _read_export_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def write_export_archive(entries, progress_callback=None, volume_bytes=EXPORT_VOLUME_BYTES):
+    """
+    Tulis semua entry ke arsip ZIP di EXPORT_DIR, dipecah menjadi volume ZIP
+    mandiri (masing-masing bisa dibuka sendiri) berukuran maksimum volume_bytes;
+    file yang lebih besar dari satu volume mendapat volume sendiri. index.csv
+    untuk seluruh ekspor (termasuk nama volume tiap file) ada di volume terakhir.
+    File kecil dibaca paralel oleh thread pool dengan total prefetch dibatasi
+    EXPORT_PREFETCH_BYTES; file besar ditulis langsung per chunk oleh zipfile.
+    Pemakaian memori tetap datar berapa pun total ukuran ekspor.
+    progress_callback(selesai, total) boleh mengembalikan True untuk membatalkan
+    ekspor; volume yang sudah ditulis ikut dihapus.
+    Returns:
+        dict(volumes, files, missing, bytes) - volumes: list Path urut - atau None jika dibatalkan.
+    """
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    prune_exports()
+    base_name = f"export_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}"
+    volumes = []  # (tmp_name, file handle, ZipFile)
+    index_rows = []
+    written = missing = total_bytes = volume_files = 0
+    completed = False
+    
+    def open_volume():
+        fd, tmp_name = tempfile.mkstemp(dir=EXPORT_DIR, prefix='.tmp-', suffix='.zip')
+        handle = os.fdopen(fd, 'wb')
+        volumes.append((tmp_name, handle, zipfile.ZipFile(handle, 'w', allowZip64=True)))
+    
+    def plan(entry):
+        """(entry, path, size, future) - future None untuk file besar/hilang."""
+        path = resolve_file_path(entry['file_path'])
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return entry, path, None, None
+        if size > EXPORT_STREAM_THRESHOLD:
+            return entry, path, size, None
+        return entry, path, size, pool.submit(_read_export_file, path)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=EXPORT_READ_WORKERS, thread_name_prefix='export-read') as pool:
+            open_volume()
+            pending = []
+            prefetched = 0
+            entry_iter = iter(entries)
+            exhausted = False
+            for done in range(len(entries)):
+                # Isi jendela prefetch selama masih di bawah batas memori
+                while not exhausted and (not pending or prefetched < EXPORT_PREFETCH_BYTES):
+                    entry = next(entry_iter, None)
+                    if entry is None:
+                        exhausted = True
+                        break
+                    planned = plan(entry)
+                    pending.append(planned)
+                    if planned[3] is not None:
+                        prefetched += planned[2]
+                
+                entry, path, size, future = pending.pop(0)
+                note = ""
+                data = source = None
+                # Hanya error saat membaca file sumber yang dicatat sebagai file hilang;
+                # error saat menulis ZIP (mis. disk penuh) dibiarkan membatalkan ekspor.
+                try:
+                    if size is None:
+                        raise FileNotFoundError(entry['file_path'])
+                    if future is not None:
+                        try:
+                            data = future.result()
+                        finally:
+                            prefetched -= size
+                    else:
+                        source = open(path, 'rb')
+                    zinfo = zipfile.ZipInfo.from_file(path, entry['archive_path'])
+                except OSError:
+                    if source is not None:
+                        source.close()
+                    missing += 1
+                    note = "File tidak ditemukan"
+                else:
+                    _, handle, zip_file = volumes[-1]
+                    if volume_files and handle.tell() + size > volume_bytes:
+                        # Volume penuh: tutup (central directory ditulis) dan mulai volume baru
+                        zip_file.close()
+                        handle.close()
+                        open_volume()
+                        _, handle, zip_file = volumes[-1]
+                        volume_files = 0
+                    zinfo.compress_type = zipfile.ZIP_STORED if path.suffix.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                    if source is None:
+                        zip_file.writestr(zinfo, data)
+                        del data
+                    else:
+                        with source, zip_file.open(zinfo, 'w') as dest:
+                            shutil.copyfileobj(source, dest, HASH_CHUNK_SIZE)
+                    written += 1
+                    volume_files += 1
+                    total_bytes += size
+                index_rows.append([
+                    entry['project_id'], entry['item'], entry['part_no'], entry['project'], entry['customer'],
+                    entry['status'], entry['document'], '' if entry['revision'] is None else entry['revision'],
+                    entry['file_name'], '' if note else len(volumes), '' if note else entry['archive_path'], size or '', note
+                ])
+                if progress_callback and progress_callback(done + 1, len(entries)):
+                    for planned in pending:
+                        if planned[3] is not None:
+                            planned[3].cancel()
+                    return None
+        
+        if len(volumes) == 1:
+            names = [f"{base_name}.zip"]
+        else:
+            names = [f"{base_name}_part{number:02d}.zip" for number in range(1, len(volumes) + 1)]
+        for row in index_rows:
+            if row[9]:
+                row[9] = names[row[9] - 1]
+        index_buffer = StringIO()
+        writer = csv.writer(index_buffer)
+        writer.writerow(EXPORT_INDEX_COLUMNS)
+        writer.writerows(index_rows)
+        _, handle, zip_file = volumes[-1]
+        zip_file.writestr("index.csv", index_buffer.getvalue().encode('utf-8-sig'))
+        zip_file.close()
+        handle.close()
+        export_paths = [EXPORT_DIR / name for name in names]
+        for (tmp_name, _, _), export_path in zip(volumes, export_paths):
+            os.replace(tmp_name, export_path)
+        completed = True
+    finally:
+        if not completed:
+            for tmp_name, handle, zip_file in volumes:
+                try:
+                    zip_file.close()
+                except Exception:
+                    pass
+                handle.close()
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+    return {'volumes': export_paths, 'files': written, 'missing': missing, 'bytes': total_bytes}
+
+def prune_exports(max_age_days=EXPORT_RETENTION_DAYS):
+    """Hapus arsip ekspor (dan sisa file sementara) yang lebih tua dari max_age_days."""
+    cutoff = time.time() - max_age_days * 86400
+    for path in EXPORT_DIR.glob('*.zip'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
 def get_file_content(file_path):
     """
     Membaca konten file dan mengembalikan bytes.
@@ -2108,13 +3713,7 @@ def get_file_content(file_path):
     Mendukung relative dan absolute path untuk kompatibilitas intranet.
     """
     try:
-        # Convert to Path object
-        path = Path(file_path)
-        
-        # Jika path tidak absolute, anggap relative dari root aplikasi
-        if not path.is_absolute():
-            # Path relative dari direktori aplikasi
-            path = Path(__file__).parent / path
+        path = resolve_file_path(file_path)
         
         # Cek apakah file exists
         if not path.exists():
@@ -2149,59 +3748,407 @@ def get_file_content(file_path):
         print(f"❌ Error membaca file {file_path}: {str(e)}")
         return None
 
-def render_pdf_as_images(pdf_path, max_pages=5, zoom=2.0):
+# --- Cache halaman PDF yang sudah di-render ---
+PAGE_CACHE_DIR = FILES_DIR / ".page_cache"
+PAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PAGE_CACHE_LOW_WATERMARK = 0.8  # setelah eviksi, sisakan 80% dari budget
+PAGE_CACHE_FORMAT = 'webp' if PIL_features.check('webp') else 'png'
+PAGE_CACHE_WEBP_QUALITY = 80
+
+class RenderedPageCache:
     """
-    Render PDF pages as images using PyMuPDF
-    Args:
-        pdf_path: Path to PDF file
-        max_pages: Maximum number of pages to render (default 5)
-        zoom: Zoom factor for rendering quality (default 2.0)
-    Returns:
-        Tuple of (List of PIL Images, total page count)
+    Cache on-disk untuk halaman PDF yang sudah dirasterisasi, dipakai bersama
+    oleh semua sesi Streamlit (dan proses lain yang menunjuk ke folder yang sama).
+    Key: (hash isi file, halaman, zoom, format). Penulisan atomik via file
+    sementara + os.replace, eviksi LRU berdasarkan mtime saat melewati budget.
     """
-    doc = None
-    try:
-        # Konversi path ke string jika Path object
-        pdf_path_str = str(pdf_path)
-        
-        # Validasi file exists
-        if not os.path.exists(pdf_path_str):
-            raise FileNotFoundError(f"PDF file not found: {pdf_path_str}")
-        
-        # Buka dokumen PDF
-        doc = fitz.open(pdf_path_str)
-        total_pages = doc.page_count  # Lebih reliable daripada len()
-        images = []
-        
-        if total_pages == 0:
-            return [], 0
-        
-        # Limit to max_pages
-        num_pages = min(total_pages, max_pages)
-        
-        for page_num in range(num_pages):
+
+    def __init__(self, directory=PAGE_CACHE_DIR, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._hash_memo = {}
+        self._total_bytes = None
+        self._stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'evicted_bytes': 0}
+
+    # -- key & path --
+    def content_hash(self, file_path):
+        """sha256 isi file; di-memo per (path, mtime, size) agar rerun tidak membaca ulang PDF."""
+        path = resolve_file_path(file_path)
+        st_ = path.stat()
+        memo_key = (str(path), st_.st_mtime_ns, st_.st_size)
+        with self._lock:
+            cached = self._hash_memo.get(memo_key)
+        if cached:
+            return cached
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        with self._lock:
+            if len(self._hash_memo) > 4096:
+                self._hash_memo.clear()
+            self._hash_memo[memo_key] = content_hash
+        return content_hash
+
+    def _entry_path(self, content_hash, page, zoom, fmt):
+        return self.directory / content_hash[:2] / f"{content_hash}_p{page}_z{zoom:g}.{fmt}"
+
+    def _meta_path(self, content_hash):
+        return self.directory / content_hash[:2] / f"{content_hash}.meta.json"
+
+    # -- baca --
+    def _read(self, path):
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            # Sentuh mtime sebagai penanda "baru dipakai" untuk LRU
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def get(self, content_hash, page, zoom, fmt=PAGE_CACHE_FORMAT):
+        data = self._read(self._entry_path(content_hash, page, zoom, fmt))
+        with self._lock:
+            self._stats['hits' if data is not None else 'misses'] += 1
+        return data
+
+    def get_page_count(self, content_hash):
+        raw = self._read(self._meta_path(content_hash))
+        if raw is None:
+            return None
+        try:
+            return int(json.loads(raw)['page_count'])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    # -- tulis --
+    def _write_atomic(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # os.replace atomik: sesi lain hanya melihat file lama atau file utuh
+            os.replace(tmp_name, path)
+        except BaseException:
             try:
-                page = doc.load_page(page_num)  # load_page lebih eksplisit
-                
-                # Create transformation matrix for zoom
-                mat = fitz.Matrix(zoom, zoom)
-                
-                # Render page to pixmap with better settings
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                
-                # Convert to PIL Image
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                images.append(img)
-                
-                # Free pixmap memory
-                del pix
-                
-            except Exception as page_error:
-                # Skip halaman yang error, lanjut ke halaman berikutnya
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(data)
+            over_budget = self._total_bytes is None or self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def put(self, content_hash, page, zoom, data, fmt=PAGE_CACHE_FORMAT):
+        try:
+            self._write_atomic(self._entry_path(content_hash, page, zoom, fmt), data)
+        except OSError as e:
+            print(f"⚠️ Gagal menulis cache halaman PDF: {e}")
+            return False
+        with self._lock:
+            self._stats['writes'] += 1
+        return True
+
+    def put_page_count(self, content_hash, page_count):
+        try:
+            self._write_atomic(self._meta_path(content_hash), json.dumps({'page_count': page_count}).encode())
+        except OSError as e:
+            print(f"⚠️ Gagal menulis metadata cache PDF: {e}")
+
+    # -- eviksi --
+    def _scan(self):
+        entries = []
+        if not self.directory.exists():
+            return entries
+        stale_before = time.time() - 3600
+        for path in self.directory.glob('*/*'):
+            try:
+                st_ = path.stat()
+            except OSError:
                 continue
+            if path.name.startswith('.tmp-'):
+                # Sisa penulisan yang terputus (proses mati di tengah jalan)
+                if st_.st_mtime < stale_before:
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+                continue
+            entries.append((st_.st_mtime, st_.st_size, path))
+        return entries
+
+    def evict(self):
+        """Hapus entry yang paling lama tidak dipakai sampai total di bawah low watermark."""
+        if not self._evict_lock.acquire(blocking=False):
+            return 0  # eviksi lain sedang berjalan di proses ini
+        try:
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            removed = removed_bytes = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * PAGE_CACHE_LOW_WATERMARK
+                for _, size, path in sorted(entries, key=lambda e: e[0]):
+                    if total <= target:
+                        break
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass  # sudah dihapus proses lain
+                    except OSError:
+                        continue
+                    total -= size
+                    removed += 1
+                    removed_bytes += size
+            with self._lock:
+                self._total_bytes = total
+                self._stats['evictions'] += removed
+                self._stats['evicted_bytes'] += removed_bytes
+            return removed
+        finally:
+            self._evict_lock.release()
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        with self._lock:
+            self._total_bytes = 0
+            self._hash_memo.clear()
+
+    def stats(self):
+        entries = self._scan()
+        with self._lock:
+            self._total_bytes = sum(size for _, size, _ in entries)
+            stats = dict(self._stats, bytes=self._total_bytes, entries=len(entries), max_bytes=self.max_bytes)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+@st.cache_resource
+def get_page_cache():
+    return RenderedPageCache()
+
+# Rasterisasi dijalankan di pool proses (lihat pdf_worker.py)
+PDF_RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+PDF_RENDER_TIMEOUT = 60  # detik, batas satu request preview
+
+@st.cache_resource
+def get_pdf_render_pool():
+    pool = pdf_worker.PdfRenderPool(PDF_RENDER_WORKERS)
+    atexit.register(pool.shutdown)
+    return pool
+
+# --- Metadata & thumbnail file (background) ---
+THUMBNAIL_MAX_PX = 240
+
+class FileMetadataWorker:
+    """
+    Thread latar per proses yang mengisi file_metadata (ukuran, hash, jumlah
+    halaman, thumbnail halaman pertama) setelah file di-upload. Render dilakukan
+    di pool PDF agar tidak berebut GIL dengan sesi Streamlit.
+    """
+
+    def __init__(self, page_cache, render_pool):
+        self.page_cache = page_cache
+        self.render_pool = render_pool
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {'scheduled': 0, 'generated': 0, 'failed': 0}
+
+    def schedule(self, file_paths):
+        with self._lock:
+            for file_path in file_paths:
+                if not file_path or file_path in self._queued:
+                    continue
+                self._queued.add(file_path)
+                self._queue.put(file_path)
+                self._stats['scheduled'] += 1
+            if self._queued and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name='file-metadata', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            file_path = self._queue.get()
+            try:
+                ok = self.generate(file_path)
+            except Exception as e:
+                print(f"❌ Gagal membuat metadata {file_path}: {e}")
+                ok = False
+            with self._lock:
+                self._queued.discard(file_path)
+                self._stats['generated' if ok else 'failed'] += 1
+
+    def generate(self, file_path):
+        """Hitung metadata satu file lalu simpan; mengembalikan False jika gagal."""
+        path = resolve_file_path(file_path)
+        meta = {'page_count': None, 'width': None, 'height': None, 'thumbnail': None}
+        file_size = content_hash = error = None
+        try:
+            file_size = path.stat().st_size
+            content_hash = self.page_cache.content_hash(path)
+            meta = self.render_pool.submit(
+                pdf_worker.extract_metadata, str(path), THUMBNAIL_MAX_PX, PAGE_CACHE_FORMAT, PAGE_CACHE_WEBP_QUALITY
+            ).result(timeout=PDF_RENDER_TIMEOUT)
+            if path.suffix.lower() == '.pdf' and meta['page_count'] is not None:
+                # Preview nanti tidak perlu membuka PDF hanya untuk jumlah halaman
+                self.page_cache.put_page_count(content_hash, meta['page_count'])
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        with db_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_metadata (file_path, file_size, content_hash, page_count, width, height, "
+                "thumbnail, thumbnail_format, error, generated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(file_path), file_size, content_hash, meta['page_count'], meta['width'], meta['height'],
+                 meta['thumbnail'], PAGE_CACHE_FORMAT if meta['thumbnail'] else None, error,
+                 datetime.datetime.now().isoformat())
+            )
+            conn.commit()
+        return error is None
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, queued=len(self._queued))
+
+@st.cache_resource
+def get_file_metadata_worker():
+    return FileMetadataWorker(get_page_cache(), get_pdf_render_pool())
+
+def schedule_file_metadata(file_paths):
+    """Jadwalkan pembuatan metadata/thumbnail; dipanggil setelah upload di-commit."""
+    get_file_metadata_worker().schedule([str(p) for p in file_paths])
+
+def get_file_metadata_map(file_paths, schedule_missing=False):
+    """Metadata per file_path dalam satu query; opsional jadwalkan yang belum ada."""
+    file_paths = list(dict.fromkeys(str(p) for p in file_paths if p))
+    if not file_paths:
+        return {}
+    placeholders = ','.join('?' * len(file_paths))
+    rows = fetchall(f"SELECT * FROM file_metadata WHERE file_path IN ({placeholders})", file_paths)
+    meta_map = {row['file_path']: row for row in rows}
+    if schedule_missing:
+        missing = [p for p in file_paths if p not in meta_map]
+        if missing:
+            schedule_file_metadata(missing)
+    return meta_map
+
+def describe_file_metadata(meta):
+    parts = []
+    if meta and meta.get('page_count'):
+        parts.append(f"📑 {meta['page_count']} halaman")
+    if meta and meta.get('file_size') is not None:
+        parts.append(f"📦 {meta['file_size'] / 1024:.1f} KB")
+    return " • ".join(parts)
+
+def render_file_thumbnail(meta, width=140):
+    if meta and meta.get('thumbnail'):
+        st.image(meta['thumbnail'], width=width)
+    else:
+        st.caption("🖼️ Thumbnail belum tersedia")
+    if describe_file_metadata(meta):
+        st.caption(describe_file_metadata(meta))
+
+def thumbnail_img_html(meta, height=48, fallback=""):
+    """Tag <img> inline (data URI) untuk kartu HTML; `fallback` jika belum ada thumbnail."""
+    if not meta or not meta.get('thumbnail'):
+        return fallback
+    encoded = base64.b64encode(meta['thumbnail']).decode()
+    return (f"<img src='data:image/{meta['thumbnail_format']};base64,{encoded}' "
+            f"style='height: {height}px; border-radius: 4px; border: 1px solid #e5e7eb; margin-right: 12px;'>")
+
+def stream_pdf_pages(pdf_path, max_pages=5, zoom=2.0, fmt=PAGE_CACHE_FORMAT, timeout=PDF_RENDER_TIMEOUT):
+    """
+    Render halaman preview PDF secara progresif.
+    Halaman yang sudah ada di cache langsung dikirim; sisanya dibagi ke worker
+    pool (halaman pertama sebagai task sendiri) dan dikirim begitu selesai.
+    Returns:
+        Tuple of (total page count, iterator of (page_num, encoded bytes)).
+        Urutan iterator mengikuti selesainya render, bukan nomor halaman.
+    """
+    path = resolve_file_path(pdf_path)
+    if not path.exists():
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+    
+    cache = get_page_cache()
+    pool = get_pdf_render_pool()
+    content_hash = cache.content_hash(path)
+    total_pages = cache.get_page_count(content_hash)
+    if total_pages is None:
+        # Dibuka di worker pool, bukan di thread sesi (juga pada fallback thread pool)
+        try:
+            total_pages = pool.submit(pdf_worker.page_count, str(path)).result(timeout=timeout)  # Lebih reliable daripada len()
+        except pdf_worker.BrokenProcessPool:
+            pool.reset()
+            raise
+        cache.put_page_count(content_hash, total_pages)
+    
+    # Limit to max_pages
+    num_pages = min(total_pages, max_pages)
+    
+    def generate():
+        missing = []
+        for page_num in range(num_pages):
+            data = cache.get(content_hash, page_num, zoom, fmt)
+            if data is None:
+                missing.append(page_num)
+            else:
+                yield page_num, data
+        if not missing:
+            return
         
-        return images, total_pages
-        
+        futures = [
+            pool.submit(pdf_worker.render_pages, str(path), chunk, zoom, fmt, PAGE_CACHE_WEBP_QUALITY)
+            for chunk in pdf_worker.split_pages(missing, pool.max_workers)
+        ]
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    # Satu potongan gagal (mis. worker crash), lanjutkan potongan lain
+                    print(f"Error rendering PDF pages {pdf_path}: {e}")
+                    if isinstance(e, pdf_worker.BrokenProcessPool):
+                        pool.reset()
+                    continue
+                for page_num, data in pages:
+                    # Skip halaman yang error
+                    if data is None:
+                        continue
+                    cache.put(content_hash, page_num, zoom, data, fmt)
+                    yield page_num, data
+        except FuturesTimeoutError:
+            print(f"⚠️ Render preview {pdf_path} melewati batas {timeout} detik")
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    return total_pages, generate()
+
+def render_pdf_as_images(pdf_path, max_pages=5, zoom=2.0, fmt=PAGE_CACHE_FORMAT):
+    """
+    Render PDF pages as images using PyMuPDF, lewat cache halaman on-disk.
+    Args:
+        pdf_path: Path to PDF file
+        max_pages: Maximum number of pages to render (default 5)
+        zoom: Zoom factor for rendering quality (default 2.0)
+        fmt: Format gambar terkompresi ('webp' atau 'png')
+    Returns:
+        Tuple of (List of encoded image bytes, total page count)
+    """
+    try:
+        total_pages, pages = stream_pdf_pages(pdf_path, max_pages=max_pages, zoom=zoom, fmt=fmt)
+        rendered = dict(pages)
+        return [rendered[p] for p in sorted(rendered)], total_pages
     except FileNotFoundError as e:
         raise e
     except Exception as e:
@@ -2210,13 +4157,6 @@ def render_pdf_as_images(pdf_path, max_pages=5, zoom=2.0):
         print(f"Error in render_pdf_as_images: {str(e)}")
         print(traceback.format_exc())
         return [], 0
-    finally:
-        # Pastikan dokumen ditutup
-        if doc is not None:
-            try:
-                doc.close()
-            except:
-                pass
 
 # --- UI Halaman Login & Register ---
 def show_login_page():
@@ -2468,13 +4408,16 @@ def show_main_page():
     if st.session_state['current_view'] == 'approval_list' and st.session_state['user_role'] in ['Admin', 'Manager', 'SPV']:
         show_approval_list()
     elif st.session_state['user_role'] in ['Admin', 'Manager']:
-        admin_tabs = st.tabs([
+        admin_tab_labels = [
             "📊 Dashboard Proyek", 
             "🔧 Manajemen Proyek", 
             "👥 Manajemen User", 
             "📄 Manajemen Dokumen", 
             "📝 Audit Log"
-        ])
+        ]
+        if st.session_state['user_role'] == 'Admin':
+            admin_tab_labels.append("🩺 Diagnostik")
+        admin_tabs = st.tabs(admin_tab_labels)
         
         with admin_tabs[0]:
             show_dashboard_tab()
@@ -2486,6 +4429,9 @@ def show_main_page():
             manage_docs_page()
         with admin_tabs[4]:
             show_audit_log_page()
+        if st.session_state['user_role'] == 'Admin':
+            with admin_tabs[5]:
+                show_diagnostics_page()
     elif st.session_state['user_role'] == 'SPV':
         spv_tabs = st.tabs([
             "📊 Dashboard Proyek", 
@@ -2509,24 +4455,97 @@ def show_main_page():
             upload_doc_form()
 
 # --- Fungsi untuk halaman approval ---
+PENDING_APPROVER_ROLES = ('Admin', 'Manager')  # boleh menyetujui semua dokumen pending
+
+APPROVAL_PAGE_SIZES = [10, 25, 50, 100]
+
+def _pending_approval_filters(role, user_name, search_query="", doc_filter=None):
+    """
+    FROM/WHERE daftar pending approval + parameternya, dipakai bersama oleh query halaman dan hitungan.
+    Filter pencarian, tipe dokumen, dan hak approver dilakukan di SQL.
+    SPV hanya melihat dokumen yang didelegasikan kepadanya (delegated_to_list, atau delegated_to jika list tidak diisi).
+    """
+    sql = """
+             FROM revision_history rh
+             JOIN projects p ON rh.project_id = p.id
+             LEFT JOIN users u ON u.id = rh.uploaded_by
+             LEFT JOIN project_documents pd ON pd.project_id = rh.project_id AND pd.doc_name = rh.doc_column
+             WHERE rh.revision_number = -1"""
+    params = []
+    if search_query:
+        sql += """
+               AND (instr(py_lower(p.project), ?) > 0 OR instr(py_lower(p.item), ?) > 0 OR instr(py_lower(p.customer), ?) > 0)"""
+        params += [search_query.lower()] * 3
+    if doc_filter:
+        sql += """
+               AND rh.doc_column = ?"""
+        params.append(doc_filter)
+    if role not in PENDING_APPROVER_ROLES:
+        if role != 'SPV':
+            sql += """
+               AND 0"""
+        else:
+            # Sama dengan aturan lama: delegated_to hanya dipakai jika list tidak diisi sama sekali
+            # (list kosong "[]" berarti tidak ada SPV yang didelegasikan) atau isinya bukan JSON valid
+            sql += """
+               AND CASE WHEN pd.delegated_to_list IS NULL OR pd.delegated_to_list = '' OR NOT json_valid(pd.delegated_to_list)
+                        THEN pd.delegated_to = ?
+                        ELSE EXISTS (SELECT 1 FROM json_each(pd.delegated_to_list) WHERE value = ?) END"""
+            params += [user_name, user_name]
+    return sql, params
+
+def pending_approval_query(role, user_name, search_query="", doc_filter=None, after=None, limit=None):
+    """
+    SQL + parameter daftar pending approval, sudah di-join dengan nama pengunggah dan delegasi.
+    Urutan stabil (timestamp DESC, rowid DESC) sehingga bisa dipaginasi dengan keyset:
+    `after` = (timestamp, rowid) baris terakhir halaman sebelumnya.
+    """
+    where_sql, params = _pending_approval_filters(role, user_name, search_query, doc_filter)
+    sql = """SELECT rh.project_id, rh.doc_column, rh.file_path, rh.uploaded_by, rh.timestamp,
+                    p.project, p.item, p.part_no, p.customer, rh.upload_source,
+                    COALESCE(u.full_name, rh.uploaded_by) AS uploader_name, rh.rowid AS pending_rowid""" + where_sql
+    if after is not None:
+        sql += """
+               AND (rh.timestamp, rh.rowid) < (?, ?)"""
+        params += list(after)
+    sql += """
+             ORDER BY rh.timestamp DESC, rh.rowid DESC"""
+    if limit is not None:
+        sql += """
+             LIMIT ?"""
+        params.append(int(limit))
+    return sql, params
+
+def get_pending_approvals(role, user_name, search_query="", doc_filter=None, after=None, limit=None):
+    """Baris pending (10 kolom lama + uploader_name + pending_rowid) yang boleh disetujui user ini."""
+    sql, params = pending_approval_query(role, user_name, search_query, doc_filter, after, limit)
+    with db_connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+def count_pending_approvals(role, user_name, search_query="", doc_filter=None):
+    """Jumlah pending yang sesuai filter, dihitung terpisah dari halaman yang dirender."""
+    where_sql, params = _pending_approval_filters(role, user_name, search_query, doc_filter)
+    with db_connection() as conn:
+        return conn.execute("SELECT COUNT(*)" + where_sql, params).fetchone()[0]
+
+def get_pending_summary():
+    """{doc_column: jumlah} untuk semua dokumen pending (statistik & pilihan filter)."""
+    with db_connection() as conn:
+        return dict(conn.execute(
+            "SELECT rh.doc_column, COUNT(*) FROM revision_history rh JOIN projects p ON rh.project_id = p.id "
+            "WHERE rh.revision_number = -1 GROUP BY rh.doc_column"
+        ).fetchall())
+
 def show_approval_list():
     st.title("📋 Daftar Dokumen Pending Approval")
     st.caption("Review dan setujui dokumen yang diunggah oleh tim")
     
     user_name = get_user_by_id(st.session_state['user_id'])['full_name']
     
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("""SELECT rh.project_id, rh.doc_column, rh.file_path, rh.uploaded_by, rh.timestamp,
-                 p.project, p.item, p.part_no, p.customer, rh.upload_source 
-                 FROM revision_history rh 
-                 JOIN projects p ON rh.project_id = p.id 
-                 WHERE rh.revision_number = -1
-                 ORDER BY p.project, rh.timestamp DESC""")
-    pending_files = c.fetchall()
-    conn.close()
+    pending_summary = get_pending_summary()
+    total_pending = sum(pending_summary.values())
     
-    if not pending_files:
+    if not total_pending:
         st.success("✅ Semua dokumen sudah diproses!")
         st.info("Tidak ada dokumen yang menunggu persetujuan saat ini.")
         return
@@ -2538,7 +4557,7 @@ def show_approval_list():
         search_query = st.text_input("🔍 Cari Dokumen", placeholder="Cari berdasarkan nama proyek, item, atau customer...", key="search_approval")
     
     with col_filter:
-        doc_types = list(set([doc[1] for doc in pending_files]))
+        doc_types = list(pending_summary)
         doc_types.insert(0, "Semua Dokumen")
         filter_doc = st.selectbox("📁 Filter Tipe Dokumen", doc_types, key="filter_doc_type")
     
@@ -2551,7 +4570,7 @@ def show_approval_list():
         st.markdown(f"""
         <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
                     padding: 20px; border-radius: 10px; text-align: center; color: white;'>
-            <h2 style='margin: 0; color: white;'>{len(pending_files)}</h2>
+            <h2 style='margin: 0; color: white;'>{total_pending}</h2>
             <p style='margin: 5px 0 0 0; opacity: 0.9;'>Total Pending</p>
         </div>
         """, unsafe_allow_html=True)
@@ -2609,68 +4628,41 @@ def show_approval_list():
     
     st.divider()
     
-    # Group documents by project untuk tampilan yang lebih terorganisir
-    docs_by_project = {}
-    filtered_docs = []
-    
-    for pending_data in pending_files:
-        project_id, doc_col, file_path, uploaded_by, timestamp, project_name, item, part_no, customer, upload_source = pending_data
-        
-        # Apply filters
-        if search_query:
-            if search_query.lower() not in project_name.lower() and \
-               search_query.lower() not in item.lower() and \
-               search_query.lower() not in customer.lower():
-                continue
-        
-        if filter_doc != "Semua Dokumen" and doc_col != filter_doc:
-            continue
-        
-        row_data = get_row_details(project_id)
-        delegated_to_name = row_data.get(f"{doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')}_delegated_to")
-        
-        is_approver = False
-        if st.session_state['user_role'] in ['Admin', 'Manager']:
-            is_approver = True
-        else:
-            key_chk = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-            delegated_list_json = row_data.get(f"{key_chk}_delegated_to_list")
-            try:
-                delegated_list = json.loads(delegated_list_json) if delegated_list_json else ([] if not delegated_to_name else [delegated_to_name])
-            except json.JSONDecodeError:
-                delegated_list = ([] if not delegated_to_name else [delegated_to_name])
-            if st.session_state['user_role'] == 'SPV' and user_name in delegated_list:
-                is_approver = True
-        
-        if is_approver:
-            if project_name not in docs_by_project:
-                docs_by_project[project_name] = []
-            docs_by_project[project_name].append(pending_data)
-            filtered_docs.append(pending_data)
+    # Filter pencarian, tipe dokumen, dan hak approver dijalankan di SQL
+    role = st.session_state['user_role']
+    doc_filter = None if filter_doc == "Semua Dokumen" else filter_doc
+    filtered_count = count_pending_approvals(role, user_name, search_query, doc_filter)
     
-    if not filtered_docs:
+    if not filtered_count:
         st.warning("🔍 Tidak ada dokumen yang sesuai dengan filter.")
         return
     
+    # Aksi massal berlaku untuk semua dokumen sesuai filter, bukan hanya halaman ini
+    if st.session_state.get('execute_approve_all', False) or st.session_state.get('execute_reject_all', False):
+        filtered_docs = get_pending_approvals(role, user_name, search_query, doc_filter)
+    
     # Execute bulk actions
     if st.session_state.get('execute_approve_all', False):
-        success_count = 0
-        fail_count = 0
-        
-        with st.spinner(f"🔄 Memproses {len(filtered_docs)} dokumen..."):
-            for pending_data in filtered_docs:
-                project_id, doc_col, file_path, uploaded_by, timestamp, project_name, item, part_no, customer, upload_source = pending_data
-                try:
-                    approve_uploaded_file(project_id, doc_col, file_path, st.session_state['user_id'])
-                    success_count += 1
-                except Exception as e:
-                    fail_count += 1
-                    st.error(f"❌ Gagal menyetujui {doc_col} - {project_name}: {str(e)}")
+        approve_items = [
+            {'project_id': pending_data[0], 'doc_column': pending_data[1], 'file_path': pending_data[2], 'timestamp': pending_data[4]}
+            for pending_data in filtered_docs
+        ]
+        progress_bar = st.progress(0.0, text=f"🔄 Memproses {len(approve_items)} dokumen...")
+        result = approve_pending_files(
+            approve_items, st.session_state['user_id'],
+            progress_callback=lambda done, total: progress_bar.progress(done / total, text=f"🔄 {done}/{total} dokumen diproses")
+        )
+        success_count = result['approved']
+        fail_count = result['failed']
+        for error in result['errors']:
+            st.error(f"❌ Gagal menyetujui dokumen proyek #{error['project_id']}: {error['error']}")
         
         st.session_state['execute_approve_all'] = False
         
         if success_count > 0:
-            st.success(f"✅ Berhasil menyetujui {success_count} dokumen!")
+            st.success(f"✅ Berhasil menyetujui {success_count} dokumen dari {result['projects']} proyek!")
+        if result['completed_projects']:
+            st.success(f"🎉 {len(result['completed_projects'])} proyek otomatis diubah menjadi Done.")
         if fail_count > 0:
             st.error(f"❌ Gagal menyetujui {fail_count} dokumen")
         
@@ -2684,7 +4676,7 @@ def show_approval_list():
         
         with st.spinner(f"🔄 Memproses {len(filtered_docs)} dokumen..."):
             for pending_data in filtered_docs:
-                project_id, doc_col, file_path, uploaded_by, timestamp, project_name, item, part_no, customer, upload_source = pending_data
+                project_id, doc_col, file_path, uploaded_by, timestamp, project_name, item, part_no, customer, upload_source, uploader_name, pending_rowid = pending_data
                 try:
                     reject_uploaded_file(project_id, doc_col, file_path, st.session_state['user_id'])
                     success_count += 1
@@ -2702,15 +4694,55 @@ def show_approval_list():
         time.sleep(1)
         st.rerun()
     
-    st.success(f"✅ Menampilkan {len(filtered_docs)} dokumen")
+    # Paginasi keyset: hanya satu halaman yang di-query dan dirender
+    page_size = st.session_state.get('approval_page_size', APPROVAL_PAGE_SIZES[1])
+    page_signature = (role, search_query, doc_filter, page_size)
+    if st.session_state.get('approval_page_signature') != page_signature:
+        # Filter / ukuran halaman berubah: kembali ke halaman pertama
+        st.session_state['approval_page_signature'] = page_signature
+        st.session_state['approval_page_cursors'] = [None]
+    cursors = st.session_state['approval_page_cursors']
+    page_docs = get_pending_approvals(role, user_name, search_query, doc_filter, after=cursors[-1], limit=page_size)
+    if not page_docs and len(cursors) > 1:
+        # Halaman ini kosong (mis. setelah approve), mundur satu halaman
+        cursors.pop()
+        page_docs = get_pending_approvals(role, user_name, search_query, doc_filter, after=cursors[-1], limit=page_size)
+    
+    page_number = len(cursors)
+    page_count = max(1, -(-filtered_count // page_size))
+    first_index = (page_number - 1) * page_size + 1
+    st.success(f"✅ Menampilkan {first_index}–{first_index + len(page_docs) - 1} dari {filtered_count} dokumen")
+    
+    def render_pager(position):
+        col_prev, col_info, col_size, col_next = st.columns([1, 2, 1, 1])
+        with col_prev:
+            if st.button("⬅️ Sebelumnya", key=f"approval_prev_{position}", disabled=page_number == 1, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+        with col_info:
+            st.markdown(f"<p style='text-align: center; margin-top: 8px;'>Halaman <b>{page_number}</b> dari <b>{page_count}</b></p>", unsafe_allow_html=True)
+        with col_size:
+            if position == "top":
+                st.selectbox("Per halaman", APPROVAL_PAGE_SIZES, index=APPROVAL_PAGE_SIZES.index(page_size),
+                             key="approval_page_size", label_visibility="collapsed")
+        with col_next:
+            has_next = page_number < page_count and len(page_docs) == page_size
+            if st.button("Berikutnya ➡️", key=f"approval_next_{position}", disabled=not has_next, use_container_width=True):
+                last = page_docs[-1]
+                cursors.append((last[4], last[11]))
+                st.rerun()
+    
+    render_pager("top")
     
     # Display documents individually with full details (not grouped by project)
-    for idx, pending_data in enumerate(filtered_docs):
-        project_id, doc_col, file_path, uploaded_by, timestamp, project_name, item, part_no, customer, upload_source = pending_data
+    # Thumbnail & metadata dari background job; file yang belum punya dijadwalkan
+    page_file_meta = get_file_metadata_map([d[2] for d in page_docs], schedule_missing=True)
+    
+    for idx, pending_data in enumerate(page_docs):
+        project_id, doc_col, file_path, uploaded_by, timestamp, project_name, item, part_no, customer, upload_source, uploader_name, pending_rowid = pending_data
         file_name = Path(file_path).name
         file_ext = Path(file_path).suffix.lower()
-        uploader_info = get_user_by_id(uploaded_by)
-        uploader_name = uploader_info['full_name'] if uploader_info else uploaded_by
+        file_meta = page_file_meta.get(file_path)
         
         # Determine upload source label
         source_badge = ""
@@ -2726,7 +4758,10 @@ def show_approval_list():
             # Compact or Detail view
             if view_mode == "Compact":
                 # Compact Card View
-                st.markdown(f"""
+                col_thumb, col_card = st.columns([1, 5])
+                with col_thumb:
+                    render_file_thumbnail(file_meta, width=110)
+                col_card.markdown(f"""
                 <div style='background: linear-gradient(135deg, #ffffff 0%, #f8f9fa 100%);
                             border-left: 4px solid #667eea;
                             border-radius: 10px;
@@ -2810,31 +4845,21 @@ def show_approval_list():
                     st.write("**⏰ Waktu Upload:**", timestamp[:16])
                     st.write("**📂 Dokumen:**", doc_col)
                 
+                render_file_thumbnail(file_meta, width=180)
+                
             # Action buttons - Always shown
             st.markdown("<br>", unsafe_allow_html=True)
             col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 1])
             
             with col1:
-                # Get file content dengan error handling
-                file_content = get_file_content(file_path)
-                
-                if file_content is not None:
-                    st.download_button(
-                        label="⬇️ Download",
-                        data=file_content,
-                        file_name=file_name,
-                        key=f"dl_approve_{idx}_{project_id}_{doc_col}",
-                        use_container_width=True,
-                        help=f"Download file: {file_name}"
-                    )
-                else:
-                    st.button(
-                        "⬇️ Download", 
-                        disabled=True, 
-                        key=f"dl_approve_{idx}_{project_id}_{doc_col}",
-                        use_container_width=True,
-                        help="❌ File tidak dapat diakses. File mungkin telah dipindah atau dihapus dari server."
-                    )
+                # Isi file baru dibaca saat tombol diklik
+                if not file_download_button(
+                    "⬇️ Download",
+                    file_path,
+                    key=f"dl_approve_{idx}_{project_id}_{doc_col}",
+                    file_name=file_name,
+                    help=f"Download file: {file_name}"
+                ):
                     st.error(f"⚠️ File tidak ditemukan: `{Path(file_path).name}`")
             
             with col2:
@@ -2891,88 +4916,103 @@ def show_approval_list():
                                 )
                             
                             try:
-                                with st.spinner("🔄 Memuat preview PDF..."):
-                                    # Render PDF sebagai gambar menggunakan PyMuPDF
-                                    images, total_pages = render_pdf_as_images(file_path, max_pages=25, zoom=1.5)
+                                # Render progresif: slot per halaman dibuat dulu, gambar diisi
+                                # begitu worker selesai (halaman dari cache langsung tampil)
+                                total_pages, page_stream = stream_pdf_pages(file_path, max_pages=25, zoom=1.5)
+                                num_pages = min(total_pages, 25)
+                                
+                                if num_pages > 0:
+                                    status_placeholder = st.empty()
+                                    status_placeholder.info(f"🔄 Memuat preview PDF... (0/{num_pages} halaman)")
+                                    st.divider()
                                     
-                                    if images and len(images) > 0:
-                                        st.success(f"✅ Berhasil memuat {len(images)} halaman dari total {total_pages} halaman")
-                                        st.divider()
+                                    slots = {}
+                                    if view_mode == "🔲 Grid":
+                                        # Mode Grid - 5 kolom
+                                        cols_per_row = 5
+                                        num_rows = (num_pages + cols_per_row - 1) // cols_per_row
                                         
-                                        if view_mode == "🔲 Grid":
-                                            # Mode Grid - 5 kolom
-                                            cols_per_row = 5
-                                            num_rows = (len(images) + cols_per_row - 1) // cols_per_row
-                                            
-                                            for row in range(num_rows):
-                                                cols = st.columns(cols_per_row)
-                                                
-                                                for col_idx in range(cols_per_row):
-                                                    img_idx = row * cols_per_row + col_idx
-                                                    
-                                                    if img_idx < len(images):
-                                                        with cols[col_idx]:
-                                                            # Card-like container untuk setiap halaman
-                                                            st.markdown(f"""
-                                                            <div style='text-align: center; 
-                                                                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                                                                        color: white;
-                                                                        padding: 8px; 
-                                                                        border-radius: 8px 8px 0 0; 
-                                                                        margin-bottom: 0;
-                                                                        font-weight: 600;
-                                                                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>
-                                                                📄 Halaman {img_idx + 1}
-                                                            </div>
-                                                            """, unsafe_allow_html=True)
-                                                            
-                                                            # Image dengan border dan shadow
-                                                            st.markdown("""
-                                                            <style>
-                                                            .stImage > img {
-                                                                border: 2px solid #e5e7eb;
-                                                                border-radius: 0 0 8px 8px;
-                                                                box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                                                            }
-                                                            </style>
-                                                            """, unsafe_allow_html=True)
-                                                            
-                                                            st.image(images[img_idx], use_container_width=True)
-                                                
-                                                # Spacing antar row
-                                                if row < num_rows - 1:
-                                                    st.markdown("<br>", unsafe_allow_html=True)
+                                        # Image dengan border dan shadow
+                                        st.markdown("""
+                                        <style>
+                                        .stImage > img {
+                                            border: 2px solid #e5e7eb;
+                                            border-radius: 0 0 8px 8px;
+                                            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+                                        }
+                                        </style>
+                                        """, unsafe_allow_html=True)
                                         
-                                        else:
-                                            # Mode List - 1 kolom (full width)
-                                            for img_idx, img in enumerate(images):
-                                                st.markdown(f"""
-                                                <div style='text-align: center; 
-                                                            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                                                            color: white;
-                                                            padding: 12px; 
-                                                            border-radius: 10px; 
-                                                            margin: 20px 0 10px 0;
-                                                            font-weight: 600;
-                                                            font-size: 18px;
-                                                            box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
-                                                    📄 Halaman {img_idx + 1}
-                                                </div>
-                                                """, unsafe_allow_html=True)
+                                        for row in range(num_rows):
+                                            cols = st.columns(cols_per_row)
+                                            
+                                            for col_idx in range(cols_per_row):
+                                                img_idx = row * cols_per_row + col_idx
                                                 
-                                                st.image(img, use_container_width=True)
-                                        
-                                        # Info jika ada halaman lebih banyak
-                                        if total_pages > len(images):
-                                            st.divider()
-                                            st.info(f"ℹ️ Preview menampilkan {len(images)} halaman pertama. Total dokumen: **{total_pages} halaman**. Download untuk melihat semua halaman.")
+                                                if img_idx < num_pages:
+                                                    with cols[col_idx]:
+                                                        # Card-like container untuk setiap halaman
+                                                        st.markdown(f"""
+                                                        <div style='text-align: center; 
+                                                                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                                                                    color: white;
+                                                                    padding: 8px; 
+                                                                    border-radius: 8px 8px 0 0; 
+                                                                    margin-bottom: 0;
+                                                                    font-weight: 600;
+                                                                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>
+                                                            📄 Halaman {img_idx + 1}
+                                                        </div>
+                                                        """, unsafe_allow_html=True)
+                                                        slots[img_idx] = st.empty()
+                                                        slots[img_idx].caption("⏳ Memuat...")
+                                            
+                                            # Spacing antar row
+                                            if row < num_rows - 1:
+                                                st.markdown("<br>", unsafe_allow_html=True)
                                     
-                                    elif total_pages > 0:
-                                        st.error(f"❌ Tidak dapat me-render PDF (Total: {total_pages} halaman)")
-                                        st.info("💡 File mungkin corrupt atau format tidak didukung. Coba download file.")
                                     else:
-                                        st.error("❌ File PDF kosong atau tidak valid")
-                                        st.info("💡 Silakan upload ulang file yang valid.")
+                                        # Mode List - 1 kolom (full width)
+                                        for img_idx in range(num_pages):
+                                            st.markdown(f"""
+                                            <div style='text-align: center; 
+                                                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                                                        color: white;
+                                                        padding: 12px; 
+                                                        border-radius: 10px; 
+                                                        margin: 20px 0 10px 0;
+                                                        font-weight: 600;
+                                                        font-size: 18px;
+                                                        box-shadow: 0 4px 6px rgba(0,0,0,0.1);'>
+                                                📄 Halaman {img_idx + 1}
+                                            </div>
+                                            """, unsafe_allow_html=True)
+                                            slots[img_idx] = st.empty()
+                                            slots[img_idx].caption("⏳ Memuat...")
+                                    
+                                    loaded_pages = set()
+                                    for page_num, image_data in page_stream:
+                                        slots[page_num].image(image_data, use_container_width=True)
+                                        loaded_pages.add(page_num)
+                                        status_placeholder.info(f"🔄 Memuat preview PDF... ({len(loaded_pages)}/{num_pages} halaman)")
+                                    
+                                    for page_num, slot in slots.items():
+                                        if page_num not in loaded_pages:
+                                            slot.warning("⚠️ Halaman gagal dimuat")
+                                    
+                                    if loaded_pages:
+                                        status_placeholder.success(f"✅ Berhasil memuat {len(loaded_pages)} halaman dari total {total_pages} halaman")
+                                    else:
+                                        status_placeholder.error(f"❌ Tidak dapat me-render PDF (Total: {total_pages} halaman)")
+                                        st.info("💡 File mungkin corrupt atau format tidak didukung. Coba download file.")
+                                    
+                                    # Info jika ada halaman lebih banyak
+                                    if total_pages > num_pages:
+                                        st.divider()
+                                        st.info(f"ℹ️ Preview menampilkan {num_pages} halaman pertama. Total dokumen: **{total_pages} halaman**. Download untuk melihat semua halaman.")
+                                else:
+                                    st.error("❌ File PDF kosong atau tidak valid")
+                                    st.info("💡 Silakan upload ulang file yang valid.")
                                 
                             except Exception as e:
                                 st.error(f"❌ Tidak dapat menampilkan preview: {str(e)}")
@@ -2982,11 +5022,92 @@ def show_approval_list():
                         st.info("Preview hanya tersedia untuk file PDF. Silakan download untuk melihat file lainnya.")
                 
                 # Separator between documents
-                if idx < len(project_docs) - 1:
+                if idx < len(page_docs) - 1:
                     st.markdown("<hr style='margin: 20px 0; border: 1px dashed #e0e0e0;'>", unsafe_allow_html=True)
+    
+    render_pager("bottom")
 
 # --- Tab Dashboard Proyek (dengan sub-tab) ---
+@st.cache_data(show_spinner=False, max_entries=8)
+def _cached_dashboard_metrics(versions, today):
+    conn = get_conn()
+    total_projects = pd.read_sql_query("SELECT status, created_at FROM projects", conn)
+    total_users = pd.read_sql_query("SELECT id, is_approved FROM users", conn)
+    audit_logs = pd.read_sql_query("SELECT timestamp, user_id FROM audit_logs", conn)
+    conn.close()
+
+    pending_projects_count = total_projects[total_projects['status'] == 'On Progress'].shape[0]
+    completed_projects_count = total_projects[total_projects['status'] == 'Done'].shape[0]
+    total_users_count = total_users[total_users['is_approved'] == 1].shape[0]
+    
+    if not audit_logs.empty:
+        audit_logs['timestamp'] = pd.to_datetime(audit_logs['timestamp'])
+        active_users_today = audit_logs[audit_logs['timestamp'].dt.date == today]['user_id'].nunique()
+    else:
+        active_users_today = 0
+
+    total_projects['created_at'] = pd.to_datetime(total_projects['created_at'])
+    this_month_start = today.replace(day=1)
+    last_month_start = (this_month_start - datetime.timedelta(days=1)).replace(day=1)
+    
+    monthly_projects_count = total_projects[
+        (total_projects['created_at'].dt.date >= this_month_start)
+    ].shape[0]
+    last_month_projects_count = total_projects[
+        (total_projects['created_at'].dt.date >= last_month_start) &
+        (total_projects['created_at'].dt.date < this_month_start)
+    ].shape[0]
+    
+    if last_month_projects_count > 0:
+        monthly_change_percent = ((monthly_projects_count - last_month_projects_count) / last_month_projects_count) * 100
+    else:
+        monthly_change_percent = 0
+
+    return {
+        'pending_projects_count': int(pending_projects_count),
+        'completed_projects_count': int(completed_projects_count),
+        'total_users_count': int(total_users_count),
+        'active_users_today': int(active_users_today),
+        'monthly_projects_count': int(monthly_projects_count),
+        'monthly_change_percent': monthly_change_percent
+    }
+
+def get_dashboard_metrics():
+    """Metrik stat card dashboard, di-cache lintas sesi sampai projects/users/audit_logs berubah (atau ganti hari)."""
+    return _cached_dashboard_metrics(get_data_versions(('projects', 'users', 'audit_logs')), datetime.date.today())
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _cached_project_export_xlsx(versions):
+    df_view = load_df()
+    if df_view.empty:
+        return None
+    rows = []
+    doc_types = get_doc_registry()
+    for r in df_view.to_dict(orient='records'):
+        base = {c: r[c] for c in ['NO', 'ITEM', 'PART NO', 'PROJECT', 'CUSTOMER', 'STATUS', 'PIC', 'PROJECT START DATE', 'PROJECT END DATE']}
+        for doc_type in doc_types:
+            cell = r.get(doc_type.name, {})
+            if doc_type.is_multiple:
+                values = (json.dumps(cell.get('paths')) if cell.get('paths') else "",)
+            else:
+                values = (cell.get('path', ""), cell.get('date', ""))
+            values += (cell.get('delegated_to', ""), cell.get('start_date', ""), cell.get('end_date', ""))
+            base.update(zip(doc_type.export_columns, values))
+        rows.append(base)
+    out_df = pd.DataFrame(rows)
+    buf = BytesIO()
+    out_df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+def build_project_export_xlsx():
+    """Bytes file Excel seluruh proyek (None jika kosong); dibuat ulang hanya jika data proyek berubah."""
+    return _cached_project_export_xlsx(get_data_versions(PROJECT_FRAME_TABLES))
+
 def show_dashboard_tab():
+    # Registry diambil sekali per render, bukan per baris/kolom
+    doc_types = get_doc_registry()
+    all_doc_cols = doc_types.names
+
     dashboard_subtabs = st.tabs([
         "📈 Ringkasan & Log", 
         "📋 Monitoring Proyek", 
@@ -2996,39 +5117,13 @@ def show_dashboard_tab():
     with dashboard_subtabs[0]:
         st.subheader("Ringkasan Dashboard 📊")
         # --- Perhitungan Metrik untuk Stat Card ---
-        conn = get_conn()
-        total_projects = pd.read_sql_query("SELECT status, created_at FROM projects", conn)
-        total_users = pd.read_sql_query("SELECT id, is_approved FROM users", conn)
-        audit_logs = pd.read_sql_query("SELECT timestamp, user_id FROM audit_logs", conn)
-        conn.close()
-
-        pending_projects_count = total_projects[total_projects['status'] == 'On Progress'].shape[0]
-        completed_projects_count = total_projects[total_projects['status'] == 'Done'].shape[0]
-        total_users_count = total_users[total_users['is_approved'] == 1].shape[0]
-        
-        today = datetime.date.today()
-        if not audit_logs.empty:
-            audit_logs['timestamp'] = pd.to_datetime(audit_logs['timestamp'])
-            active_users_today = audit_logs[audit_logs['timestamp'].dt.date == today]['user_id'].nunique()
-        else:
-            active_users_today = 0
-
-        total_projects['created_at'] = pd.to_datetime(total_projects['created_at'])
-        this_month_start = datetime.date.today().replace(day=1)
-        last_month_start = (this_month_start - datetime.timedelta(days=1)).replace(day=1)
-        
-        monthly_projects_count = total_projects[
-            (total_projects['created_at'].dt.date >= this_month_start)
-        ].shape[0]
-        last_month_projects_count = total_projects[
-            (total_projects['created_at'].dt.date >= last_month_start) &
-            (total_projects['created_at'].dt.date < this_month_start)
-        ].shape[0]
-        
-        if last_month_projects_count > 0:
-            monthly_change_percent = ((monthly_projects_count - last_month_projects_count) / last_month_projects_count) * 100
-        else:
-            monthly_change_percent = 0
+        metrics = get_dashboard_metrics()
+        pending_projects_count = metrics['pending_projects_count']
+        completed_projects_count = metrics['completed_projects_count']
+        total_users_count = metrics['total_users_count']
+        active_users_today = metrics['active_users_today']
+        monthly_projects_count = metrics['monthly_projects_count']
+        monthly_change_percent = metrics['monthly_change_percent']
 
         # --- Tampilan Stat Card (Sudah Diperbarui) ---
         col1, col2, col3, col4 = st.columns(4)
@@ -3336,18 +5431,8 @@ def show_dashboard_tab():
             table_data = []
             for _, row in filtered_df.iterrows():
                 # Hitung progress kelengkapan dokumen
-                all_doc_cols = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-                total_docs = len(all_doc_cols)
-                completed_docs = 0
-                
-                for col_name in all_doc_cols:
-                    doc_data = row.get(col_name, {})
-                    if col_name in MULTIPLE_FILE_DOCS:
-                        if doc_data.get('paths'):
-                            completed_docs += 1
-                    else:
-                        if doc_data.get('path'):
-                            completed_docs += 1
+                total_docs = len(doc_types)
+                completed_docs = sum(1 for doc_type in doc_types if doc_type.is_filled(row.get(doc_type.name)))
                 
                 progress_percentage = (completed_docs / total_docs * 100) if total_docs > 0 else 0
                 
@@ -3510,22 +5595,9 @@ def show_dashboard_tab():
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    all_doc_cols = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-                    
                     # Hitung progress kelengkapan dokumen
-                    total_docs = len(all_doc_cols)
-                    completed_docs = 0
-                    
-                    for col_name in all_doc_cols:
-                        doc_data = row.get(col_name, {})
-                        if col_name in MULTIPLE_FILE_DOCS:
-                            # Multiple file doc
-                            if doc_data.get('paths'):
-                                completed_docs += 1
-                        else:
-                            # Single file doc
-                            if doc_data.get('path'):
-                                completed_docs += 1
+                    total_docs = len(doc_types)
+                    completed_docs = sum(1 for doc_type in doc_types if doc_type.is_filled(row.get(doc_type.name)))
                     
                     progress_percentage = (completed_docs / total_docs * 100) if total_docs > 0 else 0
                     
@@ -3613,7 +5685,7 @@ def show_dashboard_tab():
                         for col_name in all_doc_cols:
                             doc_data = row.get(col_name, {})
                             # Cek apakah dokumen multiple file atau single file
-                            if col_name in MULTIPLE_FILE_DOCS:
+                            if doc_types.is_multiple(col_name):
                                 doc_status = doc_data['status']
                             else:
                                 doc_status = "✅ Lengkap" if doc_data.get("path") else "⏳ Belum Selesai"
@@ -3655,41 +5727,11 @@ def show_dashboard_tab():
                     
                     with col_download:
                         st.markdown("<br>", unsafe_allow_html=True)
-                        # Collect all files untuk download
-                        import zipfile
-                        from io import BytesIO
-                        
-                        all_files_exist = False
-                        zip_buffer = BytesIO()
-                        
-                        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                            for col_name in all_doc_cols:
-                                if col_name in MULTIPLE_FILE_DOCS and row[col_name]['paths']:
-                                    for file_path in row[col_name]['paths']:
-                                        try:
-                                            full_path = Path(file_path)
-                                            if full_path.exists():
-                                                file_data = full_path.read_bytes()
-                                                zip_file.writestr(f"{col_name}/{full_path.name}", file_data)
-                                                all_files_exist = True
-                                        except:
-                                            pass
-                                elif col_name not in MULTIPLE_FILE_DOCS:
-                                    rev_hist = get_revision_history(row['NO'], col_name)
-                                    if rev_hist:
-                                        valid_revisions = [rev for rev in rev_hist if rev['revision_number'] != -1]
-                                        for rev in valid_revisions:
-                                            try:
-                                                full_path = Path(rev['file_path'])
-                                                if full_path.exists():
-                                                    file_data = full_path.read_bytes()
-                                                    zip_file.writestr(f"{col_name}/Rev{rev['revision_number']}_{full_path.name}", file_data)
-                                                    all_files_exist = True
-                                            except:
-                                                pass
+                        # Daftar file di-cache per data_version; ZIP baru dibangun saat tombol diklik
+                        zip_entries = get_project_bundle_entries(row['NO'])
+                        all_files_exist = bool(zip_entries)
                         
                         if all_files_exist:
-                            zip_buffer.seek(0)
                             # Buat nama file dengan format: PartName_PartNumber_Project_Customer_All_Documents.zip
                             part_name = str(row.get('ITEM', '')).replace(' ', '_').replace('/', '-')
                             part_number = str(row.get('PART NO', '')).replace(' ', '_').replace('/', '-')
@@ -3698,12 +5740,12 @@ def show_dashboard_tab():
                             
                             zip_filename = f"{part_name}_{part_number}_{project_name}_{customer_name}_All_Documents.zip"
                             
-                            st.download_button(
-                                label="📦 Download All",
-                                data=zip_buffer.getvalue(),
-                                file_name=zip_filename,
+                            deferred_download_button(
+                                "📦 Download All",
+                                lambda: build_bundle(zip_entries).read_bytes(),
+                                zip_filename,
+                                key=f"download_all_{row['NO']}",
                                 mime="application/zip",
-                                use_container_width=True,
                                 type="primary"
                             )
                         else:
@@ -3752,7 +5794,8 @@ def show_dashboard_tab():
                     # Tabs untuk setiap dokumen agar lebih terorganisir
                     doc_tabs = st.tabs(all_doc_cols)
                     
-                    for tab_idx, col_name in enumerate(all_doc_cols):
+                    for tab_idx, doc_type in enumerate(doc_types):
+                        col_name = doc_type.name
                         with doc_tabs[tab_idx]:
                             # Header dokumen yang lebih menarik
                             st.markdown(f"""
@@ -3783,7 +5826,7 @@ def show_dashboard_tab():
                             with st.expander("📤 Upload File Manual", expanded=False):
                                 st.markdown("**Upload file baru untuk dokumen ini**")
                                 
-                                if col_name in MULTIPLE_FILE_DOCS:
+                                if doc_type.is_multiple:
                                     # Multiple files upload
                                     manual_upload_files = st.file_uploader(
                                         f"Pilih file untuk {col_name} (bisa lebih dari 1)",
@@ -3825,46 +5868,43 @@ def show_dashboard_tab():
                                                     # Simpan file
                                                     file_ext = Path(manual_upload_file.name).suffix
                                                     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                                                    safe_filename = f"{col_name.replace(' ', '_').replace('/', '_')}_{timestamp}{file_ext}"
+                                                    safe_filename = f"{doc_type.key}_{timestamp}{file_ext}"
                                                     file_path = FILES_DIR / safe_filename
                                                     
-                                                    with open(file_path, "wb") as f:
-                                                        f.write(manual_upload_file.getbuffer())
-                                                    
                                                     # Update database
                                                     conn = get_conn()
                                                     c = conn.cursor()
                                                     
-                                                    col_field = col_name.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
+                                                    stored = ingest_upload(manual_upload_file, file_path, conn=conn)
                                                     
                                                     # Get revision number
-                                                    c.execute(f"SELECT {col_field}_path FROM projects WHERE id = ?", (project_id,))
-                                                    current = c.fetchone()
+                                                    current_path = get_project_document(project_id, col_name, cursor=c)['file_path']
                                                     
                                                     # Gunakan relative path untuk kompatibilitas intranet
-                                                    relative_path = get_relative_path(file_path)
+                                                    relative_path = stored['relative_path']
                                                     
-                                                    if current and current[0]:
+                                                    if current_path:
                                                         # Ada file sebelumnya, buat revision
                                                         c.execute("SELECT MAX(revision_number) FROM revision_history WHERE project_id = ? AND doc_column = ?",
                                                                 (project_id, col_name))
                                                         max_rev = c.fetchone()[0]
                                                         new_rev = (max_rev or 0) + 1
                                                         
-                                                        c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by) VALUES (?, ?, ?, ?, ?, ?)",
-                                                                (project_id, col_name, new_rev, relative_path, datetime.datetime.now().isoformat(), user_id))
+                                                        c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by, file_sha256, file_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                                                (project_id, col_name, new_rev, relative_path, datetime.datetime.now().isoformat(), user_id, stored['sha256'], stored['size']))
                                                     else:
                                                         # File pertama, revision 1
-                                                        c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by) VALUES (?, ?, ?, ?, ?, ?)",
-                                                                (project_id, col_name, 1, relative_path, datetime.datetime.now().isoformat(), user_id))
+                                                        c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by, file_sha256, file_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                                                (project_id, col_name, 1, relative_path, datetime.datetime.now().isoformat(), user_id, stored['sha256'], stored['size']))
                                                     
                                                     # Update project table
                                                     upload_date = datetime.datetime.now().strftime('%d-%m-%Y')
-                                                    c.execute(f"UPDATE projects SET {col_field}_path = ?, {col_field}_date = ? WHERE id = ?",
-                                                            (relative_path, upload_date, project_id))
+                                                    save_project_document(c, project_id, col_name,
+                                                                          file_path=relative_path, upload_date=upload_date)
                                                     
                                                     conn.commit()
                                                     conn.close()
+                                                    schedule_file_metadata([relative_path])
                                                     
                                                     log_audit(user_id, "upload file manual", {
                                                         "project_id": int(project_id),  # Convert to int
@@ -3882,7 +5922,7 @@ def show_dashboard_tab():
                             st.markdown("---")
                             
                             # Cek apakah dokumen multiple files
-                            if col_name in MULTIPLE_FILE_DOCS and row[col_name]['paths']:
+                            if doc_type.is_multiple and row[col_name]['paths']:
                                 st.markdown(f"""
                                 <div style='background: #f0fdf4; padding: 10px 15px; border-radius: 8px; 
                                             margin-bottom: 15px; border-left: 4px solid #22c55e;'>
@@ -3893,6 +5933,7 @@ def show_dashboard_tab():
                                 """, unsafe_allow_html=True)
                                 
                                 # Display files dalam cards yang lebih rapi
+                                file_meta_map = get_file_metadata_map(row[col_name]['paths'], schedule_missing=True)
                                 for index, file_path in enumerate(row[col_name]['paths']): 
                                     file_name = Path(file_path).name
                                     
@@ -3908,13 +5949,13 @@ def show_dashboard_tab():
                                             st.error(f"❌ Path bukan file: {file_name}")
                                             continue
                                         
-                                        file_data = full_file_path.read_bytes()
+                                        file_bytes = full_file_path.stat().st_size
                                         
-                                        if not file_data:
+                                        if not file_bytes:
                                             st.warning(f"⚠️ File kosong: {file_name}")
                                             continue
                                             
-                                        file_size = len(file_data) / 1024  # KB
+                                        file_size = file_bytes / 1024  # KB
                                         
                                         # File card dengan styling modern
                                         col_file1, col_file2 = st.columns([4, 1])
@@ -3925,7 +5966,7 @@ def show_dashboard_tab():
                                                         box-shadow: 0 1px 3px rgba(0,0,0,0.1);
                                                         transition: all 0.3s ease;'>
                                                 <div style='display: flex; align-items: center;'>
-                                                    <span style='font-size: 24px; margin-right: 12px;'>📎</span>
+                                                    {thumbnail_img_html(file_meta_map.get(file_path), fallback="<span style='font-size: 24px; margin-right: 12px;'>📎</span>")}
                                                     <div>
                                                         <p style='margin: 0; font-weight: 600; color: #1e293b; font-size: 14px;'>
                                                             {file_name}
@@ -3939,19 +5980,18 @@ def show_dashboard_tab():
                                             """, unsafe_allow_html=True)
                                         with col_file2:
                                             st.markdown("<br>", unsafe_allow_html=True)
-                                            st.download_button(
-                                                label="⬇️ Download",
-                                                data=file_data,
-                                                file_name=file_name,
-                                                key=f"download_multi_{row['NO']}_{col_name.replace(' ', '_')}_{file_name}_{index}",
-                                                use_container_width=True
+                                            file_download_button(
+                                                "⬇️ Download",
+                                                file_path,
+                                                key=f"download_multi_{row['NO']}_{doc_type.key}_{file_name}_{index}",
+                                                file_name=file_name
                                             )
                                     except FileNotFoundError:
                                         st.error(f"❌ File tidak ditemukan: **{file_name}**")
                                     except Exception as e:
                                         st.error(f"❌ Gagal membaca file **{file_name}**: {e}")
                             
-                            elif col_name not in MULTIPLE_FILE_DOCS:
+                            elif not doc_type.is_multiple:
                                 # Single file document dengan revision history
                                 rev_hist = get_revision_history(row['NO'], col_name)
                                 
@@ -3969,8 +6009,10 @@ def show_dashboard_tab():
                                         </div>
                                         """, unsafe_allow_html=True)
                                         
+                                        file_meta_map = get_file_metadata_map([rev['file_path'] for rev in valid_revisions], schedule_missing=True)
                                         for rev in valid_revisions:
                                             rev_file_name = Path(rev['file_path']).name
+                                            rev_meta = file_meta_map.get(rev['file_path'])
                                             rev_date = rev['timestamp'].split('T')[0]
                                             rev_time = rev['timestamp'].split('T')[1].split('.')[0] if 'T' in rev['timestamp'] else ''
                                             
@@ -3988,12 +6030,13 @@ def show_dashboard_tab():
                                                                     min-width: 65px; text-align: center;'>
                                                             Rev {rev['revision_number']}
                                                         </div>
+                                                        {thumbnail_img_html(rev_meta)}
                                                         <div style='flex: 1;'>
                                                             <p style='margin: 0; font-weight: 600; color: #1e293b; font-size: 14px;'>
                                                                 📄 {rev_file_name}
                                                             </p>
                                                             <p style='margin: 6px 0 0 0; font-size: 12px; color: #64748b;'>
-                                                                👤 {rev['uploaded_by']} • 📅 {rev_date} {rev_time}
+                                                                👤 {rev['uploaded_by']} • 📅 {rev_date} {rev_time}{" • " + describe_file_metadata(rev_meta) if describe_file_metadata(rev_meta) else ""}
                                                             </p>
                                                         </div>
                                                     </div>
@@ -4001,22 +6044,19 @@ def show_dashboard_tab():
                                                 """, unsafe_allow_html=True)
                                             with col_rev2:
                                                 st.markdown("<br>", unsafe_allow_html=True)
-                                                rev_file_content = get_file_content(rev['file_path'])
-                                                if rev_file_content:
+                                                if get_file_size(rev['file_path']):
                                                     # Buat key unik dengan menambahkan timestamp
-                                                    unique_key = f"download_rev_{row['NO']}_{col_name.replace(' ', '_').replace('/', '_')}_{rev['revision_number']}_{rev['timestamp'].replace(':', '').replace('-', '').replace('.', '').replace('T', '')}"
-                                                    st.download_button(
-                                                        label="⬇️ Download",
-                                                        data=rev_file_content,
-                                                        file_name=rev_file_name,
+                                                    unique_key = f"download_rev_{row['NO']}_{doc_type.key}_{rev['revision_number']}_{rev['timestamp'].replace(':', '').replace('-', '').replace('.', '').replace('T', '')}"
+                                                    file_download_button(
+                                                        "⬇️ Download",
+                                                        rev['file_path'],
                                                         key=unique_key,
-                                                        use_container_width=True
+                                                        file_name=rev_file_name
                                                     )
                                                 else:
                                                     st.error("❌ Error")
                                     else:
                                         # Fallback: Cek apakah ada file di projects table
-                                        col_key = col_name.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
                                         current_file_path = row[col_name].get('path')
                                         
                                         if current_file_path:
@@ -4033,12 +6073,12 @@ def show_dashboard_tab():
                                             try:
                                                 full_file_path = Path(current_file_path)
                                                 if full_file_path.exists() and full_file_path.is_file():
-                                                    file_data = full_file_path.read_bytes()
+                                                    file_bytes = full_file_path.stat().st_size
                                                     
-                                                    if not file_data:
+                                                    if not file_bytes:
                                                         st.warning(f"⚠️ File kosong: {file_name}")
                                                     else:
-                                                        file_size = len(file_data) / 1024  # KB
+                                                        file_size = file_bytes / 1024  # KB
                                                         
                                                         col_file1, col_file2 = st.columns([4, 1])
                                                         with col_file1:
@@ -4066,12 +6106,11 @@ def show_dashboard_tab():
                                                             """, unsafe_allow_html=True)
                                                         with col_file2:
                                                             st.markdown("<br>", unsafe_allow_html=True)
-                                                            st.download_button(
-                                                                label="⬇️ Download",
-                                                                data=file_data,
-                                                                file_name=file_name,
-                                                                key=f"download_fallback_{row['NO']}_{col_name.replace(' ', '_').replace('/', '_')}_{file_name}",
-                                                                use_container_width=True
+                                                            file_download_button(
+                                                                "⬇️ Download",
+                                                                current_file_path,
+                                                                key=f"download_fallback_{row['NO']}_{doc_type.key}_{file_name}",
+                                                                file_name=file_name
                                                             )
                                                 else:
                                                     st.error(f"❌ File tidak ditemukan: {current_file_path}")
@@ -4088,7 +6127,6 @@ def show_dashboard_tab():
                                             """, unsafe_allow_html=True)
                                 else:
                                     # Fallback: Cek apakah ada file di projects table
-                                    col_key = col_name.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
                                     current_file_path = row[col_name].get('path')
                                     
                                     if current_file_path:
@@ -4105,8 +6143,7 @@ def show_dashboard_tab():
                                         try:
                                             full_file_path = Path(current_file_path)
                                             if full_file_path.exists():
-                                                file_data = full_file_path.read_bytes()
-                                                file_size = len(file_data) / 1024  # KB
+                                                file_size = full_file_path.stat().st_size / 1024  # KB
                                                 
                                                 col_file1, col_file2 = st.columns([4, 1])
                                                 with col_file1:
@@ -4134,12 +6171,11 @@ def show_dashboard_tab():
                                                     """, unsafe_allow_html=True)
                                                 with col_file2:
                                                     st.markdown("<br>", unsafe_allow_html=True)
-                                                    st.download_button(
-                                                        label="⬇️ Download",
-                                                        data=file_data,
-                                                        file_name=file_name,
-                                                        key=f"download_fallback_norev_{row['NO']}_{col_name.replace(' ', '_').replace('/', '_')}_{file_name}",
-                                                        use_container_width=True
+                                                    file_download_button(
+                                                        "⬇️ Download",
+                                                        current_file_path,
+                                                        key=f"download_fallback_norev_{row['NO']}_{doc_type.key}_{file_name}",
+                                                        file_name=file_name
                                                     )
                                             else:
                                                 st.error(f"❌ File tidak ditemukan: {current_file_path}")
@@ -4326,30 +6362,9 @@ def show_dashboard_tab():
         st.subheader("Export Data Proyek")
         st.info("Ekspor semua data proyek ke dalam format Excel untuk analisis lebih lanjut.")
         if st.button('Export ke Excel'):
-            export_df = load_df()
-            if not export_df.empty:
-                rows = []
-                all_cols = BASE_COLUMNS + DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-                for _, r in export_df.iterrows():
-                    base = {c: r[c] for c in ['NO', 'ITEM', 'PART NO', 'PROJECT', 'CUSTOMER', 'STATUS', 'PIC', 'PROJECT START DATE', 'PROJECT END DATE']}
-                    all_doc_cols = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-                    for col in all_doc_cols:
-                        cell = r.get(col, {})
-                        if col in MULTIPLE_FILE_DOCS:
-                            base[col + ' - PATHS'] = json.dumps(cell.get('paths'))
-                        else:
-                            base[col + ' - PATH'] = cell.get('path')
-                            base[col + ' - DATE'] = cell.get('date')
-                        
-                        base[col + ' - DELEGATED_TO'] = cell.get('delegated_to')
-                        base[col + ' - START_DATE'] = cell.get('start_date')
-                        base[col + ' - END_DATE'] = cell.get('end_date')
-                    rows.append(base)
-                out_df = pd.DataFrame(rows)
-                buf = BytesIO()
-                out_df.to_excel(buf, index=False)
-                buf.seek(0)
-                st.download_button('Download .xlsx', data=buf, file_name='project_monitor_export.xlsx', mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            export_bytes = build_project_export_xlsx()
+            if export_bytes:
+                st.download_button('Download .xlsx', data=export_bytes, file_name='project_monitor_export.xlsx', mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
                 st.success("File berhasil diunduh!")
             else:
                 st.warning("Tidak ada data untuk diekspor.")
@@ -4363,7 +6378,8 @@ def show_management_tab():
         "➕ Tambah Proyek", 
         "✏️ Edit Proyek", 
         "🗑️ Hapus Proyek", 
-        "📤 Delegasi Dokumen"
+        "📤 Delegasi Dokumen",
+        "📦 Ekspor Dokumen"
     ])
     
     with project_tabs[0]:
@@ -4374,6 +6390,124 @@ def show_management_tab():
         delete_project_form()
     with project_tabs[3]:
         delegate_doc_form()
+    with project_tabs[4]:
+        bulk_export_form()
+
+def bulk_export_form():
+    st.markdown("### 📦 Ekspor Dokumen Multi-Proyek")
+    st.info("💡 Kumpulkan semua dokumen yang sudah disetujui dari banyak proyek ke satu arsip ZIP (satu folder per proyek + index.csv), mis. untuk permintaan auditor.")
+    
+    customers = [r['customer'] for r in fetchall("SELECT DISTINCT customer FROM projects WHERE customer IS NOT NULL AND customer != '' ORDER BY customer")]
+    doc_types = get_doc_registry()
+    
+    with st.form("bulk_export_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            sel_customers = st.multiselect("Customer", customers, placeholder="Semua customer")
+            sel_statuses = st.multiselect("Status Proyek", PROJECT_STATUS, placeholder="Semua status")
+            part_no_query = st.text_input("Part No mengandung", placeholder="mis. awalan part family")
+        with col2:
+            period = st.date_input("Periode proyek (irisan tanggal mulai–selesai)", value=[], format="DD-MM-YYYY")
+            sel_docs = st.multiselect("Jenis Dokumen", doc_types.names, placeholder="Semua dokumen")
+            latest_only = st.checkbox("Hanya revisi terbaru (dokumen single)", value=False)
+        submitted = st.form_submit_button("📦 Buat Arsip Ekspor", type="primary")
+    
+    if submitted:
+        date_from = period[0] if len(period) > 0 else None
+        date_to = period[1] if len(period) > 1 else None
+        try:
+            job_id = enqueue_export_job({
+                'customers': sel_customers, 'statuses': sel_statuses, 'part_no_query': part_no_query,
+                'date_from': date_from, 'date_to': date_to, 'doc_names': sel_docs, 'latest_only': latest_only
+            }, st.session_state['user_id'])
+        except Exception as e:
+            st.error(f"Gagal membuat job ekspor: {e}")
+        else:
+            st.session_state['export_job_id'] = job_id
+            st.info(f"📥 Job ekspor #{job_id} dibuat. Arsip disiapkan di latar belakang - halaman ini boleh ditinggal.")
+    
+    show_export_jobs(st.session_state['user_id'])
+
+def show_export_jobs(user_id):
+    """Panel job ekspor milik user; polling otomatis selama masih ada job aktif."""
+    jobs = get_user_jobs(user_id, kinds=EXPORT_JOB_KINDS, limit=5)
+    if not jobs:
+        return
+    if _st_fragment is not None and any(job['status'] in JOB_ACTIVE_STATUSES for job in jobs):
+        _st_fragment(run_every=JOB_UI_REFRESH_SECONDS)(_export_jobs_panel)(user_id, polling=True)
+    else:
+        _export_jobs_panel(user_id)
+
+def _export_jobs_panel(user_id, polling=False):
+    jobs = get_user_jobs(user_id, kinds=EXPORT_JOB_KINDS, limit=5)
+    active = any(job['status'] in JOB_ACTIVE_STATUSES for job in jobs)
+    if polling and not active:
+        st.rerun()
+    
+    st.markdown("---")
+    col_title, col_refresh = st.columns([4, 1])
+    with col_title:
+        st.markdown("#### 📦 Arsip Ekspor Saya")
+    with col_refresh:
+        if _st_fragment is None and active:
+            if st.button("🔄 Refresh Status", key="refresh_export_jobs", use_container_width=True):
+                st.rerun()
+    
+    jobs_by_id = {job['id']: job for job in jobs}
+    if st.session_state.get('export_job_id') in jobs_by_id:
+        st.session_state['export_job_select'] = st.session_state.pop('export_job_id')
+    job_id = st.selectbox(
+        "Pilih job ekspor",
+        list(jobs_by_id),
+        format_func=lambda jid: _format_job_label(jobs_by_id[jid]),
+        key="export_job_select"
+    )
+    job = jobs_by_id[job_id]
+    
+    if job['status'] in JOB_ACTIVE_STATUSES:
+        total = job['total'] or 0
+        if job['status'] == 'queued':
+            progress_label = "Menunggu worker..."
+        elif not total:
+            progress_label = "Mengumpulkan daftar file..."
+        else:
+            progress_label = f"Mengekspor {job['processed']}/{total} file..."
+        st.progress(min(job['processed'] / total, 1.0) if total else 0.0, text=progress_label)
+        if job['cancel_requested']:
+            st.caption("🚫 Pembatalan diminta - ekspor segera dihentikan.")
+        elif st.button("🚫 Batalkan Ekspor", key=f"cancel_export_{job_id}"):
+            request_job_cancel(job_id, user_id)
+            st.rerun()
+        return
+    if job['status'] == 'failed':
+        st.error(f"❌ Ekspor gagal: {job['error'] or '-'}")
+        return
+    
+    result = job['result']
+    if job['status'] != 'done' or not result:
+        return
+    if not result['files'] and not result['missing']:
+        st.warning("Tidak ada dokumen yang cocok dengan filter.")
+        return
+    st.success(f"✅ {result['files']} file ({result['bytes'] / 1024 / 1024:.1f} MB) dari {result['projects']} proyek "
+               f"diekspor ke {len(result['volumes'])} volume ZIP")
+    if result['missing']:
+        st.warning(f"⚠️ {result['missing']} file tidak ditemukan di server (tercatat di index.csv).")
+    for number, name in enumerate(result['volumes'], start=1):
+        path = EXPORT_DIR / name
+        size = get_file_size(path)
+        label = f"⬇️ Volume {number}/{len(result['volumes'])}"
+        if size is not None:
+            label += f" ({size / 1024 / 1024:.1f} MB)"
+        file_download_button(
+            label, path, key=f"download_export_{name}", mime="application/zip",
+            type="primary" if number == 1 else "secondary",
+            unavailable_help=f"Arsip sudah dihapus (disimpan {EXPORT_RETENTION_DAYS} hari)."
+        )
+    caption = f"Arsip disimpan {EXPORT_RETENTION_DAYS} hari di server."
+    if len(result['volumes']) > 1:
+        caption += " Setiap volume adalah ZIP mandiri; index.csv seluruh ekspor ada di volume terakhir."
+    st.caption(caption)
 
 # --- Forms untuk Proyek ---
 def add_project_form():
@@ -4780,14 +6914,16 @@ def edit_project_form():
                 
         st.markdown("---")
         st.subheader("Manajemen Dokumen & Persetujuan")
-        all_doc_cols = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
+        project_docs = get_project_documents(row_id)
         
-        for doc_col in all_doc_cols:
+        for doc_type in get_doc_registry():
+            doc_col = doc_type.name
             st.markdown(f"#### {doc_col}")
-            key = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
+            key = doc_type.key
+            doc_record = project_docs.get(doc_col, _empty_project_document())
 
             # Perubahan di sini: Cek apakah dokumen multiple files
-            if doc_col in MULTIPLE_FILE_DOCS:
+            if doc_type.is_multiple:
                 uploaded_files = st.file_uploader(
                     f"Unggah file baru untuk {doc_col}",
                     accept_multiple_files=True,
@@ -4812,16 +6948,11 @@ def edit_project_form():
                     st.info("File yang sama sudah diproses. Pilih file berbeda untuk mengunggah ulang.")
 
                 # Tampilkan daftar file yang sudah ada
-                paths_json = row_data.get(f"{key}_paths")
-                try:
-                    existing_paths = json.loads(paths_json) if paths_json else []
-                except json.JSONDecodeError:
-                    existing_paths = []
-
+                existing_paths = doc_record['file_paths']
                 
                 if existing_paths:
                     st.markdown("###### Daftar File Tersedia")
-                    delegated_to_user = row_data.get(f"{key}_delegated_to")
+                    delegated_to_user = doc_record['delegated_to']
                     role = st.session_state.get('user_role')
                     current_name = get_user_by_id(st.session_state['user_id'])['full_name']
                     allowed_delete = (role in ['Admin', 'Manager']) or (delegated_to_user and current_name == delegated_to_user)
@@ -4831,11 +6962,12 @@ def edit_project_form():
                         col_f1, col_f2 = st.columns([3,1])
                         with col_f1:
                             st.markdown(f"- **{file_name}** (Tanggal: {upload_date})")
-                            st.download_button(
-                                label=f"Download {file_name}",
-                                data=get_file_content(path),
+                            file_download_button(
+                                f"Download {file_name}",
+                                path,
+                                key=f"mgmt_download_multi_{row_id}_{key}_{idx}",
                                 file_name=file_name,
-                                key=f"mgmt_download_multi_{row_id}_{key}_{idx}"
+                                use_container_width=False
                             )
                         with col_f2:
                             if allowed_delete:
@@ -4858,7 +6990,7 @@ def edit_project_form():
                     pending_path, uploaded_by = pending_file
                     st.warning(f"Ada file yang menunggu persetujuan dari **{uploaded_by}**.")
                     
-                    delegated_to_user = row_data.get(f"{key}_delegated_to")
+                    delegated_to_user = doc_record['delegated_to']
                     current_user_name = get_user_by_id(st.session_state['user_id'])['full_name']
                     role = st.session_state.get('user_role')
                     
@@ -4903,10 +7035,10 @@ def upload_doc_form():
     
     delegated_docs = {}
     project_details = {}
+    doc_types = get_doc_registry()
     
     for _, row in df_view.iterrows():
-        all_doc_cols = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-        for doc_col in all_doc_cols:
+        for doc_col in doc_types.names:
             doc_data = row.get(doc_col, {})
             if not isinstance(doc_data, dict):
                 continue
@@ -4995,22 +7127,11 @@ def upload_doc_form():
             st.markdown("---")
             st.markdown("**📊 Statistik Upload:**")
             total_docs = len(delegated_docs[selected_project])
-            row_data = get_row_details(project_id)
-            uploaded_count = 0
-            
-            for doc_col in delegated_docs[selected_project]:
-                key = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-                if doc_col in MULTIPLE_FILE_DOCS:
-                    paths_json = row_data.get(f"{key}_paths")
-                    try:
-                        existing_paths = json.loads(paths_json) if paths_json else []
-                        if existing_paths:
-                            uploaded_count += 1
-                    except:
-                        pass
-                else:
-                    if row_data.get(f"{key}_path"):
-                        uploaded_count += 1
+            project_docs = get_project_documents(project_id)
+            uploaded_count = sum(
+                1 for doc_col in delegated_docs[selected_project]
+                if project_docs.get(doc_col, {}).get('has_file')
+            )
             
             st.markdown(f"""
             <div style='background: #ecfdf5; padding: 15px; border-radius: 10px; text-align: center;'>
@@ -5032,7 +7153,7 @@ def upload_doc_form():
             </div>
             """, unsafe_allow_html=True)
             
-            row_data = get_row_details(project_id)
+            project_docs = get_project_documents(project_id)
             
             # Grid 5 kolom untuk dokumen
             docs_list = delegated_docs[selected_project]
@@ -5045,24 +7166,22 @@ def upload_doc_form():
                     doc_idx = i + col_idx
                     if doc_idx < len(docs_list):
                         doc_col = docs_list[doc_idx]
-                        key = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
+                        doc_type = doc_types[doc_col]
+                        key = doc_type.key
+                        doc_record = project_docs.get(doc_col, _empty_project_document())
                         
                         with col:
                             # Cek status dokumen
                             is_uploaded = False
                             file_count = 0
                             
-                            if doc_col in MULTIPLE_FILE_DOCS:
-                                paths_json = row_data.get(f"{key}_paths")
-                                try:
-                                    existing_paths = json.loads(paths_json) if paths_json else []
-                                    if existing_paths:
-                                        is_uploaded = True
-                                        file_count = len(existing_paths)
-                                except:
-                                    pass
+                            if doc_type.is_multiple:
+                                existing_paths = doc_record['file_paths']
+                                if existing_paths:
+                                    is_uploaded = True
+                                    file_count = len(existing_paths)
                             else:
-                                if row_data.get(f"{key}_path"):
+                                if doc_record['file_path']:
                                     is_uploaded = True
                                     file_count = 1
                                 else:
@@ -5124,7 +7243,7 @@ def upload_doc_form():
                             
                             # Expander untuk upload
                             with st.expander("📤 Upload", expanded=False):
-                                if doc_col in MULTIPLE_FILE_DOCS:
+                                if doc_type.is_multiple:
                                     # Multiple Files
                                     st.caption("📁 Multiple Files")
                                     
@@ -5153,17 +7272,13 @@ def upload_doc_form():
                                             st.warning("⚠️ Sudah diupload")
                                     
                                     # List files
-                                    paths_json = row_data.get(f"{key}_paths")
-                                    try:
-                                        existing_paths = json.loads(paths_json) if paths_json else []
-                                    except:
-                                        existing_paths = []
+                                    existing_paths = doc_record['file_paths']
                                     
                                     if existing_paths:
                                         st.caption(f"📁 {len(existing_paths)} file")
                                         role = st.session_state.get('user_role')
                                         current_name = get_user_by_id(st.session_state['user_id'])['full_name']
-                                        delegated_to_user = row_data.get(f"{key}_delegated_to")
+                                        delegated_to_user = doc_record['delegated_to']
                                         allowed_delete = (role in ['Admin','Manager']) or (delegated_to_user and current_name == delegated_to_user)
                                         
                                         for idx, path in enumerate(existing_paths):
@@ -5171,11 +7286,12 @@ def upload_doc_form():
                                             st.caption(f"{idx+1}. {file_name[:15]}...")
                                             col_d1, col_d2 = st.columns(2)
                                             with col_d1:
-                                                st.download_button(
+                                                file_download_button(
                                                     "⬇️",
-                                                    data=get_file_content(path),
+                                                    path,
+                                                    key=f"dl_multi_{project_id}_{key}_{idx}",
                                                     file_name=file_name,
-                                                    key=f"dl_multi_{project_id}_{key}_{idx}"
+                                                    use_container_width=False
                                                 )
                                             with col_d2:
                                                 if allowed_delete:
@@ -5236,7 +7352,7 @@ def delete_project_form():
 def delegate_doc_form():
     df_view = load_df()
     pids = get_all_pids()
-    current_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
+    doc_types = get_doc_registry()
 
     if df_view.empty:
         st.info("Belum ada proyek untuk dikelola.")
@@ -5261,12 +7377,15 @@ def delegate_doc_form():
         st.markdown(f"**Proyek:** {row_data['project']} | **Item:** {row_data['item']} | **Part No:** {row_data['part_no']}")
         st.markdown("---")
 
+        project_docs = get_project_documents(row_id)
+
         with st.form(key=f"delegate_form_{row_id}"):
-            for doc_col in current_docs:
-                key = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
-                existing_delegated = row_data.get(f"{key}_delegated_to", None)
-                existing_start = row_data.get(f"{key}_start_date", row_data.get('project_start_date'))
-                existing_end = row_data.get(f"{key}_end_date", row_data.get('project_end_date'))
+            for doc_type in doc_types:
+                doc_col, key = doc_type.name, doc_type.key
+                doc_record = project_docs.get(doc_col, _empty_project_document())
+                existing_delegated = doc_record['delegated_to']
+                existing_start = doc_record['start_date']
+                existing_end = doc_record['end_date']
                 
                 st.markdown(f"##### {doc_col}")
                 
@@ -5274,11 +7393,7 @@ def delegate_doc_form():
                 
                 with col_del:
                     # Multiselect delegasi
-                    existing_list_json = row_data.get(f"{key}_delegated_to_list")
-                    try:
-                        existing_list = json.loads(existing_list_json) if existing_list_json else ([] if not existing_delegated else [existing_delegated])
-                    except json.JSONDecodeError:
-                        existing_list = ([] if not existing_delegated else [existing_delegated])
+                    existing_list = doc_record['delegated_to_list'] or ([] if not existing_delegated else [existing_delegated])
                     delegated_to = st.multiselect(
                         "Didelegasikan ke",
                         pids,
@@ -5295,8 +7410,8 @@ def delegate_doc_form():
             submit_button = st.form_submit_button("Simpan Delegasi")
 
             if submit_button:
-                for doc_col in current_docs:
-                    key = doc_col.replace(' ', '_').replace('/', '_').replace('.', '').replace('-', '_')
+                for doc_type in doc_types:
+                    doc_col, key = doc_type.name, doc_type.key
                     delegated_to = st.session_state[f"del_{row_id}_{key}"]
                     start_date = st.session_state[f"start_{row_id}_{key}"]
                     end_date = st.session_state[f"end_{row_id}_{key}"]
@@ -5530,7 +7645,43 @@ def calculate_similarity(str1, str2):
         return 0.0
     return SequenceMatcher(None, str1.upper(), str2.upper()).ratio() * 100
 
-def extract_doc_info_from_filename(filename):
+FILE_EXTENSION_RE = re.compile(r'\.[^.]+$')
+# Dihapus berurutan seperti sebelumnya: "Rev.0"/"Rev 1" lalu "Revision 2"
+REV_SUFFIX_RES = (
+    re.compile(r'\s+Rev\.?\s*\d+', re.IGNORECASE),
+    re.compile(r'\s+Revision\.?\s*\d+', re.IGNORECASE),
+)
+PART_NO_SEPARATED_RE = re.compile(r'[A-Z0-9]+[-_][A-Z0-9]+', re.IGNORECASE)
+LETTER_RE = re.compile(r'[A-Z]', re.IGNORECASE)
+DIGIT_RE = re.compile(r'\d')
+
+def _split_part_name_number(text):
+    """Pisahkan sisa nama file menjadi (part_name, part_number)."""
+    # Try to split by common part number patterns
+    # Part numbers usually contain alphanumeric with dashes/underscores
+    # Pattern: BS-062A-2, 062A-2, Y4L, RDBSD-N, etc.
+    parts = text.strip().split()
+    
+    # Look for part number pattern (usually the last significant alphanumeric segment before REV):
+    # 1. Contains dash/underscore: BS-062A-2, RDBSD-N
+    # 2. Short alphanumeric codes: Y4L, 0W010, KVB (usually 3-6 chars)
+    # 3. Mix of letters and numbers: 012, 55311-52500-XD1
+    for i in range(len(parts) - 1, -1, -1):
+        part = parts[i]
+        
+        # Pattern 1: Contains dash or underscore
+        if PART_NO_SEPARATED_RE.search(part):
+            return ' '.join(parts[:i]).strip(), part
+        
+        # Pattern 2: Short alphanumeric (3-6 chars, mix of letters and numbers)
+        if 3 <= len(part) <= 6 and LETTER_RE.search(part) and DIGIT_RE.search(part):
+            # Likely a part number code like Y4L, 0W010
+            return ' '.join(parts[:i]).strip(), part
+    
+    # If no clear part number found, use all remaining text as part name
+    return ' '.join(parts).strip(), ""  # Empty part number is OK
+
+def extract_doc_info_from_filename(filename, registry=None):
     """
     Extract document type, part name, and part number from filename
     Example: "FMEA ENGINE BRACKET YHA (062A) BS-062A-2 Rev.0.pdf"
@@ -5539,76 +7690,267 @@ def extract_doc_info_from_filename(filename):
         'part_name': 'ENGINE BRACKET YHA (062A)',
         'part_number': 'BS-062A-2'
     }
+    Jenis dokumen = awalan terpanjang dari registry (lihat DocTypeRegistry.match_prefix).
+    Untuk banyak file sekaligus, berikan `registry` agar tidak dicek ulang per file.
     """
     # Remove file extension
-    name_without_ext = re.sub(r'\.[^.]+$', '', filename)
+    name_without_ext = FILE_EXTENSION_RE.sub('', filename)
+    
+    doc_type = (registry or get_doc_registry()).match_prefix(name_without_ext)
+    if doc_type is None:
+        return None
+    # Remove doc type from filename
+    name_without_ext = name_without_ext[len(doc_type.name):].strip()
     
-    # List of known document types
-    all_doc_types = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
+    # Remove common suffixes like "Rev.0", "Rev 1", etc.
+    for pattern in REV_SUFFIX_RES:
+        name_without_ext = pattern.sub('', name_without_ext)
     
-    # Try to find document type at the beginning of filename
+    part_name, part_number = _split_part_name_number(name_without_ext)
+    return {
+        'doc_type': doc_type.name,
+        'part_name': part_name or "",
+        'part_number': part_number or ""
+    }
+
+def _extract_doc_info_linear(filename, doc_names):
+    """Implementasi lama (startswith berurutan, regex per token). Hanya dipakai benchmark_filename_parsing sebagai pembanding."""
+    name_without_ext = re.sub(r'\.[^.]+$', '', filename)
     doc_type_found = None
-    for doc_type in all_doc_types:
-        # Check if filename starts with this doc type
+    for doc_type in doc_names:
         if name_without_ext.upper().startswith(doc_type.upper()):
             doc_type_found = doc_type
-            # Remove doc type from filename
             name_without_ext = name_without_ext[len(doc_type):].strip()
             break
-    
     if not doc_type_found:
         return None
-    
-    # Remove common suffixes like "Rev.0", "Rev 1", etc.
     name_without_ext = re.sub(r'\s+Rev\.?\s*\d+', '', name_without_ext, flags=re.IGNORECASE)
     name_without_ext = re.sub(r'\s+Revision\.?\s*\d+', '', name_without_ext, flags=re.IGNORECASE)
-    
-    # Try to split by common part number patterns
-    # Part numbers usually contain alphanumeric with dashes/underscores
-    # Pattern: BS-062A-2, 062A-2, Y4L, RDBSD-N, etc.
     parts = name_without_ext.strip().split()
-    
-    # Try to identify part number (usually the last significant alphanumeric segment before REV)
     part_number = ""
     part_name = ""
-    
-    # Look for part number pattern (contains dash, underscore, or specific code patterns)
-    # Part number patterns:
-    # 1. Contains dash/underscore: BS-062A-2, RDBSD-N
-    # 2. Short alphanumeric codes: Y4L, 0W010, KVB (usually 3-6 chars)
-    # 3. Mix of letters and numbers: 012, 55311-52500-XD1
-    
     found_part_number = False
     for i in range(len(parts) - 1, -1, -1):
         part = parts[i]
-        
-        # Pattern 1: Contains dash or underscore
         if re.search(r'[A-Z0-9]+-[A-Z0-9]+', part, re.IGNORECASE) or re.search(r'[A-Z0-9]+_[A-Z0-9]+', part, re.IGNORECASE):
             part_number = part
             part_name = ' '.join(parts[:i]).strip()
             found_part_number = True
             break
-        
-        # Pattern 2: Short alphanumeric (3-6 chars, mix of letters and numbers)
         if 3 <= len(part) <= 6 and re.search(r'[A-Z]', part, re.IGNORECASE) and re.search(r'\d', part):
-            # Likely a part number code like Y4L, 0W010
             part_number = part
             part_name = ' '.join(parts[:i]).strip()
             found_part_number = True
             break
-    
-    # If no clear part number found, use all remaining text as part name
     if not found_part_number:
         part_name = ' '.join(parts).strip()
-        part_number = ""  # Empty part number is OK
+        part_number = ""
+    return {'doc_type': doc_type_found, 'part_name': part_name or "", 'part_number': part_number or ""}
+
+def benchmark_filename_parsing(n_files=50000, seed=42):
+    """
+    Benchmark extract_doc_info_from_filename pada nama file sintetis: pencocokan
+    linear lama (startswith per jenis dokumen, sesuai urutan registry) vs regex
+    awalan terpanjang. Registry ditambah jenis dokumen dinamis yang awalannya
+    sama dengan jenis default untuk menunjukkan kasus tertutup (shadowing).
+    """
+    import random
+    rng = random.Random(seed)
+    registry = DocTypeRegistry(["FMEA PROCESS", "DRAWING CUSTOMER", "PIS PACKING", "CHECK SHEET", "WORK INSTRUCTION",
+                                "PACKING STANDARD", "CONTROL PLAN", "PPAP", "APQP", "IMDS"] +
+                               [f"DOC TAMBAHAN {i}" for i in range(20)])
+    words = ["ENGINE", "BRACKET", "CYLINDER", "LINER", "CASE", "DIFF", "CARRIER", "REAR", "FRONT", "COVER",
+             "HOUSING", "SHAFT", "GEAR", "PUMP", "MOUNT", "ARM", "LOWER", "UPPER", "KNUCKLE", "HUB", "YOKE"]
+    codes = ["YHA", "Y4L", "KVB", "D26A", "(062A)", "0W010", ""]
+    filenames = []
+    for _ in range(n_files):
+        doc = rng.choice(registry.names) if rng.random() < 0.95 else "SCAN"
+        name = " ".join([doc] + rng.sample(words, rng.randint(1, 3)) + [rng.choice(codes)])
+        if rng.random() < 0.8:
+            name += f" {rng.choice(['BS', 'RD', 'KV', '55311', '12'])}-{rng.randrange(1000):03d}{rng.choice('ABCXN')}-{rng.randrange(10)}"
+        name += rng.choice([" Rev.0", " REV 1", " Rev.12", " Revision 2", ""])
+        filenames.append(" ".join(name.split()) + rng.choice([".pdf", ".PDF", ".xlsx", ".docx"]))
+
+    start = time.perf_counter()
+    legacy = [_extract_doc_info_linear(name, registry.names) for name in filenames]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [extract_doc_info_from_filename(name, registry) for name in filenames]
+    compiled_s = time.perf_counter() - start
+
+    differ = [(old, new) for old, new in zip(legacy, compiled) if old != new]
+    return {
+        'files': n_files,
+        'doc_types': len(registry),
+        'legacy_files_per_s': round(n_files / legacy_s) if legacy_s else None,
+        'compiled_files_per_s': round(n_files / compiled_s) if compiled_s else None,
+        'speedup': round(legacy_s / compiled_s, 1) if compiled_s else None,
+        'unparsed': sum(1 for info in compiled if info is None),
+        # Hasil berbeda hanya boleh terjadi karena jenis dokumen lebih pendek menutupi yang lebih panjang
+        'shadowed_in_legacy': len(differ),
+        'other_differences': sum(1 for old, new in differ
+                                 if not (old and new and new['doc_type'].upper().startswith(old['doc_type'].upper())
+                                         and len(new['doc_type']) > len(old['doc_type']))),
+    }
+
+PART_NO_KEY_LOOKUP_SQL = "SELECT id, item, part_no, project, customer FROM projects WHERE part_no_key = ? ORDER BY id"
+UPLOAD_ALIAS_LOOKUP_SQL = (
+    "SELECT p.id, p.item, p.part_no, p.project, p.customer FROM upload_aliases a JOIN projects p ON p.id = a.project_id "
+    "WHERE a.part_name_key = ? AND a.part_no_key = ? AND a.doc_type = ?"
+)
+UPLOAD_ALIAS_UPSERT_SQL = (
+    "INSERT INTO upload_aliases (part_name_key, part_no_key, doc_type, project_id, confirmations, confirmed_by, confirmed_at) "
+    "VALUES (?, ?, ?, ?, 1, ?, ?) "
+    "ON CONFLICT(part_name_key, part_no_key, doc_type) DO UPDATE SET "
+    "confirmations = CASE WHEN project_id = excluded.project_id THEN confirmations + 1 ELSE 1 END, "
+    "project_id = excluded.project_id, confirmed_by = excluded.confirmed_by, confirmed_at = excluded.confirmed_at"
+)
+
+def upload_alias_key(part_name, part_number):
+    """Kunci alias (nama part huruf besar dengan spasi tunggal, part_no_key) dari hasil parse nama file."""
+    return " ".join((part_name or "").upper().split()), part_no_key(part_number) or ""
+
+def find_upload_alias(part_name, part_number, doc_type):
+    """Proyek dari alias yang sudah pernah dikonfirmasi (approve), atau None."""
+    name_key, number_key = upload_alias_key(part_name, part_number)
+    if not name_key and not number_key:
+        return None
+    rows = fetchall(UPLOAD_ALIAS_LOOKUP_SQL, (name_key, number_key, doc_type))
+    if not rows:
+        return None
+    project_id, item, part_no, project_name, customer = rows[0].values()
+    return {
+        'project_id': project_id,
+        'item': item,
+        'part_no': part_no,
+        'project_name': project_name,
+        'customer': customer,
+        'similarity': 100.0,
+        'item_similarity': None,
+        'part_no_similarity': None,
+        'matched_by': 'alias'
+    }
+
+def record_upload_aliases(conn, aliases, user_id):
+    """
+    Simpan alias terkonfirmasi; ikut transaksi pemanggil.
+    aliases: iterable (part_name_key, part_no_key, doc_type, project_id).
+    """
+    now = datetime.datetime.now().isoformat()
+    conn.executemany(UPLOAD_ALIAS_UPSERT_SQL, [(*alias, user_id, now) for alias in aliases if alias[0] or alias[1]])
+
+def _score_project_match(project, part_name, part_number, part_no_exact=False):
+    """
+    Skor kecocokan satu proyek (id, item, part_no, project, customer) terhadap hasil parse nama file.
+    part_no_exact: part number sudah dipastikan sama lewat part_no_key (skor part_no = 100).
+    """
+    project_id, item, part_no, project_name, customer = project
+    
+    # Calculate similarity for item (always done)
+    item_similarity = calculate_similarity(part_name, item or "")
+    
+    # Calculate similarity for part_no (only if both exist)
+    if part_number and part_no:
+        part_no_similarity = 100.0 if part_no_exact else calculate_similarity(part_number, part_no)
+        # Weighted average: item 60%, part_no 40%
+        avg_similarity = (item_similarity * 0.6) + (part_no_similarity * 0.4)
+    else:
+        # Salah satu (atau keduanya) tidak punya part number - use item only
+        avg_similarity = item_similarity
+        part_no_similarity = 0
     
     return {
-        'doc_type': doc_type_found,
-        'part_name': part_name or "",
-        'part_number': part_number or ""
+        'project_id': project_id,
+        'item': item,
+        'part_no': part_no,
+        'project_name': project_name,
+        'customer': customer,
+        'similarity': avg_similarity,
+        'item_similarity': item_similarity,
+        'part_no_similarity': part_no_similarity,
+        'matched_by': 'part_no_key' if part_no_exact else 'fuzzy'
     }
 
-def find_matching_project(part_name, part_number, min_similarity=80, return_all_matches=False):
+class _CharPostings:
+    """
+    Inverted index karakter untuk satu kolom teks: per karakter (upper-case),
+    array jumlah kemunculannya di setiap baris.
+    """
+
+    def __init__(self, values):
+        texts = [(value or "").upper() for value in values]
+        self.lengths = np.fromiter((len(text) for text in texts), dtype=np.int32, count=len(texts))
+        postings = {}
+        for row, text in enumerate(texts):
+            for char, count in Counter(text).items():
+                postings.setdefault(char, {})[row] = count
+        self.postings = {}
+        for char, rows in postings.items():
+            column = np.zeros(len(texts), dtype=np.int32)
+            column[list(rows)] = list(rows.values())
+            self.postings[char] = column
+
+    def upper_bound(self, text):
+        """
+        Batas atas calculate_similarity(text, nilai baris) untuk semua baris:
+        irisan multiset karakter = SequenceMatcher.quick_ratio(), yang tidak
+        pernah lebih kecil dari ratio().
+        """
+        if not text:
+            return np.zeros(len(self.lengths))
+        text = text.upper()
+        common = np.zeros(len(self.lengths), dtype=np.int32)
+        for char, count in Counter(text).items():
+            column = self.postings.get(char)
+            if column is not None:
+                common += np.minimum(column, count)
+        return np.where(self.lengths > 0, 200.0 * common / (self.lengths + len(text)), 0.0)
+
+class ProjectMatchIndex:
+    """
+    Index kandidat untuk find_matching_project. Batas atas skor berbobot
+    (item 60% / part_no 40%) dihitung untuk semua proyek sekaligus dari inverted
+    index karakter; hanya proyek yang batas atasnya mencapai threshold yang
+    dinilai SequenceMatcher. Karena batasnya tidak pernah di bawah skor asli,
+    hasilnya sama persis dengan membandingkan semua proyek.
+    """
+
+    def __init__(self, projects):
+        self.projects = list(projects)  # (id, item, part_no, project, customer) urut id
+        self.item = _CharPostings(p[1] for p in self.projects)
+        self.part_no = _CharPostings(p[2] for p in self.projects)
+
+    def __len__(self):
+        return len(self.projects)
+
+    def candidates(self, part_name, part_number, min_similarity):
+        """Proyek yang mungkin mencapai min_similarity, dalam urutan id."""
+        bound = self.item.upper_bound(part_name)
+        if part_number:
+            weighted = bound * 0.6 + self.part_no.upper_bound(part_number) * 0.4
+            bound = np.where(self.part_no.lengths > 0, weighted, bound)
+        # Toleransi kecil untuk pembulatan float pada skor berbobot
+        return [self.projects[i] for i in np.flatnonzero(bound >= min_similarity - 1e-6)]
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_project_match_index(projects_version):
+    with db_connection() as conn:
+        projects = conn.execute("SELECT id, item, part_no, project, customer FROM projects ORDER BY id").fetchall()
+    return ProjectMatchIndex(projects)
+
+def get_project_match_index():
+    """Index pencocokan proyek, dibangun ulang hanya saat tabel projects berubah (data_version)."""
+    return _cached_project_match_index(get_data_versions(('projects',)))
+
+def _match_projects_scan(projects, part_name, part_number, min_similarity=80):
+    """Implementasi lama (skor penuh setiap proyek). Hanya dipakai benchmark_project_matching sebagai pembanding."""
+    all_matches = [_score_project_match(project, part_name, part_number) for project in projects]
+    all_matches = [match for match in all_matches if match['similarity'] >= min_similarity]
+    all_matches.sort(key=lambda x: x['similarity'], reverse=True)
+    return all_matches
+
+def find_matching_project(part_name, part_number, min_similarity=80, return_all_matches=False, doc_type=None):
     """
     Find project in database that matches the part name and part number
     with minimum similarity percentage.
@@ -5618,54 +7960,40 @@ def find_matching_project(part_name, part_number, min_similarity=80, return_all_
         part_number: The part number extracted from filename (can be empty)
         min_similarity: Minimum similarity threshold (default 80%)
         return_all_matches: If True, returns all matches sorted by similarity (for prioritization)
+        doc_type: Jenis dokumen; jika diisi, alias yang sudah dikonfirmasi dicek lebih dulu
     
     Returns:
         If return_all_matches=False: Single best match dict or None
         If return_all_matches=True: List of all matches sorted by similarity (highest first)
+        Setiap match memiliki 'matched_by': 'alias', 'part_no_key' atau 'fuzzy'.
     """
-    conn = get_conn()
-    c = conn.cursor()
-    c.execute("SELECT id, item, part_no, project, customer FROM projects")
-    projects = c.fetchall()
-    conn.close()
+    # Nama file yang sama pernah di-approve ke sebuah proyek: pakai langsung tanpa skor
+    if doc_type:
+        alias = find_upload_alias(part_name, part_number, doc_type)
+        if alias:
+            return [alias] if return_all_matches else alias
+    
+    # Jalur cepat: part number yang sama persis setelah dinormalisasi (lookup terindeks).
+    # Proyek tersebut dianggap cocok 100% pada part_no; item tetap ikut dinilai.
+    key = part_no_key(part_number)
+    if key:
+        exact_matches = []
+        for project in fetchall(PART_NO_KEY_LOOKUP_SQL, (key,)):
+            match = _score_project_match(tuple(project.values()), part_name, part_number, part_no_exact=True)
+            if match['similarity'] >= min_similarity:
+                exact_matches.append(match)
+        if exact_matches:
+            exact_matches.sort(key=lambda x: x['similarity'], reverse=True)
+            return exact_matches if return_all_matches else exact_matches[0]
+    
+    # Tidak ada part number yang sama: pencocokan fuzzy atas kandidat dari index
+    index = get_project_match_index()
     
     all_matches = []
-    
-    for project in projects:
-        project_id, item, part_no, project_name, customer = project
-        
-        # Calculate similarity for item (always done)
-        item_similarity = calculate_similarity(part_name, item or "")
-        
-        # Calculate similarity for part_no (only if both exist)
-        if part_number and part_no:
-            part_no_similarity = calculate_similarity(part_number, part_no)
-            # Weighted average: item 60%, part_no 40%
-            avg_similarity = (item_similarity * 0.6) + (part_no_similarity * 0.4)
-        elif part_number and not part_no:
-            # File has part number but project doesn't - use item only
-            avg_similarity = item_similarity
-            part_no_similarity = 0
-        elif not part_number and part_no:
-            # Project has part number but file doesn't - use item only
-            avg_similarity = item_similarity
-            part_no_similarity = 0
-        else:
-            # Neither has part number - use item only
-            avg_similarity = item_similarity
-            part_no_similarity = 0
-        
-        if avg_similarity >= min_similarity:
-            all_matches.append({
-                'project_id': project_id,
-                'item': item,
-                'part_no': part_no,
-                'project_name': project_name,
-                'customer': customer,
-                'similarity': avg_similarity,
-                'item_similarity': item_similarity,
-                'part_no_similarity': part_no_similarity
-            })
+    for project in index.candidates(part_name, part_number, min_similarity):
+        match = _score_project_match(project, part_name, part_number)
+        if match['similarity'] >= min_similarity:
+            all_matches.append(match)
     
     # Sort by similarity (highest first)
     all_matches.sort(key=lambda x: x['similarity'], reverse=True)
@@ -5675,61 +8003,136 @@ def find_matching_project(part_name, part_number, min_similarity=80, return_all_
     else:
         return all_matches[0] if all_matches else None
 
-def auto_upload_document(uploaded_file, doc_type, project_id, user_id, require_approval=True):
+def benchmark_project_matching(n_projects=10000, n_queries=40, seed=42):
+    """
+    Benchmark find_matching_project pada daftar proyek sintetis (tanpa database):
+    skor penuh setiap proyek (lama) vs kandidat dari ProjectMatchIndex.
+    Query campuran: nama persis, salah ketik/format part number, dan part yang tidak ada.
+    Lookup part_no_key (jalur cepat find_matching_project) diukur terpisah.
+    """
+    import random
+    rng = random.Random(seed)
+    words = ["ENGINE", "BRACKET", "CYLINDER", "LINER", "CASE", "DIFF", "CARRIER", "REAR", "FRONT", "COVER",
+             "HOUSING", "SHAFT", "GEAR", "PUMP", "OIL", "WATER", "MOUNT", "ARM", "LOWER", "UPPER", "KNUCKLE",
+             "HUB", "DISC", "BRAKE", "DRUM", "FLANGE", "YOKE", "BEARING", "CAP", "RH", "LH", "ASSY", "PLATE", "SUPPORT"]
+    codes = ["YHA", "Y4L", "KVB", "D26A", "(062A)", "0W010", ""]
+    projects = []
+    for i in range(1, n_projects + 1):
+        item = " ".join(rng.sample(words, rng.randint(2, 4)) + [rng.choice(codes)]).strip()
+        part_no = f"{rng.choice(['BS', 'RD', 'KV', '55311', '12'])}-{rng.randrange(1000):03d}{rng.choice('ABCXN')}-{rng.randrange(10)}"
+        projects.append((i, item, part_no if rng.random() < 0.9 else None, f"PROJECT {i % 50}", f"CUST {i % 7}"))
+
+    queries = []
+    for n in range(n_queries):
+        _, item, part_no, _, _ = rng.choice(projects)
+        kind = n % 4
+        if kind == 1:
+            # Salah ketik satu huruf + part number tanpa tanda hubung
+            pos = rng.randrange(len(item))
+            item = item[:pos] + rng.choice("ABCDEFGHIJ") + item[pos + 1:]
+            part_no = (part_no or "").replace("-", " ")
+        elif kind == 2:
+            part_no = ""
+        elif kind == 3:
+            item, part_no = " ".join(rng.sample(words, 3)), f"ZZ-{rng.randrange(10000)}"
+        queries.append((item, part_no or ""))
+
+    start = time.perf_counter()
+    scanned = [_match_projects_scan(projects, item, part_no) for item, part_no in queries]
+    scan_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = ProjectMatchIndex(projects)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = []
+    candidates = 0
+    for item, part_no in queries:
+        pool = index.candidates(item, part_no, 80)
+        candidates += len(pool)
+        indexed.append(_match_projects_scan(pool, item, part_no))
+    index_s = time.perf_counter() - start
+
+    # Jalur cepat part_no_key: lookup terindeks di SQLite in-memory dengan skema produksi
+    conn = sqlite3.connect(":memory:")
+    run_migrations(conn)
+    conn.executemany("INSERT INTO projects (id, item, part_no, project, customer) VALUES (?, ?, ?, ?, ?)", projects)
+    conn.commit()
+    keyed = [(item, part_no) for item, part_no in queries if part_no_key(part_no)]
+    start = time.perf_counter()
+    key_hits = sum(1 for _, part_no in keyed if conn.execute(PART_NO_KEY_LOOKUP_SQL, (part_no_key(part_no),)).fetchone())
+    key_s = time.perf_counter() - start
+    conn.close()
+
+    return {
+        'projects': n_projects,
+        'queries': len(queries),
+        'scan_ms_per_query': round(scan_s * 1000 / len(queries), 2),
+        'index_build_ms': round(build_s * 1000, 1),
+        'index_ms_per_query': round(index_s * 1000 / len(queries), 3),
+        'avg_candidates': round(candidates / len(queries), 1),
+        'speedup': round(scan_s / index_s) if index_s else None,
+        'part_no_key_ms_per_query': round(key_s * 1000 / len(keyed), 3) if keyed else None,
+        'part_no_key_hits': f"{key_hits}/{len(keyed)}",
+        'identical_output': scanned == indexed,
+    }
+
+def auto_upload_document(uploaded_file, doc_type, project_id, user_id, require_approval=True, file_name=None, alias=None):
     """
     Auto upload document to the specified project and document type
     
     Args:
-        uploaded_file: The uploaded file object
+        uploaded_file: The uploaded file object (or any binary file object)
         doc_type: Type of document (FMEA, PIS, etc.)
         project_id: Target project ID
         user_id: User who uploaded the file
         require_approval: If True, file will be saved as pending (-1 revision) and require approval
+        file_name: Original file name (default: uploaded_file.name)
+        alias: Kunci alias (upload_alias_key) hasil parse nama file; dicatat saat file disetujui
+    
+    Returns:
+        dict(file_path, revision, status, project_done) - revision None untuk file pending;
+        project_done True jika upload langsung membuat proyek otomatis Done.
+        Error dilempar ke pemanggil; fungsi ini tidak menulis ke UI sehingga
+        bisa dijalankan dari worker job auto upload.
     """
+    safe_name = Path(file_name or uploaded_file.name).name
+    
+    # All documents now require approval (both single and multiple)
+    conn = get_conn()
     try:
-        # Reset file pointer to beginning
-        uploaded_file.seek(0)
-        
-        # All documents now require approval (both single and multiple)
-        conn = get_conn()
         c = conn.cursor()
         
         # Fetch project details for logging
         c.execute("SELECT project, item, part_no FROM projects WHERE id = ?", (project_id,))
         proj_row = c.fetchone()
-        project_name = proj_row[0] if proj_row else None
-        item = proj_row[1] if proj_row else None
-        part_no = proj_row[2] if proj_row else None
+        if not proj_row:
+            raise ValueError(f"Proyek #{project_id} tidak ditemukan")
+        project_name, item, part_no = proj_row
         
         # Save file to temporary pending location
-        dest_dir = FILES_DIR / f"project_{project_id}" / doc_type.replace(' ', '_')
-        dest_dir.mkdir(parents=True, exist_ok=True)
+        dest_dir = FILES_DIR / f"project_{project_id}" / doc_sql_key(doc_type)
         
-        safe_name = uploaded_file.name
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        dest_path = dest_dir / f"pending_{timestamp}_{safe_name}"
-        
-        # Reset file pointer before reading
-        uploaded_file.seek(0)
-        with open(dest_path, "wb") as f:
-            shutil.copyfileobj(uploaded_file, f)
+        # Suffix acak: file bernama sama (mis. dari folder berbeda di satu ZIP) bisa
+        # masuk ke proyek/dokumen yang sama dalam detik yang sama
+        dest_path = dest_dir / f"pending_{timestamp}_{os.urandom(3).hex()}_{safe_name}"
         
-        # Verify file was created
-        if not dest_path.exists():
-            raise Exception(f"File was not saved to {dest_path}")
+        # Ditulis atomik: jika gagal, exception sudah naik sebelum baris DB dibuat
+        stored = ingest_upload(uploaded_file, dest_path, conn=conn)
+        # Gunakan relative path untuk kompatibilitas intranet
+        relative_path = stored['relative_path']
+        timestamp_now = datetime.datetime.now().isoformat()
         
         if require_approval:
             # Save as pending (revision_number = -1) - requires approval for ALL document types
-            timestamp_now = datetime.datetime.now().isoformat()
-            # Gunakan relative path untuk kompatibilitas intranet
-            relative_path = get_relative_path(dest_path)
-            c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by, upload_source) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                      (project_id, doc_type, -1, relative_path, timestamp_now, user_id, "auto_upload"))
+            alias_part_name, alias_part_no = alias or (None, None)
+            c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by, upload_source, file_sha256, file_size, alias_part_name, alias_part_no) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                      (project_id, doc_type, -1, relative_path, timestamp_now, user_id, "auto_upload", stored['sha256'], stored['size'],
+                       alias_part_name, alias_part_no))
             
-            conn.commit()
-            conn.close()
-            
-            # Log the action
+            # Log the action (ikut transaksi upload)
             log_audit(user_id, "auto-upload dokumen (pending approval)", {
                 "project_id": int(project_id),
                 "project_name": project_name,
@@ -5740,64 +8143,798 @@ def auto_upload_document(uploaded_file, doc_type, project_id, user_id, require_a
                 "file_path": str(dest_path),
                 "status": "pending_approval",
                 "source": "auto_upload",
-                "is_multiple_file_doc": doc_type in MULTIPLE_FILE_DOCS
-            })
-            
-            st.info(f"📤 File saved as PENDING: {safe_name} for project #{project_id} - {doc_type} (Requires approval)")
-            
-        else:
-                # Direct approval (old behavior) - create revision directly
-                c.execute("SELECT MAX(revision_number) FROM revision_history WHERE project_id = ? AND doc_column = ?", (project_id, doc_type))
-                max_rev = c.fetchone()[0]
-                c.execute("SELECT MAX(revision_number) FROM revision_history WHERE project_id = ? AND doc_column = ?", (project_id, doc_type))
-                max_rev = c.fetchone()[0]
-                new_rev = (max_rev or 0) + 1
-                
-                # Update revision_history - gunakan relative path
-                timestamp_now = datetime.datetime.now().isoformat()
-                relative_path = get_relative_path(dest_path)
-                c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by) VALUES (?, ?, ?, ?, ?, ?)",
-                          (project_id, doc_type, new_rev, relative_path, timestamp_now, user_id))
-                
-                # Verify insertion
-                c.execute("SELECT COUNT(*) FROM revision_history WHERE project_id = ? AND doc_column = ? AND revision_number = ?", 
-                         (project_id, doc_type, new_rev))
-                count = c.fetchone()[0]
-                if count == 0:
-                    raise Exception(f"Failed to insert revision history for {doc_type}")
-                
-                # Update projects table - gunakan relative path
-                sql = f"UPDATE projects SET {key}_path = ?, {key}_date = ? WHERE id = ?"
-                c.execute(sql, (relative_path, datetime.date.today().strftime('%d-%m-%Y'), project_id))
-                
-                conn.commit()
-                conn.close()
-                
-                # Debug info
-                st.info(f"✅ File saved: {safe_name} → Rev {new_rev} for project #{project_id} - {doc_type}")
-                
-                # Log the action
-                log_audit(user_id, "auto-upload dokumen (direct)", {
-                    "project_id": int(project_id),
-                    "project_name": project_name,
-                    "item": item,
-                    "part_no": part_no,
-                    "doc_column": doc_type,
-                    "file_name": safe_name,
-                    "file_path": str(dest_path),
-                    "revision": new_rev
-                })
-                
-                # Auto-update status if all documents complete
-                check_and_update_project_status(project_id, user_id)
+                "is_multiple_file_doc": get_doc_registry().is_multiple(doc_type)
+            }, conn=conn)
+            conn.commit()
+            schedule_file_metadata([relative_path])
+            return {'file_path': relative_path, 'revision': None, 'status': 'pending_approval', 'project_done': False}
         
-        return True
+        # Direct approval (old behavior) - create revision directly
+        c.execute("SELECT MAX(revision_number) FROM revision_history WHERE project_id = ? AND doc_column = ?", (project_id, doc_type))
+        max_rev = c.fetchone()[0]
+        new_rev = (max_rev or 0) + 1
+        
+        # Update revision_history - gunakan relative path
+        c.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by, file_sha256, file_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                  (project_id, doc_type, new_rev, relative_path, timestamp_now, user_id, stored['sha256'], stored['size']))
+        
+        # Update dokumen proyek - gunakan relative path
+        save_project_document(c, project_id, doc_type, file_path=relative_path,
+                              upload_date=datetime.date.today().strftime('%d-%m-%Y'))
+        if alias:
+            # Upload langsung tanpa approval dianggap sudah dikonfirmasi
+            record_upload_aliases(conn, [(*alias, doc_type, project_id)], user_id)
+        
+        log_audit(user_id, "auto-upload dokumen (direct)", {
+            "project_id": int(project_id),
+            "project_name": project_name,
+            "item": item,
+            "part_no": part_no,
+            "doc_column": doc_type,
+            "file_name": safe_name,
+            "file_path": str(dest_path),
+            "revision": new_rev
+        }, conn=conn)
+        conn.commit()
+    finally:
+        conn.close()
+    schedule_file_metadata([relative_path])
+    
+    # Auto-update status if all documents complete; notifikasi dirender pemanggil
+    try:
+        project_done = update_project_status_if_complete(project_id, user_id)
     except Exception as e:
-        import traceback
-        error_msg = f"Error auto-uploading {uploaded_file.name}: {str(e)}\n{traceback.format_exc()}"
-        st.error(error_msg)
-        print(error_msg)  # Print to console for debugging
-        return False
+        # File sudah tersimpan: kegagalan update status tidak menggagalkan upload
+        print(f"⚠️ Gagal auto-update status proyek #{project_id}: {e}")
+        project_done = False
+    return {'file_path': relative_path, 'revision': new_rev, 'status': 'uploaded', 'project_done': project_done}
+
+# Pola revisi pada nama file: REV.0, Rev.1, REV 01, Revision 2, R01
+REVISION_PATTERN = re.compile(r'(?:REV|Rev|rev|REVISION|Revision|revision|R)[\s._-]*(\d+(?:\.\d+)?)')
+
+def extract_revision_from_filename(filename):
+    """Nomor revisi terakhir yang tertulis di nama file (default 0.0)."""
+    matches = REVISION_PATTERN.findall(filename)
+    if matches:
+        try:
+            return float(matches[-1])
+        except ValueError:
+            pass
+    return 0.0
+
+def plan_auto_upload(items, min_similarity=80):
+    """
+    Tahap parse + fuzzy-match auto upload untuk sekumpulan file.
+    File dikelompokkan per (doc_type, part_name, part_number) agar pencocokan
+    proyek hanya dilakukan sekali per grup, lalu di dalam grup diurutkan:
+    1) nomor revisi tertinggi, 2) kecocokan nama file tertinggi.
+    
+    Args:
+        items: list of dict, minimal berisi 'file_name' (field lain ikut dikembalikan)
+    Returns:
+        list of dict (item + action, reason, doc_type, match, revision) urut prioritas upload;
+        action: 'upload', 'skipped' (proyek tidak ditemukan) atau 'failed' (nama tidak dikenali).
+    """
+    file_groups = {}
+    registry = get_doc_registry()
+    for item in items:
+        doc_info = extract_doc_info_from_filename(item['file_name'], registry)
+        key = (doc_info['doc_type'], doc_info['part_name'], doc_info['part_number']) if doc_info else None
+        file_groups.setdefault(key, []).append(dict(item, doc_info=doc_info))
+    
+    plan = []
+    for group_key, group_files in file_groups.items():
+        if group_key is None:
+            for entry in group_files:
+                plan.append(dict(entry, action='failed', reason='Tidak dapat mendeteksi jenis dokumen',
+                                 doc_type=None, match=None, revision=None))
+            continue
+        
+        doc_type, part_name, part_number = group_key
+        all_matches = find_matching_project(part_name, part_number, min_similarity=min_similarity,
+                                            return_all_matches=True, doc_type=doc_type)
+        if not all_matches:
+            for entry in group_files:
+                plan.append(dict(entry, action='skipped', doc_type=doc_type, match=None, revision=None,
+                                 reason=f"Part Name/Number tidak ditemukan (detected: {part_name} / {part_number})"))
+            continue
+        
+        best_project_match = all_matches[0]
+        for entry in group_files:
+            entry['revision'] = extract_revision_from_filename(entry['file_name'])
+            entry['file_similarity'] = calculate_similarity(entry['file_name'], best_project_match['item'])
+        group_files.sort(key=lambda x: (x['revision'], x['file_similarity']), reverse=True)
+        
+        for entry in group_files:
+            rev_info = f" • 🔄 Rev: {entry['revision']}" if entry['revision'] > 0 else ""
+            if best_project_match['matched_by'] == 'alias':
+                rev_info += " • 📌 alias"
+            plan.append(dict(entry, action='upload', doc_type=doc_type, match=best_project_match,
+                             reason=f"Upload ke: {best_project_match['item']} / {best_project_match['part_no']} - {doc_type} "
+                                    f"(Match: {best_project_match['similarity']:.1f}%{rev_info})"))
+    return plan
+
+# --- Antrian job latar (auto upload) ---
+JOB_STAGING_DIR = FILES_DIR / ".jobs"
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 2.0    # detik, worker idle mengecek job baru (juga dibangunkan saat enqueue)
+JOB_STALE_SECONDS = 300    # job 'running' tanpa heartbeat selama ini dianggap ditinggal proses yang mati
+JOB_HEARTBEAT_INTERVAL = 30  # detik, heartbeat job berjalan dikirim thread terpisah (jauh di bawah JOB_STALE_SECONDS)
+JOB_UI_REFRESH_SECONDS = 2
+JOB_ACTIVE_STATUSES = ('queued', 'running')
+AUTO_UPLOAD_JOB_KINDS = ('auto_upload', 'auto_upload_zip')
+EXPORT_JOB_KINDS = ('export',)
+JOB_KIND_LABELS = {'auto_upload': 'auto upload', 'auto_upload_zip': 'auto upload', 'export': 'ekspor dokumen'}
+AUTO_UPLOAD_EXTENSIONS = ('pdf', 'png', 'jpg', 'jpeg', 'xlsx', 'xls', 'doc', 'docx')
+JOB_STATUS_LABELS = {
+    'queued': '🕒 Antri',
+    'running': '⚙️ Berjalan',
+    'done': '✅ Selesai',
+    'failed': '❌ Gagal',
+    'canceled': '🚫 Dibatalkan',
+}
+JOB_ITEM_STATUS_LABELS = {
+    'queued': '🕒 Antri',
+    'processing': '⚙️ Diproses',
+    'pending_approval': '⏳ Pending Approval',
+    'uploaded': '✅ Terupload',
+    'skipped': '⏭️ Skip',
+    'failed': '❌ Gagal',
+    'canceled': '🚫 Dibatalkan',
+}
+JOB_CLAIM_SQL = "SELECT id, kind, created_by, created_at, params FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+USER_JOBS_SQL = (
+    "SELECT id, kind, status, created_at, started_at, finished_at, total, processed, cancel_requested, error, params, result "
+    "FROM jobs WHERE created_by = ? AND kind IN ({kinds}) ORDER BY id DESC LIMIT ?"
+)
+JOB_ITEM_COUNTS_SQL = "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status"
+
+class JobOwnershipLost(Exception):
+    """Claim job sudah tidak dimiliki worker ini (job dikembalikan ke antrian dan diambil worker lain)."""
+
+class JobQueue:
+    """
+    Antrian job persisten di SQLite (tabel jobs/job_items) dengan pool thread
+    worker per proses. Job di-claim dengan BEGIN IMMEDIATE sehingga aman dipakai
+    beberapa proses sekaligus. Progress dan hasil per item ditulis per item, jadi
+    job yang ditinggal proses mati (heartbeat basi) dikembalikan ke antrian dan
+    dilanjutkan dari item yang belum selesai.
+    
+    Setiap claim membawa token pemilik. Selama job berjalan, thread heartbeat
+    memperbarui heartbeat_at setiap JOB_HEARTBEAT_INTERVAL (tidak bergantung pada
+    lama satu item), dan semua penulisan worker disaring dengan token tersebut.
+    """
+
+    def __init__(self, handlers, workers=JOB_WORKERS):
+        self.handlers = handlers
+        self.workers = workers
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stats = {'claimed': 0, 'done': 0, 'failed': 0, 'canceled': 0, 'requeued': 0, 'lost': 0}
+
+    def start(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'job-worker-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def notify(self):
+        """Bangunkan worker idle (dipanggil setelah job baru di-commit)."""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                job = self.claim()
+            except sqlite3.Error as e:
+                print(f"❌ Gagal mengambil job: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(JOB_POLL_INTERVAL)
+                self._wake.clear()
+                continue
+            self._execute(job)
+
+    def claim(self):
+        """Ambil satu job antri (dan kembalikan job basi ke antrian); None jika kosong."""
+        now = time.time()
+        with db_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                requeued = conn.execute(
+                    "UPDATE jobs SET status = 'queued', claim_token = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                    (now - JOB_STALE_SECONDS,)
+                ).rowcount
+                row = conn.execute(JOB_CLAIM_SQL).fetchone()
+                token = os.urandom(8).hex()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?), heartbeat_at = ?, "
+                        "claim_token = ? WHERE id = ?",
+                        (datetime.datetime.now().isoformat(), now, token, row[0])
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        with self._lock:
+            self._stats['requeued'] += requeued
+            if row:
+                self._stats['claimed'] += 1
+        if not row:
+            return None
+        job_id, kind, created_by, created_at, params = row
+        # 'audit': event (user_id, action, details) dan 'result': hasil dari handler,
+        # keduanya ditulis bersama status akhir
+        return {'id': job_id, 'kind': kind, 'created_by': created_by, 'created_at': created_at,
+                'params': json.loads(params or '{}'), 'token': token, 'audit': [], 'result': None}
+
+    def _heartbeat(self, job, stop):
+        while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+            try:
+                with db_connection() as conn:
+                    owned = conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND claim_token = ?",
+                                         (time.time(), job['id'], job['token'])).rowcount
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Heartbeat job #{job['id']} gagal: {e}")
+                continue
+            if not owned:
+                return
+
+    def _execute(self, job):
+        error = None
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop),
+                                     name=f"job-heartbeat-{job['id']}", daemon=True)
+        heartbeat.start()
+        try:
+            handler = self.handlers.get(job['kind'])
+            if handler is None:
+                raise ValueError(f"Jenis job tidak dikenal: {job['kind']}")
+            status = handler(self, job)
+        except JobOwnershipLost:
+            status = None
+        except Exception as e:
+            import traceback
+            print(f"❌ Job #{job['id']} ({job['kind']}) gagal: {e}\n{traceback.format_exc()}")
+            status, error = 'failed', str(e) or type(e).__name__
+        finally:
+            stop.set()
+            heartbeat.join()
+        
+        if status is not None:
+            with db_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                result = json.dumps(job['result']) if job['result'] is not None else None
+                owned = conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, result = ?, finished_at = ?, heartbeat_at = ?, claim_token = NULL "
+                    "WHERE id = ? AND claim_token = ?",
+                    (status, error, result, datetime.datetime.now().isoformat(), time.time(), job['id'], job['token'])
+                ).rowcount
+                if owned:
+                    for user_id, action, details in job['audit']:
+                        log_audit(user_id, action, details, conn=conn)
+                conn.commit()
+            if not owned:
+                status = None
+        if status is None:
+            print(f"⚠️ Job #{job['id']} sudah diambil alih worker lain, hasil worker ini diabaikan")
+            status = 'lost'
+        with self._lock:
+            self._stats[status] = self._stats.get(status, 0) + 1
+
+    def owns(self, job):
+        """True jika claim job masih milik worker ini."""
+        with db_connection() as conn:
+            row = conn.execute("SELECT claim_token FROM jobs WHERE id = ?", (job['id'],)).fetchone()
+        return bool(row) and row[0] == job['token']
+
+    def update_item(self, job, seq, finished=True, **fields):
+        """
+        Simpan hasil satu item dan heartbeat job dalam satu transaksi.
+        Raises:
+            JobOwnershipLost jika claim job sudah berpindah ke worker lain.
+        Returns:
+            True jika user meminta job dibatalkan.
+        """
+        if finished:
+            fields['finished_at'] = datetime.datetime.now().isoformat()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with db_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            owned = conn.execute(
+                "UPDATE jobs SET processed = processed + ?, heartbeat_at = ? WHERE id = ? AND claim_token = ?",
+                (1 if finished else 0, time.time(), job['id'], job['token'])
+            ).rowcount
+            if not owned:
+                conn.rollback()
+                raise JobOwnershipLost(job['id'])
+            conn.execute(f"UPDATE job_items SET {assignments} WHERE job_id = ? AND seq = ?",
+                         (*fields.values(), job['id'], seq))
+            cancel = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job['id'],)).fetchone()
+            conn.commit()
+        return bool(cancel and cancel[0])
+
+    def update_progress(self, job, processed, total=None):
+        """
+        Simpan progress job tanpa job_items (mis. ekspor) beserta heartbeat.
+        Raises:
+            JobOwnershipLost jika claim job sudah berpindah ke worker lain.
+        Returns:
+            True jika user meminta job dibatalkan.
+        """
+        with db_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            owned = conn.execute(
+                "UPDATE jobs SET processed = ?, total = COALESCE(?, total), heartbeat_at = ? WHERE id = ? AND claim_token = ?",
+                (processed, total, time.time(), job['id'], job['token'])
+            ).rowcount
+            if not owned:
+                conn.rollback()
+                raise JobOwnershipLost(job['id'])
+            cancel = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job['id'],)).fetchone()
+            conn.commit()
+        return bool(cancel and cancel[0])
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, workers=sum(t.is_alive() for t in self._threads))
+
+def _find_recovered_upload(job, entry):
+    """
+    Item yang berstatus 'processing' saat job dilanjutkan: proses sebelumnya
+    mungkin mati setelah upload di-commit. Cari revisinya lewat checksum agar
+    file tidak terupload dua kali.
+    """
+    rows = fetchall(
+        "SELECT file_path, revision_number FROM revision_history WHERE project_id = ? AND doc_column = ? "
+        "AND file_sha256 = ? AND uploaded_by = ? AND timestamp >= ? ORDER BY timestamp DESC LIMIT 1",
+        (entry['match']['project_id'], entry['doc_type'], entry['file_sha256'], job['created_by'], job['created_at'])
+    )
+    return rows[0] if rows else None
+
+def _pending_job_items(job_id):
+    return fetchall(
+        "SELECT seq, file_name, staged_path, archive_member, file_sha256, status FROM job_items "
+        "WHERE job_id = ? AND status IN ('queued', 'processing') ORDER BY seq",
+        (job_id,)
+    )
+
+def _run_auto_upload_items(job_queue, job, items, open_item):
+    """
+    Parse -> match -> upload untuk item job auto upload, satu file per langkah.
+    open_item(entry) membuka isi file item (file stage atau anggota ZIP) sebagai file biner.
+    Returns: True jika job dibatalkan user di tengah jalan.
+    """
+    job_id = job['id']
+    require_approval = job['params'].get('require_approval', True)
+    plan = plan_auto_upload(items)
+    
+    for index, entry in enumerate(plan):
+        seq = entry['seq']
+        if entry['action'] != 'upload':
+            cancel = job_queue.update_item(job, seq, status=entry['action'], doc_type=entry['doc_type'],
+                                           message=entry['reason'])
+        else:
+            match = entry['match']
+            fields = {'doc_type': entry['doc_type'], 'project_id': match['project_id'],
+                      'similarity': match['similarity'], 'revision': entry['revision']}
+            recovered = None
+            if entry['status'] == 'processing':
+                if not entry['file_sha256']:
+                    # Anggota ZIP belum punya checksum: hitung dari arsip untuk mencari revisi yang sudah tersimpan
+                    digest = hashlib.sha256()
+                    with open_item(entry) as f:
+                        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                            digest.update(chunk)
+                    entry['file_sha256'] = digest.hexdigest()
+                recovered = _find_recovered_upload(job, entry)
+            if recovered:
+                status = 'pending_approval' if recovered['revision_number'] == -1 else 'uploaded'
+                suffix = " - Menunggu persetujuan" if status == 'pending_approval' else f" → Rev {recovered['revision_number']}"
+                cancel = job_queue.update_item(job, seq, status=status, file_path=recovered['file_path'],
+                                               message=entry['reason'] + suffix, **fields)
+            else:
+                job_queue.update_item(job, seq, finished=False, status='processing', **fields)
+                try:
+                    with open_item(entry) as f:
+                        result = auto_upload_document(f, entry['doc_type'], match['project_id'], job['created_by'],
+                                                      require_approval=require_approval, file_name=entry['file_name'],
+                                                      alias=upload_alias_key(entry['doc_info']['part_name'],
+                                                                             entry['doc_info']['part_number']))
+                    suffix = " - Menunggu persetujuan" if result['status'] == 'pending_approval' else f" → Rev {result['revision']}"
+                    if result['project_done']:
+                        suffix += " - 🎉 Proyek otomatis Done"
+                    cancel = job_queue.update_item(job, seq, status=result['status'], file_path=result['file_path'],
+                                                   message=entry['reason'] + suffix)
+                except JobOwnershipLost:
+                    raise
+                except Exception as e:
+                    print(f"❌ Job #{job_id}: gagal auto-upload {entry['file_name']}: {e}")
+                    cancel = job_queue.update_item(job, seq, status='failed', message=f"Error saat upload: {e}")
+        
+        if cancel and index + 1 < len(plan):
+            with db_connection() as conn:
+                conn.executemany(
+                    "UPDATE job_items SET status = 'canceled', message = ?, finished_at = ? WHERE job_id = ? AND seq = ?",
+                    [("Dibatalkan oleh user", datetime.datetime.now().isoformat(), job_id, rest['seq']) for rest in plan[index + 1:]]
+                )
+                conn.commit()
+            return True
+    return False
+
+def _finish_auto_upload_job(job, canceled):
+    counts = get_job_item_counts(job['id'])
+    # Ditulis JobQueue dalam transaksi yang sama dengan status akhir job
+    job['audit'].append((job['created_by'], "menyelesaikan job auto upload", {
+        "job_id": job['id'],
+        "total_files": sum(counts.values()),
+        "pending_approval": counts.get('pending_approval', 0),
+        "canceled": canceled or None
+    }))
+    return 'canceled' if canceled else 'done'
+
+def run_auto_upload_job(job_queue, job):
+    """Handler job 'auto_upload': parse -> match -> upload untuk setiap file yang di-stage."""
+    try:
+        canceled = _run_auto_upload_items(job_queue, job, _pending_job_items(job['id']),
+                                          lambda entry: open(entry['staged_path'], 'rb'))
+    finally:
+        # File stage masih dibutuhkan worker yang mengambil alih job
+        if job_queue.owns(job):
+            shutil.rmtree(JOB_STAGING_DIR / job['params']['staging'], ignore_errors=True)
+    return _finish_auto_upload_job(job, canceled)
+
+def _is_hidden_archive_member(member_path):
+    """Folder metadata macOS dan file tersembunyi di dalam ZIP diabaikan."""
+    return any(part == '__MACOSX' or part.startswith('.') for part in member_path.split('/'))
+
+def _register_archive_members(job_id, archive):
+    """
+    Buat job_items dari central directory ZIP (sekali per job; aman saat job dilanjutkan).
+    Folder bertingkat diratakan: nama file = nama dasar anggota arsip.
+    """
+    with db_connection() as conn:
+        if conn.execute("SELECT 1 FROM job_items WHERE job_id = ? LIMIT 1", (job_id,)).fetchone():
+            return
+        now = datetime.datetime.now().isoformat()
+        rows = []
+        for info in archive.infolist():
+            member_path = info.filename.replace('\\', '/')
+            if info.is_dir() or _is_hidden_archive_member(member_path):
+                continue
+            file_name = member_path.rsplit('/', 1)[-1]
+            if Path(file_name).suffix.lower().lstrip('.') in AUTO_UPLOAD_EXTENSIONS:
+                rows.append((job_id, len(rows), file_name, info.filename, 'queued', None, None))
+            else:
+                rows.append((job_id, len(rows), file_name, info.filename, 'skipped',
+                             f"Tipe file tidak didukung ({member_path})", now))
+        conn.executemany(
+            "INSERT INTO job_items (job_id, seq, file_name, archive_member, status, message, finished_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        conn.execute("UPDATE jobs SET total = ?, processed = ?, heartbeat_at = ? WHERE id = ?",
+                     (len(rows), sum(1 for row in rows if row[4] == 'skipped'), time.time(), job_id))
+        conn.commit()
+
+def run_auto_upload_zip_job(job_queue, job):
+    """
+    Handler job 'auto_upload_zip'. Arsip dibaca dari disk: hanya central directory
+    yang dimuat, lalu setiap anggota di-stream (didekompresi per chunk) langsung ke
+    ingest_upload, satu file per langkah, sehingga memori tetap datar berapa pun
+    ukuran arsipnya.
+    """
+    staging_dir = JOB_STAGING_DIR / job['params']['staging']
+    try:
+        try:
+            archive = zipfile.ZipFile(staging_dir / job['params']['archive'])
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"File ZIP tidak valid: {e}") from e
+        with archive:
+            _register_archive_members(job['id'], archive)
+            canceled = _run_auto_upload_items(job_queue, job, _pending_job_items(job['id']),
+                                              lambda entry: archive.open(entry['archive_member']))
+    finally:
+        if job_queue.owns(job):
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    return _finish_auto_upload_job(job, canceled)
+
+def run_export_job(job_queue, job):
+    """
+    Handler job 'export': kumpulkan file sesuai filter lalu tulis volume arsip ZIP.
+    Progress disimpan paling sering setiap EXPORT_PROGRESS_INTERVAL detik. Job yang
+    dilanjutkan setelah proses mati mengulang ekspor dari awal.
+    """
+    params = job['params']
+    filters = dict(params, date_from=parse_date_string(params.get('date_from')),
+                   date_to=parse_date_string(params.get('date_to')))
+    entries = collect_export_entries(**filters)
+    job_queue.update_progress(job, 0, total=len(entries))
+    last_update = time.monotonic()
+    
+    def progress(done, total):
+        nonlocal last_update
+        if done < total and time.monotonic() - last_update < EXPORT_PROGRESS_INTERVAL:
+            return False
+        last_update = time.monotonic()
+        return job_queue.update_progress(job, done)
+    
+    result = {'volumes': [], 'files': 0, 'missing': 0, 'bytes': 0}
+    if entries:
+        result = write_export_archive(entries, progress_callback=progress)
+        if result is None:
+            return 'canceled'
+    volumes = [path.name for path in result['volumes']]
+    job['result'] = dict(result, volumes=volumes, projects=len({e['project_id'] for e in entries}))
+    job['audit'].append((job['created_by'], "mengekspor dokumen multi-proyek", {
+        "job_id": job['id'],
+        "customers": params.get('customers') or None,
+        "statuses": params.get('statuses') or None,
+        "part_no_query": params.get('part_no_query'),
+        "date_from": params.get('date_from'),
+        "date_to": params.get('date_to'),
+        "doc_columns": params.get('doc_names') or None,
+        "latest_only": params.get('latest_only'),
+        "projects": job['result']['projects'],
+        "files": result['files'],
+        "missing": result['missing'],
+        "archive": volumes or None
+    }))
+    return 'done'
+
+JOB_HANDLERS = {
+    'auto_upload': run_auto_upload_job,
+    'auto_upload_zip': run_auto_upload_zip_job,
+    'export': run_export_job,
+}
+
+@st.cache_resource
+def get_job_queue():
+    job_queue = JobQueue(JOB_HANDLERS)
+    job_queue.start()
+    return job_queue
+
+def enqueue_auto_upload_job(uploaded_files, user_id, require_approval=True, progress_callback=None):
+    """
+    Stage file upload ke disk (JOB_STAGING_DIR) lalu buat job auto upload.
+    Hanya penulisan file yang terjadi di request Streamlit; parse, match, upload
+    dan audit dikerjakan worker. Returns: id job.
+    """
+    staging = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{user_id}_{os.urandom(4).hex()}"
+    staging_dir = JOB_STAGING_DIR / staging
+    rows = []
+    try:
+        for seq, uploaded_file in enumerate(uploaded_files):
+            file_name = Path(uploaded_file.name).name
+            stored = ingest_upload(uploaded_file, staging_dir / f"{seq:05d}_{file_name}")
+            rows.append((seq, file_name, str(stored['path']), stored['sha256']))
+            if progress_callback:
+                progress_callback(seq + 1, len(uploaded_files))
+        
+        with db_connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, status, created_by, created_at, total, params) VALUES (?, 'queued', ?, ?, ?, ?)",
+                ('auto_upload', user_id, datetime.datetime.now().isoformat(), len(rows),
+                 json.dumps({'staging': staging, 'require_approval': require_approval}))
+            )
+            job_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO job_items (job_id, seq, file_name, staged_path, file_sha256) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, *row) for row in rows]
+            )
+            log_audit(user_id, "membuat job auto upload", {"job_id": job_id, "total_files": len(rows)}, conn=conn)
+            conn.commit()
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    
+    job_queue = get_job_queue()
+    job_queue.start()
+    job_queue.notify()
+    return job_id
+
+def enqueue_auto_upload_zip_job(uploaded_zip, user_id, require_approval=True):
+    """
+    Stage arsip ZIP ke disk lalu buat job 'auto_upload_zip'. Arsip disalin per
+    chunk tanpa diekstrak; daftar anggota dan ekstraksi dikerjakan worker.
+    Returns: id job.
+    """
+    staging = f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}_{user_id}_{os.urandom(4).hex()}"
+    staging_dir = JOB_STAGING_DIR / staging
+    archive_name = Path(uploaded_zip.name).name
+    try:
+        stored = ingest_upload(uploaded_zip, staging_dir / archive_name)
+        with db_connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, status, created_by, created_at, total, params) VALUES (?, 'queued', ?, ?, 0, ?)",
+                ('auto_upload_zip', user_id, datetime.datetime.now().isoformat(),
+                 json.dumps({'staging': staging, 'archive': archive_name, 'require_approval': require_approval}))
+            )
+            job_id = cursor.lastrowid
+            log_audit(user_id, "membuat job auto upload", {
+                "job_id": job_id, "archive": archive_name, "archive_size": stored['size']
+            }, conn=conn)
+            conn.commit()
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    
+    job_queue = get_job_queue()
+    job_queue.start()
+    job_queue.notify()
+    return job_id
+
+def enqueue_export_job(filters, user_id):
+    """
+    Buat job 'export' untuk filter collect_export_entries (tanggal sebagai objek date).
+    Pencarian file dan penulisan arsip dikerjakan worker. Returns: id job.
+    """
+    params = dict(filters)
+    for key in ('date_from', 'date_to'):
+        params[key] = params[key].strftime('%d-%m-%Y') if params.get(key) else None
+    with db_connection() as conn:
+        cursor = conn.execute(
+            "INSERT INTO jobs (kind, status, created_by, created_at, total, params) VALUES (?, 'queued', ?, ?, 0, ?)",
+            ('export', user_id, datetime.datetime.now().isoformat(), json.dumps(params))
+        )
+        job_id = cursor.lastrowid
+        log_audit(user_id, "membuat job ekspor dokumen", {"job_id": job_id}, conn=conn)
+        conn.commit()
+    
+    job_queue = get_job_queue()
+    job_queue.start()
+    job_queue.notify()
+    return job_id
+
+def get_user_jobs(user_id, kinds=AUTO_UPLOAD_JOB_KINDS, limit=10):
+    jobs = fetchall(USER_JOBS_SQL.format(kinds=", ".join("?" * len(kinds))), (user_id, *kinds, limit))
+    for job in jobs:
+        job['params'] = json.loads(job['params'] or '{}')
+        job['result'] = json.loads(job['result']) if job['result'] else None
+    return jobs
+
+def get_job_item_counts(job_id):
+    with db_connection() as conn:
+        return dict(conn.execute(JOB_ITEM_COUNTS_SQL, (job_id,)).fetchall())
+
+def get_job_items(job_id):
+    return fetchall(
+        "SELECT ji.seq, ji.file_name, ji.status, ji.message, ji.doc_type, ji.similarity, p.item, p.part_no "
+        "FROM job_items ji LEFT JOIN projects p ON ji.project_id = p.id WHERE ji.job_id = ? ORDER BY ji.seq",
+        (job_id,)
+    )
+
+def request_job_cancel(job_id, user_id):
+    """Minta job berhenti; job antri langsung dibatalkan, job berjalan berhenti setelah item aktif selesai."""
+    with db_connection() as conn:
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')", (job_id,))
+        row = conn.execute("SELECT status, params, kind FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row and row[0] == 'queued':
+            now = datetime.datetime.now().isoformat()
+            conn.execute("UPDATE jobs SET status = 'canceled', finished_at = ? WHERE id = ? AND status = 'queued'", (now, job_id))
+            conn.execute(
+                "UPDATE job_items SET status = 'canceled', message = 'Dibatalkan oleh user', finished_at = ? "
+                "WHERE job_id = ? AND status = 'queued'", (now, job_id)
+            )
+        kind_label = JOB_KIND_LABELS.get(row[2], row[2]) if row else 'auto upload'
+        log_audit(user_id, f"membatalkan job {kind_label}", {"job_id": job_id}, conn=conn)
+        conn.commit()
+    staging = json.loads(row[1] or '{}').get('staging') if row else None
+    if row and row[0] == 'queued' and staging:
+        shutil.rmtree(JOB_STAGING_DIR / staging, ignore_errors=True)
+
+def get_upload_aliases(limit=1000):
+    return fetchall(
+        "SELECT a.doc_type, a.part_name_key AS part_name, a.part_no_key AS part_no, p.item, p.part_no AS project_part_no, "
+        "a.confirmations, a.confirmed_by, a.confirmed_at FROM upload_aliases a JOIN projects p ON p.id = a.project_id "
+        "ORDER BY a.confirmed_at DESC LIMIT ?",
+        (limit,)
+    )
+
+def clear_upload_aliases(user_id):
+    with db_connection() as conn:
+        removed = conn.execute("DELETE FROM upload_aliases").rowcount
+        log_audit(user_id, "menghapus alias auto upload", {"removed": removed}, conn=conn)
+        conn.commit()
+    return removed
+
+# st.fragment (>= 1.37) / st.experimental_fragment (1.33 - 1.36): panel job di-refresh
+# sendiri tanpa rerun seluruh halaman. Versi lama memakai tombol refresh manual.
+_st_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+
+def show_auto_upload_jobs(user_id):
+    """Panel status job auto upload milik user; polling otomatis selama masih ada job aktif."""
+    jobs = get_user_jobs(user_id)
+    if not jobs:
+        return
+    if _st_fragment is not None and any(job['status'] in JOB_ACTIVE_STATUSES for job in jobs):
+        _st_fragment(run_every=JOB_UI_REFRESH_SECONDS)(_auto_upload_jobs_panel)(user_id, polling=True)
+    else:
+        _auto_upload_jobs_panel(user_id)
+
+def _format_job_label(job):
+    label = (f"Job #{job['id']} • {job['created_at'][:16].replace('T', ' ')} • "
+             f"{JOB_STATUS_LABELS.get(job['status'], job['status'])} • ")
+    if job['kind'] == 'auto_upload_zip':
+        label += f"📦 {job['params'].get('archive')} • "
+    return label + f"{job['total']} file"
+
+def _auto_upload_jobs_panel(user_id, polling=False):
+    # Query ringan (index created_by): aman diulang setiap interval polling
+    jobs = get_user_jobs(user_id)
+    active = any(job['status'] in JOB_ACTIVE_STATUSES for job in jobs)
+    if polling and not active:
+        # Semua job selesai: rerun penuh sekali agar polling berhenti dan hasil tampil
+        st.rerun()
+    
+    st.markdown("---")
+    col_title, col_refresh = st.columns([4, 1])
+    with col_title:
+        st.markdown("### 📊 Job Auto Upload Saya")
+    with col_refresh:
+        if _st_fragment is None and active:
+            if st.button("🔄 Refresh Status", key="refresh_auto_upload_jobs", use_container_width=True):
+                st.rerun()
+    
+    jobs_by_id = {job['id']: job for job in jobs}
+    if st.session_state.get('auto_upload_job_id') in jobs_by_id:
+        st.session_state['auto_upload_job_select'] = st.session_state.pop('auto_upload_job_id')
+    job_id = st.selectbox(
+        "Pilih job",
+        list(jobs_by_id),
+        format_func=lambda jid: _format_job_label(jobs_by_id[jid]),
+        key="auto_upload_job_select"
+    )
+    job = jobs_by_id[job_id]
+    counts = get_job_item_counts(job_id)
+    total = job['total'] or 0
+    finished = total - counts.get('queued', 0) - counts.get('processing', 0)
+    
+    if job['status'] in JOB_ACTIVE_STATUSES:
+        if job['status'] == 'queued':
+            progress_label = "Menunggu worker..."
+        elif job['kind'] == 'auto_upload_zip' and not total:
+            progress_label = "Membaca isi arsip ZIP..."
+        else:
+            progress_label = f"Memproses {finished}/{total} file..."
+        st.progress(finished / total if total else 0.0, text=progress_label)
+        if job['cancel_requested']:
+            st.caption("🚫 Pembatalan diminta - job berhenti setelah file yang sedang diproses selesai.")
+        elif st.button("🚫 Batalkan Job", key=f"cancel_job_{job_id}"):
+            request_job_cancel(job_id, user_id)
+            st.rerun()
+    elif job['status'] == 'failed':
+        st.error(f"❌ Job gagal: {job['error'] or '-'}")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("⏳ Pending Approval", counts.get('pending_approval', 0) + counts.get('uploaded', 0))
+    with col2:
+        st.metric("⏭️ Skip", counts.get('skipped', 0))
+    with col3:
+        st.metric("❌ Gagal", counts.get('failed', 0))
+    
+    if job['status'] in JOB_ACTIVE_STATUSES:
+        return
+    
+    results_df = pd.DataFrame([
+        {
+            'file': item['file_name'],
+            'status': JOB_ITEM_STATUS_LABELS.get(item['status'], item['status']),
+            'reason': item['message'] or ''
+        }
+        for item in get_job_items(job_id)
+    ])
+    st.dataframe(results_df, use_container_width=True, hide_index=True)
+    
+    pending_count = counts.get('pending_approval', 0)
+    if pending_count > 0:
+        st.success(f"📤 {pending_count} dokumen berhasil di-upload dan menunggu approval!")
+        st.info("💡 File akan masuk ke sistem setelah disetujui oleh **Admin/Manager/SPV** di halaman **📋 Approval List**.")
 
 # --- Manajemen Dokumen (khusus Admin) ---
 def manage_docs_page():
@@ -5825,185 +8962,56 @@ def manage_docs_page():
                    "Cek halaman **📋 Approval List** untuk menyetujui atau menolak file.")
         
         uploaded_files = st.file_uploader(
-            "Upload Dokumen (bisa multiple files)",
-            type=['pdf', 'png', 'jpg', 'jpeg', 'xlsx', 'xls', 'doc', 'docx'],
+            "Upload Dokumen (bisa multiple files, atau arsip ZIP berisi folder dokumen)",
+            type=[*AUTO_UPLOAD_EXTENSIONS, 'zip'],
             accept_multiple_files=True,
             key="auto_upload_docs"
         )
+        st.caption("📦 Arsip ZIP diekstrak per file di latar belakang (termasuk subfolder); "
+                   "file dengan tipe yang tidak didukung dilewati.")
         
         if uploaded_files:
             if st.button("🚀 Proses Auto Upload", type="primary", use_container_width=True):
-                results = []
-                
+                # Setiap ZIP jadi job sendiri; file biasa dikumpulkan dalam satu job
+                zip_files = [f for f in uploaded_files if Path(f.name).suffix.lower() == '.zip']
+                doc_files = [f for f in uploaded_files if Path(f.name).suffix.lower() != '.zip']
                 progress_bar = st.progress(0)
                 status_text = st.empty()
                 
-                # Group files by (doc_type, part_name, part_number) to handle duplicates
-                file_groups = {}
-                
-                for uploaded_file in uploaded_files:
-                    doc_info = extract_doc_info_from_filename(uploaded_file.name)
-                    if doc_info:
-                        key = (doc_info['doc_type'], doc_info['part_name'], doc_info['part_number'])
-                        if key not in file_groups:
-                            file_groups[key] = []
-                        file_groups[key].append({
-                            'file': uploaded_file,
-                            'doc_info': doc_info
-                        })
-                    else:
-                        # Handle files that can't be parsed
-                        if None not in file_groups:
-                            file_groups[None] = []
-                        file_groups[None].append({
-                            'file': uploaded_file,
-                            'doc_info': None
-                        })
-                
-                total_files = len(uploaded_files)
-                processed = 0
-                
-                for group_key, group_files in file_groups.items():
-                    # Handle unparseable files
-                    if group_key is None:
-                        for file_data in group_files:
-                            results.append({
-                                'file': file_data['file'].name,
-                                'status': '❌ Gagal',
-                                'reason': 'Tidak dapat mendeteksi jenis dokumen'
-                            })
-                            processed += 1
-                            progress_bar.progress(processed / total_files)
-                        continue
-                    
-                    # For each group, prioritize by date modified (newest first)
-                    # Since Streamlit uploaded files don't have date metadata, we'll use filename similarity
-                    # as primary sorting (already done in find_matching_project)
-                    
-                    doc_type, part_name, part_number = group_key
-                    
-                    # Find matching projects (get all matches for this group)
-                    all_matches = find_matching_project(part_name, part_number, min_similarity=80, return_all_matches=True)
-                    
-                    if not all_matches:
-                        # No match found for this group
-                        for file_data in group_files:
-                            results.append({
-                                'file': file_data['file'].name,
-                                'status': '⏭️ Skip',
-                                'reason': f"Part Name/Number tidak ditemukan (detected: {part_name} / {part_number})"
-                            })
-                            processed += 1
-                            progress_bar.progress(processed / total_files)
-                        continue
-                    
-                    # Priority 1: Extract revision number from filename (REV.X, Rev.X, REV X, etc.)
-                    # Priority 2: File similarity to item name
-                    import re
-                    
-                    for file_data in group_files:
-                        filename = file_data['file'].name
-                        
-                        # Look for revision patterns: REV.0, Rev.1, REV 01, Revision 2, etc.
-                        # Patterns to match: REV.01, Rev.1, REV 0, Revision 2, R01, etc.
-                        revision_patterns = [
-                            r'(?:REV|Rev|rev|REVISION|Revision|revision|R)[\s._-]*(\d+(?:\.\d+)?)',
-                        ]
-                        
-                        extracted_revision = 0.0  # Default revision 0
-                        for pattern in revision_patterns:
-                            matches = re.findall(pattern, filename)
-                            if matches:
-                                try:
-                                    # Get the last match (in case there are multiple)
-                                    rev_str = matches[-1]
-                                    # Convert to float (handles both "0" and "0.1")
-                                    extracted_revision = float(rev_str)
-                                    break
-                                except (ValueError, IndexError):
-                                    continue
-                        
-                        file_data['extracted_revision'] = extracted_revision
-                        
-                        # Calculate file similarity
-                        file_data['file_similarity'] = calculate_similarity(
-                            filename,
-                            all_matches[0]['item'] if all_matches else ""
-                        )
-                    
-                    # Sort by: 1) Revision (highest first), 2) Similarity (highest first)
-                    group_files.sort(key=lambda x: (
-                        x['extracted_revision'],
-                        x['file_similarity']
-                    ), reverse=True)
-                    
-                    # Use the best match project (already sorted by similarity)
-                    best_project_match = all_matches[0]
-                    
-                    # Process files in priority order (best filename match first)
-                    for file_data in group_files:
-                        uploaded_file = file_data['file']
-                        doc_info = file_data['doc_info']
-                        
-                        status_text.text(f"Memproses: {uploaded_file.name}...")
-                        
-                        # Auto upload - no need to seek, we haven't read it yet
-                        success = auto_upload_document(
-                            uploaded_file,
-                            doc_info['doc_type'],
-                            best_project_match['project_id'],
-                            st.session_state['user_id']
-                        )
-                        
-                        if success:
-                            # Show revision info if available
-                            rev_info = ""
-                            if file_data.get('extracted_revision') is not None and file_data['extracted_revision'] > 0:
-                                rev_info = f" • 🔄 Rev: {file_data['extracted_revision']}"
-                            
-                            results.append({
-                                'file': uploaded_file.name,
-                                'status': '⏳ Pending Approval',
-                                'reason': f"Upload ke: {best_project_match['item']} / {best_project_match['part_no']} - {doc_info['doc_type']} (Match: {best_project_match['similarity']:.1f}%{rev_info}) - Menunggu persetujuan"
-                            })
-                        else:
-                            results.append({
-                                'file': uploaded_file.name,
-                                'status': '❌ Gagal',
-                                'reason': 'Error saat upload - cek log error di atas'
-                            })
-                        
-                        processed += 1
-                        progress_bar.progress(processed / total_files)
-                
-                status_text.text("Selesai!")
-                progress_bar.empty()
-                
-                # Show results
-                st.markdown("---")
-                st.markdown("### 📊 Hasil Auto Upload")
-                
-                results_df = pd.DataFrame(results)
-                
-                # Count successes
-                pending_count = len([r for r in results if r['status'] == '⏳ Pending Approval'])
-                skip_count = len([r for r in results if r['status'] == '⏭️ Skip'])
-                fail_count = len([r for r in results if r['status'] == '❌ Gagal'])
+                def _staging_progress(done, total):
+                    progress_bar.progress(done / total)
+                    status_text.text(f"Menyimpan file {done}/{total}...")
                 
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("⏳ Pending Approval", pending_count)
-                with col2:
-                    st.metric("⏭️ Skip", skip_count)
-                with col3:
-                    st.metric("❌ Gagal", fail_count)
-                
-                st.dataframe(results_df, use_container_width=True, hide_index=True)
-                
-                if pending_count > 0:
-                    st.success(f"📤 {pending_count} dokumen berhasil di-upload dan menunggu approval!")
-                    st.info("💡 File akan masuk ke sistem setelah disetujui oleh **Admin/Manager/SPV** di halaman **📋 Approval List**.")
-                    st.balloons()
+                try:
+                    if doc_files:
+                        job_id = enqueue_auto_upload_job(doc_files, st.session_state['user_id'],
+                                                         progress_callback=_staging_progress)
+                        st.session_state['auto_upload_job_id'] = job_id
+                        st.success(f"📥 Job #{job_id} dibuat untuk {len(doc_files)} file.")
+                    for zip_file in zip_files:
+                        status_text.text(f"Menyimpan arsip {zip_file.name}...")
+                        job_id = enqueue_auto_upload_zip_job(zip_file, st.session_state['user_id'])
+                        st.session_state['auto_upload_job_id'] = job_id
+                        st.success(f"📦 Job #{job_id} dibuat untuk arsip {zip_file.name}.")
+                except Exception as e:
+                    st.error(f"Gagal membuat job auto upload: {e}")
+                else:
+                    st.info("Proses berjalan di latar belakang - halaman ini boleh ditinggal, hasilnya tetap tersimpan di bawah.")
+                finally:
+                    progress_bar.empty()
+                    status_text.empty()
+        
+        show_auto_upload_jobs(st.session_state['user_id'])
+        
+        aliases = get_upload_aliases()
+        with st.expander(f"📌 Alias Auto Upload Tersimpan ({len(aliases)})"):
+            st.caption("Nama file yang sudah pernah disetujui langsung diarahkan ke proyek yang sama tanpa pencocokan ulang. "
+                       "Alias hilang otomatis jika proyek dihapus, item/part no diubah, atau file hasil alias ditolak.")
+            if aliases:
+                st.dataframe(pd.DataFrame(aliases), use_container_width=True, hide_index=True)
+                if st.button("🗑️ Hapus Semua Alias", key="clear_upload_aliases"):
+                    clear_upload_aliases(st.session_state['user_id'])
+                    st.rerun()
 
     with tab_add:
         st.markdown("#### Tambah Dokumen Baru")
@@ -6024,7 +9032,7 @@ def manage_docs_page():
     
     with tab_delete:
         st.markdown("#### Hapus Dokumen")
-        current_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
+        current_docs = get_doc_registry().names
         if current_docs:
             doc_to_delete = st.selectbox("Pilih dokumen yang akan dihapus", current_docs)
             st.warning("Menghapus kolom akan menghapus data file yang terkait dengan kolom tersebut pada semua proyek! Aksi ini tidak dapat dibatalkan.")
@@ -6045,20 +9053,11 @@ def manage_docs_page():
             st.info("💡 Set preferensi agar dokumen tertentu otomatis didelegasikan saat proyek baru dibuat (bisa lebih dari 1 user)")
         with col_refresh2:
             if st.button("🔄 Refresh Data", key="refresh_prefs_manage", help="Muat ulang daftar user terbaru"):
-                st.session_state['pref_refresh_manage'] = True
                 st.rerun()
 
-        # Cache preferences dan users di session_state untuk menghindari query berulang
-        # Auto-refresh jika cache tidak ada (user baru approved/registered)
-        if ('cached_prefs_manage' not in st.session_state or 
-            'cached_pids_manage' not in st.session_state or 
-            st.session_state.get('pref_refresh_manage', False)):
-            st.session_state['cached_prefs_manage'] = get_all_preferences()
-            st.session_state['cached_pids_manage'] = get_all_pids()
-            st.session_state['pref_refresh_manage'] = False
-        
-        prefs = st.session_state['cached_prefs_manage']
-        pids = st.session_state['cached_pids_manage']
+        # Preferensi dan daftar user di-cache lintas sesi, otomatis segar saat data_version berubah
+        prefs = get_all_preferences()
+        pids = get_all_pids()
         
         if prefs:
             st.markdown("##### Preferensi Saat Ini")
@@ -6082,8 +9081,7 @@ def manage_docs_page():
 
         st.markdown("---")
         st.markdown("##### Tambah/Perbarui Preferensi")
-        all_docs = DEFAULT_DOC_COLUMNS + get_dynamic_doc_columns()
-        pref_doc = st.selectbox("Dokumen", all_docs, key="pref_doc_select_manage")
+        pref_doc = st.selectbox("Dokumen", get_doc_registry().names, key="pref_doc_select_manage")
         
         # Get existing preference untuk dokumen ini
         existing_pref = next((p for p in prefs if p['doc_name'] == pref_doc), None)
@@ -6109,8 +9107,6 @@ def manage_docs_page():
                 users_json = json.dumps(pref_users)
                 upsert_preference(pref_doc, users_json, st.session_state['user_id'])
                 st.success(f"✅ Preferensi tersimpan: **{pref_doc}** → {', '.join(pref_users)}")
-                # Refresh cache agar data terbaru muncul
-                st.session_state['pref_refresh_manage'] = True
                 st.rerun()
             else:
                 st.error("❌ Pilih minimal 1 user untuk delegasi!")
@@ -6154,24 +9150,26 @@ def manage_docs_page():
             if st.button("🗑️ Hapus Preferensi", key="delete_pref_manage"):
                 delete_preference(doc_to_remove, st.session_state['user_id'])
                 st.success("✅ Preferensi dihapus.")
-                # Refresh cache agar data terbaru muncul
-                st.session_state['pref_refresh_manage'] = True
                 st.rerun()
         else:
             st.info("Tidak ada preferensi untuk dihapus.")
 
 # --- Audit Log Page (khusus Admin & Manager & SPV) ---
-def show_audit_log_page():
-    st.header("Audit Log")
-    st.info("Mencatat semua aktivitas penting pengguna, termasuk login, manajemen proyek, dan perubahan pada dokumen.")
-    
+@st.cache_data(show_spinner=False, max_entries=2)
+def _cached_audit_log_frame(versions):
     conn = get_conn()
     logs_df = pd.read_sql_query("SELECT * FROM audit_logs ORDER BY timestamp DESC", conn)
     users_df = pd.read_sql_query("SELECT id, full_name FROM users", conn)
     conn.close()
     
     # Gabungkan logs_df dengan users_df untuk mendapatkan full_name
-    logs_df = pd.merge(logs_df, users_df, left_on='user_id', right_on='id', how='left')
+    return pd.merge(logs_df, users_df, left_on='user_id', right_on='id', how='left')
+
+def show_audit_log_page():
+    st.header("Audit Log")
+    st.info("Mencatat semua aktivitas penting pengguna, termasuk login, manajemen proyek, dan perubahan pada dokumen.")
+    
+    logs_df = _cached_audit_log_frame(get_data_versions(('audit_logs', 'users')))
     
     if logs_df.empty:
         st.info("Belum ada aktivitas yang tercatat.")
@@ -6285,6 +9283,253 @@ def show_audit_log_page():
         log_df = pd.DataFrame(log_rows)
         st.dataframe(log_df, use_container_width=True, hide_index=True)
 
+# --- Diagnostik Sistem (khusus Admin) ---
+# Query yang sering dijalankan aplikasi, untuk diperiksa dengan EXPLAIN QUERY PLAN.
+# (nama, sql, parameter contoh, tabel yang memang sengaja dibaca penuh)
+# Jaga agar SQL di sini tetap sama dengan query aslinya bila query tersebut diubah.
+QUERY_PLAN_REGISTRY = [
+    ("Halaman pending approval (Admin)", *pending_approval_query('Admin', 'Admin', limit=25), ()),
+    ("Halaman berikutnya (keyset)", *pending_approval_query('Admin', 'Admin', after=('2025-01-01T00:00:00', 10), limit=25), ()),
+    ("Halaman pending approval (SPV + filter)", *pending_approval_query('SPV', 'SPV', 'proj', 'FMEA', limit=25), ()),
+    ("Ringkasan pending per dokumen",
+     "SELECT rh.doc_column, COUNT(*) FROM revision_history rh JOIN projects p ON rh.project_id = p.id "
+     "WHERE rh.revision_number = -1 GROUP BY rh.doc_column", (), ()),
+    ("Pending per dokumen",
+     "SELECT file_path, uploaded_by FROM revision_history WHERE project_id = ? AND doc_column = ? AND revision_number = -1",
+     (1, 'FMEA'), ()),
+    ("Nomor revisi terakhir",
+     "SELECT MAX(revision_number) FROM revision_history WHERE project_id = ? AND doc_column = ?", (1, 'FMEA'), ()),
+    ("Riwayat revisi dokumen",
+     """SELECT rh.*, u.full_name
+        FROM revision_history rh
+        LEFT JOIN users u ON rh.uploaded_by = u.id
+        WHERE rh.project_id = ? AND rh.doc_column = ?
+        ORDER BY rh.revision_number DESC""", (1, 'FMEA'), ()),
+    ("Log aktivitas terbaru (dashboard)",
+     """SELECT al.timestamp, al.action, al.user_id, al.details, u.full_name
+        FROM audit_logs al
+        LEFT JOIN users u ON al.user_id = u.id
+        ORDER BY al.timestamp DESC LIMIT 10""", (), ()),
+    ("Statistik upload per user",
+     """SELECT u.full_name, COUNT(*) as total_uploads
+        FROM audit_logs al
+        LEFT JOIN users u ON al.user_id = u.id
+        WHERE al.action IN ('mengunggah file', 'auto-upload dokumen (pending approval)', 'mengunggah file pending')
+        GROUP BY al.user_id, u.full_name
+        ORDER BY total_uploads DESC""", (), ()),
+    ("Tenggat proyek mendekat",
+     "SELECT item, part_no, project, project_end_date, customer FROM projects WHERE status IN ('On Progress', 'Hold') "
+     "AND project_end_date IS NOT NULL ORDER BY project_end_date ASC LIMIT 5", (), ()),
+    ("Dokumen satu proyek",
+     "SELECT doc_name, file_path, file_paths, upload_date, delegated_to, delegated_to_list, start_date, end_date, has_file "
+     "FROM project_documents WHERE project_id = ?", (1,), ()),
+    ("Kelengkapan dokumen proyek",
+     "SELECT COUNT(*) FROM project_documents WHERE project_id = ? AND has_file = 1 AND doc_name IN (?, ?)",
+     (1, 'FMEA', 'PFMEA'), ()),
+    ("Detail proyek", "SELECT * FROM projects WHERE id = ?", (1,), ()),
+    ("User berdasarkan ID", "SELECT * FROM users WHERE id = ?", ('1829',), ()),
+    ("Versi data", "SELECT table_name, version FROM data_version WHERE table_name IN (?, ?)", ('projects', 'users'), ()),
+    # Dibaca penuh secara sengaja (hasilnya di-cache lintas sesi lewat data_version)
+    ("Frame proyek (load_df)",
+     "SELECT id, item, part_no, project, customer, status, pic, project_start_date, project_end_date FROM projects",
+     (), ('projects',)),
+    ("Frame dokumen (load_df)",
+     "SELECT project_id, doc_name, file_path, file_paths, upload_date, delegated_to, delegated_to_list, start_date, end_date "
+     "FROM project_documents", (), ('project_documents',)),
+    ("Daftar PIC", "SELECT full_name FROM users WHERE is_approved = 1", (), ('users',)),
+    ("Lookup part number kanonik (auto upload)", PART_NO_KEY_LOOKUP_SQL, ('BS062A2',), ()),
+    ("Lookup alias auto upload", UPLOAD_ALIAS_LOOKUP_SQL, ('ENGINE BRACKET', 'BS062A2', 'FMEA'), ()),
+    ("Ambil job antri (worker)", JOB_CLAIM_SQL, (), ()),
+    ("Job auto upload milik user", USER_JOBS_SQL.format(kinds="?, ?"), ('1829', *AUTO_UPLOAD_JOB_KINDS, 10), ()),
+    ("Rekap status item job", JOB_ITEM_COUNTS_SQL, (1,), ()),
+]
+
+def explain_query_plan(conn, sql, params=()):
+    """Baris detail EXPLAIN QUERY PLAN untuk satu query."""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+def _full_scan_tables(plan_details):
+    """Tabel yang dibaca penuh tanpa index ('SCAN tabel' tanpa 'USING ... INDEX')."""
+    tables = []
+    for detail in plan_details:
+        match = re.match(r"SCAN (?:TABLE )?(\w+)", detail)
+        if match and 'INDEX' not in detail:
+            tables.append(match.group(1))
+    return tables
+
+def audit_query_plans():
+    """
+    Jalankan EXPLAIN QUERY PLAN atas QUERY_PLAN_REGISTRY dan tandai full table scan
+    serta sort sementara (TEMP B-TREE) yang tersisa.
+    """
+    report = []
+    with db_connection() as conn:
+        for name, sql, params, expected_scans in QUERY_PLAN_REGISTRY:
+            try:
+                plan = explain_query_plan(conn, sql, params)
+            except sqlite3.Error as e:
+                report.append({'Query': name, 'Status': f"❌ Error: {e}", 'Full Scan': "", 'Plan': ""})
+                continue
+            scans = _full_scan_tables(plan)
+            unexpected = [t for t in scans if t not in expected_scans]
+            temp_sort = any('TEMP B-TREE' in detail for detail in plan)
+            if unexpected:
+                status = "⚠️ Full scan"
+            elif scans:
+                status = "ℹ️ Full scan (disengaja)"
+            elif temp_sort:
+                status = "ℹ️ Sort sementara"
+            else:
+                status = "✅ Index"
+            report.append({
+                'Query': name,
+                'Status': status,
+                'Full Scan': ", ".join(scans),
+                'Plan': " | ".join(plan)
+            })
+    return report
+
+def show_diagnostics_page():
+    st.header("🩺 Diagnostik Sistem")
+    st.info("Statistik koneksi database, versi skema, dan benchmark performa. Halaman ini hanya membaca data.")
+
+    st.markdown("#### 🔌 Pool Koneksi Database")
+    pool_stats = get_db_pool().stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Koneksi Dibuka", pool_stats['opened'])
+    col2.metric("Dipakai Ulang", pool_stats['reused'], f"{pool_stats['reuse_ratio'] * 100:.1f}%")
+    col3.metric("Menunggu", pool_stats['waits'], f"{pool_stats['wait_time_ms']} ms", delta_color="inverse")
+    col4.metric("Aktif / Idle", f"{pool_stats['in_use']} / {pool_stats['idle']}")
+
+    st.markdown("#### 📝 Penulis Audit Log")
+    audit_stats = get_audit_writer().stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Ikut Transaksi", audit_stats['joined'])
+    col2.metric("Lewat Buffer", audit_stats['buffered'])
+    col3.metric("Flush", audit_stats['flushes'], f"{audit_stats['written']} baris", delta_color="off")
+    col4.metric("Tertunda", audit_stats['pending'])
+
+    st.markdown("#### 🖼️ Cache Preview PDF")
+    page_stats = get_page_cache().stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Hit Rate", f"{page_stats['hit_rate']:.0%}", f"{page_stats['hits']} hit / {page_stats['misses']} miss", delta_color="off")
+    col2.metric("Halaman Tersimpan", page_stats['entries'])
+    col3.metric("Ukuran", f"{page_stats['bytes'] / 1024 / 1024:.1f} MB", f"budget {page_stats['max_bytes'] / 1024 / 1024:.0f} MB", delta_color="off")
+    col4.metric("Eviksi", page_stats['evictions'])
+    st.caption(f"Format: {PAGE_CACHE_FORMAT.upper()} • Lokasi: `{PAGE_CACHE_DIR}`")
+    meta_stats = get_file_metadata_worker().stats()
+    st.caption(
+        f"Thumbnail & metadata: {meta_stats['generated']} dibuat • {meta_stats['failed']} gagal • "
+        f"{meta_stats['queued']} antri • render pool: {get_pdf_render_pool().mode or 'belum aktif'} "
+        f"({PDF_RENDER_WORKERS} worker)"
+    )
+    if st.button("🧹 Kosongkan Cache Preview", key="btn_clear_page_cache"):
+        get_page_cache().clear()
+        st.rerun()
+
+    st.markdown("#### 🗃️ Penyimpanan File (Dedup)")
+    cas_stats = get_cas_stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Blob Unik", cas_stats['blobs'])
+    col2.metric("Referensi", cas_stats['refs'])
+    col3.metric("Tersimpan", f"{cas_stats['stored_bytes'] / 1024 / 1024:.1f} MB")
+    col4.metric("Hemat Dedup", f"{cas_stats['saved_bytes'] / 1024 / 1024:.1f} MB")
+    st.caption(f"File identik disimpan sekali di `{CAS_DIR}`; path lama menjadi hardlink ke blob yang sama.")
+    if st.button("🧬 Dedup Seluruh Folder File", key="btn_dedupe_files"):
+        progress = st.progress(0.0, text="Memindai file...")
+        st.session_state['dedupe_report'] = dedupe_files_dir(
+            progress_callback=lambda done, total: progress.progress(done / total, text=f"Memproses {done}/{total} file...")
+        )
+        progress.empty()
+        log_audit(st.session_state['user_id'], "dedup folder file", st.session_state['dedupe_report'])
+    if st.session_state.get('dedupe_report'):
+        report = st.session_state['dedupe_report']
+        st.success(
+            f"✅ {report['files']} file diproses • {report['duplicates']} duplikat • "
+            f"{report['reclaimed_bytes'] / 1024 / 1024:.1f} MB dikembalikan"
+        )
+        if report['skipped'] or report['removed_refs']:
+            st.caption(f"{report['skipped']} file dilewati (hardlink tidak didukung / gagal dibaca) • {report['removed_refs']} referensi file hilang dibersihkan")
+
+    st.markdown("#### 🧵 Antrian Job Latar")
+    job_stats = get_job_queue().stats()
+    with db_connection() as conn:
+        job_counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Antri / Berjalan", f"{job_counts.get('queued', 0)} / {job_counts.get('running', 0)}")
+    col2.metric("Selesai", job_counts.get('done', 0))
+    col3.metric("Gagal / Batal", f"{job_counts.get('failed', 0)} / {job_counts.get('canceled', 0)}")
+    col4.metric("Worker Aktif", f"{job_stats['workers']} / {JOB_WORKERS}")
+    st.caption(f"Proses ini: {job_stats['claimed']} job diambil • {job_stats['requeued']} job basi dikembalikan ke antrian • "
+               f"{job_stats['lost']} job diambil alih worker lain")
+
+    st.markdown("#### 🗄️ Skema & Versi Data")
+    schema = init_db()
+    st.caption(f"Versi skema: **{schema['version']}** (terbaru: {SCHEMA_VERSION})")
+    versions = fetchall("SELECT table_name, version FROM data_version ORDER BY table_name")
+    st.dataframe(pd.DataFrame(versions), use_container_width=True, hide_index=True)
+
+    st.markdown("#### 🔎 Query Plan Advisor")
+    st.caption("EXPLAIN QUERY PLAN atas query yang sering dijalankan. '⚠️ Full scan' berarti tabel dibaca penuh tanpa index.")
+    if st.button("🔎 Periksa Query Plan", key="btn_query_plan_audit"):
+        st.session_state['query_plan_report'] = audit_query_plans()
+    if st.session_state.get('query_plan_report'):
+        plan_df = pd.DataFrame(st.session_state['query_plan_report'])
+        warning_count = int(plan_df['Status'].str.startswith("⚠️").sum())
+        if warning_count:
+            st.warning(f"{warning_count} query masih melakukan full table scan.")
+        else:
+            st.success("Tidak ada full table scan yang tidak disengaja.")
+        st.dataframe(plan_df, use_container_width=True, hide_index=True)
+
+    st.markdown("#### ⏱️ Benchmark load_df")
+    st.caption("Dijalankan pada database sintetis in-memory, tidak menyentuh data produksi.")
+    col_a, col_b = st.columns(2)
+    with col_a:
+        bench_projects = st.number_input("Jumlah proyek", min_value=100, max_value=20000, value=5000, step=500, key="bench_df_projects")
+    with col_b:
+        bench_docs = st.number_input("Jumlah jenis dokumen", min_value=len(DEFAULT_DOC_COLUMNS), max_value=60, value=30, key="bench_df_docs")
+    if st.button("▶️ Jalankan Benchmark load_df", key="btn_bench_load_df"):
+        with st.spinner("Menjalankan benchmark..."):
+            result = benchmark_load_df(int(bench_projects), int(bench_docs))
+        st.session_state['bench_load_df_result'] = result
+    if st.session_state.get('bench_load_df_result'):
+        result = st.session_state['bench_load_df_result']
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Row-wise (lama)", f"{result['rowwise_s']} s")
+        col2.metric("Kolom-wise", f"{result['columnar_s']} s", f"{result['speedup_columnar']}x lebih cepat")
+        col3.metric("Cache hit", f"{result['cached_ms']} ms")
+        st.json(result, expanded=False)
+
+    st.markdown("#### ⏱️ Benchmark Pencocokan Proyek (Auto Upload)")
+    st.caption("find_matching_project pada daftar proyek sintetis: skor penuh setiap proyek vs kandidat dari index karakter.")
+    bench_match_projects = st.number_input("Jumlah proyek", min_value=100, max_value=50000, value=10000, step=1000, key="bench_match_projects")
+    if st.button("▶️ Jalankan Benchmark Pencocokan", key="btn_bench_matching"):
+        with st.spinner("Menjalankan benchmark..."):
+            st.session_state['bench_matching_result'] = benchmark_project_matching(int(bench_match_projects))
+    if st.session_state.get('bench_matching_result'):
+        result = st.session_state['bench_matching_result']
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Skor penuh (lama)", f"{result['scan_ms_per_query']} ms/query")
+        col2.metric("Dengan index", f"{result['index_ms_per_query']} ms/query", f"{result['speedup']}x lebih cepat")
+        col3.metric("Kandidat rata-rata", result['avg_candidates'], f"build index {result['index_build_ms']} ms", delta_color="off")
+        st.json(result, expanded=False)
+
+    st.markdown("#### ⏱️ Benchmark Parsing Nama File (Auto Upload)")
+    st.caption("extract_doc_info_from_filename pada nama file sintetis: startswith linear (lama) vs regex awalan terpanjang.")
+    bench_parse_files = st.number_input("Jumlah nama file", min_value=1000, max_value=200000, value=50000, step=5000, key="bench_parse_files")
+    if st.button("▶️ Jalankan Benchmark Parsing", key="btn_bench_parsing"):
+        with st.spinner("Menjalankan benchmark..."):
+            st.session_state['bench_parsing_result'] = benchmark_filename_parsing(int(bench_parse_files))
+    if st.session_state.get('bench_parsing_result'):
+        result = st.session_state['bench_parsing_result']
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Linear (lama)", f"{result['legacy_files_per_s']:,} file/s")
+        col2.metric("Regex terkompilasi", f"{result['compiled_files_per_s']:,} file/s", f"{result['speedup']}x lebih cepat")
+        col3.metric("Tertutup jenis lebih pendek (lama)", result['shadowed_in_legacy'],
+                    f"{result['other_differences']} perbedaan lain", delta_color="off")
+        st.json(result, expanded=False)
+
 # --- Tambahkan Kode Footer di Sini ---
 # ...existing code...
 st.markdown("""
@@ -6335,23 +9580,32 @@ st.markdown("""
 
 
 # --- Jalankan Aplikasi ---
-init_db()
-
-# Inisialisasi session_state
-if 'logged_in' not in st.session_state:
-    st.session_state['logged_in'] = False
+# Streamlit menjalankan script ini sebagai __main__; saat di-import (mis. oleh tests/)
+# hanya definisi fungsi yang dimuat.
+if __name__ == "__main__":
+    init_db()
+    # Worker job latar aktif sejak request pertama, agar job yang tertunda (mis. setelah restart) dilanjutkan
+    get_job_queue()
+
+    # Inisialisasi session_state
+    if 'logged_in' not in st.session_state:
+        st.session_state['logged_in'] = False
 
-# Solusi: Inisialisasi 'page' key jika belum ada
-if 'page' not in st.session_state:
-    st.session_state['page'] = 'login'
+    # Solusi: Inisialisasi 'page' key jika belum ada
+    if 'page' not in st.session_state:
+        st.session_state['page'] = 'login'
 
-if 'db_initialized' not in st.session_state:
-    st.session_state['db_initialized'] = True
+    if 'db_initialized' not in st.session_state:
+        st.session_state['db_initialized'] = True
 
-if st.session_state['logged_in']:
-    show_main_page()
-else:
-    if st.session_state['page'] == 'register':
-        show_register_page()
-    else:
-        show_login_page()
\ No newline at end of file
+    try:
+        if st.session_state['logged_in']:
+            show_main_page()
+        else:
+            if st.session_state['page'] == 'register':
+                show_register_page()
+            else:
+                show_login_page()
+    finally:
+        # Akhir request (termasuk st.rerun/st.stop): tulis audit log yang masih tertampung
+        flush_audit_log()
@@ -0,0 +1,192 @@
+"""
+Rasterisasi halaman PDF untuk preview, dijalankan di proses worker.
+
+Sengaja dipisah dari app.py: proses worker meng-import modul ini untuk
+menjalankan fungsi render, dan app.py tidak boleh ikut ter-import di sana
+karena akan menjalankan seluruh script Streamlit.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+
+def encode_pixmap(pix, fmt='png', quality=80):
+    """Kompres pixmap PyMuPDF ke PNG/WebP."""
+    if fmt == 'png':
+        return pix.tobytes("png")
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    buffer = BytesIO()
+    img.save(buffer, format=fmt.upper(), quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def render_pages(pdf_path, pages, zoom, fmt='png', quality=80):
+    """
+    Render sekumpulan halaman dari satu PDF.
+    Returns:
+        List of (page_num, encoded bytes); halaman yang gagal di-render
+        dikembalikan dengan bytes None agar pemanggil bisa melewatinya.
+    """
+    results = []
+    doc = fitz.open(str(pdf_path))
+    try:
+        mat = fitz.Matrix(zoom, zoom)
+        for page_num in pages:
+            try:
+                pix = doc.load_page(page_num).get_pixmap(matrix=mat, alpha=False)
+                results.append((page_num, encode_pixmap(pix, fmt, quality)))
+                del pix
+            except Exception:
+                results.append((page_num, None))
+    finally:
+        doc.close()
+    return results
+
+
+def page_count(pdf_path):
+    doc = fitz.open(str(pdf_path))
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp'}
+
+
+def extract_metadata(file_path, max_size=240, fmt='png', quality=80):
+    """
+    Jumlah halaman, dimensi halaman pertama, dan thumbnail halaman pertama.
+    PDF dirender lewat PyMuPDF, gambar lewat PIL; tipe lain hanya dikembalikan
+    tanpa thumbnail.
+    Returns:
+        dict(page_count, width, height, thumbnail)
+    """
+    suffix = Path(file_path).suffix.lower()
+    meta = {'page_count': None, 'width': None, 'height': None, 'thumbnail': None}
+    if suffix == '.pdf':
+        doc = fitz.open(str(file_path))
+        try:
+            meta['page_count'] = doc.page_count
+            if doc.page_count:
+                page = doc.load_page(0)
+                meta['width'], meta['height'] = round(page.rect.width), round(page.rect.height)
+                zoom = max_size / max(page.rect.width, page.rect.height, 1)
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                meta['thumbnail'] = encode_pixmap(pix, fmt, quality)
+        finally:
+            doc.close()
+    elif suffix in IMAGE_EXTENSIONS:
+        with Image.open(file_path) as img:
+            meta['page_count'] = getattr(img, 'n_frames', 1)
+            meta['width'], meta['height'] = img.size
+            img.thumbnail((max_size, max_size))
+            buffer = BytesIO()
+            img.convert('RGB').save(buffer, format=fmt.upper(), quality=quality)
+            meta['thumbnail'] = buffer.getvalue()
+    return meta
+
+
+def split_pages(pages, workers):
+    """
+    Bagi halaman menjadi task: halaman pertama berdiri sendiri supaya bisa
+    tampil secepatnya, sisanya dibagi rata ke worker dalam potongan berurutan.
+    """
+    pages = list(pages)
+    if not pages:
+        return []
+    chunks = [pages[:1]]
+    rest = pages[1:]
+    if rest:
+        size = max(1, -(-len(rest) // max(1, workers)))
+        chunks.extend(rest[i:i + size] for i in range(0, len(rest), size))
+    return chunks
+
+
+class PdfRenderPool:
+    """
+    Pool worker untuk rasterisasi PDF. Memakai ProcessPoolExecutor (konteks
+    'forkserver' di POSIX, 'spawn' di Windows) agar PyMuPDF tidak menahan GIL
+    thread sesi Streamlit; jatuh ke ThreadPoolExecutor jika proses worker tidak
+    bisa dibuat di environment tersebut.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max(1, int(max_workers))
+        self.mode = None
+        self._executor = None
+        self._process_failed = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _thread_executor():
+        # PyMuPDF tidak thread-safe, jadi fallback thread dibatasi satu worker
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-render')
+
+    def _create_executor(self):
+        """Executor baru (dipanggil di bawah lock). Returns: (executor, mode)."""
+        if not self._process_failed:
+            try:
+                methods = multiprocessing.get_all_start_methods()
+                ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                if 'forkserver' in methods:
+                    ctx.set_forkserver_preload([__name__])
+                return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx), 'process'
+            except Exception as e:
+                print(f"⚠️ Process pool PDF tidak tersedia, memakai thread pool: {e}")
+                self._process_failed = True
+        return self._thread_executor(), 'thread'
+
+    def _fallback_to_threads(self, executor, error):
+        with self._lock:
+            if self._executor is not executor:
+                # Sudah di-reset/diganti thread lain selama probe
+                return
+            print(f"⚠️ Process pool PDF tidak tersedia, memakai thread pool: {error}")
+            self._process_failed = True
+            self._executor, self.mode = self._thread_executor(), 'thread'
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def executor(self):
+        with self._lock:
+            executor = self._executor
+            created = executor is None
+            if created:
+                executor, self.mode = self._create_executor()
+                self._executor = executor
+        if created and self.mode == 'process':
+            # Pastikan worker benar-benar bisa start. Diuji di luar lock supaya
+            # sesi lain (dan reset/shutdown) tidak tertahan sampai 30 detik.
+            try:
+                executor.submit(int, 0).result(timeout=30)
+            except Exception as e:
+                self._fallback_to_threads(executor, e)
+                return self.executor
+        return executor
+
+    def submit(self, fn, *args):
+        try:
+            return self.executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # Worker mati (mis. crash di PyMuPDF): buat pool baru lalu coba sekali lagi
+            self.reset()
+            return self.executor.submit(fn, *args)
+
+    def reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
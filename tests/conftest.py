@@ -0,0 +1,37 @@
+import importlib
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """
+    Modul app.py tanpa menjalankan halaman Streamlit. projects.db dan files/
+    dibuat relatif ke direktori kerja, jadi import dan semua test yang memakai
+    database aplikasi berjalan di direktori sementara.
+    """
+    workdir = tmp_path_factory.mktemp("app")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        module = importlib.import_module("app")
+        module.init_db()
+        yield module
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def memory_db(app):
+    """Database :memory: dengan skema terbaru (semua migrasi)."""
+    conn = sqlite3.connect(":memory:")
+    app.run_migrations(conn)
+    yield conn
+    conn.close()
@@ -0,0 +1,41 @@
+import datetime
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def delegated_docs(app):
+    # (doc_name, delegated_to, delegated_to_list)
+    cases = [
+        ("FMEA", "SPV A", None),          # list tidak diisi: pakai delegated_to
+        ("PIS", "SPV A", ""),             # string kosong: pakai delegated_to
+        ("ISIR", "SPV A", "[]"),          # list kosong: tidak ada SPV
+        ("DRAWING", "SPV A", '["SPV B"]'),  # list diisi: delegated_to diabaikan
+        ("QCPC", None, '["SPV A", "SPV B"]'),
+    ]
+    with app.db_connection() as conn:
+        project_id = conn.execute("INSERT INTO projects (item, part_no, project, customer) VALUES (?, ?, ?, ?)",
+                                  ("APPROVAL ITEM", "AP-1", "TEST APPROVAL", "CUST")).lastrowid
+        now = datetime.datetime.now().isoformat()
+        for doc_name, delegated_to, delegated_list in cases:
+            conn.execute("INSERT INTO project_documents (project_id, doc_name, delegated_to, delegated_to_list) VALUES (?, ?, ?, ?)",
+                         (project_id, doc_name, delegated_to, delegated_list))
+            conn.execute("INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by) "
+                         "VALUES (?, ?, -1, ?, ?, '1829')", (project_id, doc_name, f"files/{doc_name}.pdf", now))
+        conn.commit()
+    return project_id
+
+
+def _visible_docs(app, project_id, role, user_name):
+    sql, params = app.pending_approval_query(role, user_name, search_query="APPROVAL ITEM")
+    return sorted(row['doc_column'] for row in app.fetchall(sql, params) if row['project_id'] == project_id)
+
+
+def test_spv_delegation_rule_matches_baseline(app, delegated_docs):
+    assert _visible_docs(app, delegated_docs, 'SPV', 'SPV A') == ["FMEA", "PIS", "QCPC"]
+    assert _visible_docs(app, delegated_docs, 'SPV', 'SPV B') == ["DRAWING", "QCPC"]
+
+
+def test_approver_roles_see_everything(app, delegated_docs):
+    assert len(_visible_docs(app, delegated_docs, 'Admin', 'x')) == 5
+    assert _visible_docs(app, delegated_docs, 'Staff', 'SPV A') == []
@@ -0,0 +1,66 @@
+import hashlib
+
+import pytest
+
+
+@pytest.fixture
+def blob(app):
+    """Blob CAS di disk dengan satu referensi yang sudah di-commit."""
+    data = b"isi dokumen cas"
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = app.cas_blob_path(sha256)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    with app.db_connection() as conn:
+        app._cas_add_ref(conn, "files/test/cas_a.pdf", sha256, len(data))
+        conn.commit()
+    yield sha256, path
+    with app.db_connection() as conn:
+        conn.execute("DELETE FROM file_blob_refs WHERE sha256 = ?", (sha256,))
+        conn.execute("DELETE FROM file_blobs WHERE sha256 = ?", (sha256,))
+        conn.commit()
+    path.unlink(missing_ok=True)
+
+
+def _refcount(app, sha256):
+    rows = app.fetchall("SELECT refcount FROM file_blobs WHERE sha256 = ?", (sha256,))
+    return rows[0]['refcount'] if rows else None
+
+
+def test_rollback_keeps_released_blob(app, blob):
+    sha256, path = blob
+    with app.db_connection() as conn:
+        assert app._cas_drop_ref(conn, "files/test/cas_a.pdf") == sha256
+        assert path.exists()
+        conn.rollback()
+    assert path.exists() and _refcount(app, sha256) == 1
+
+
+def test_uncommitted_release_is_discarded_on_close(app, blob):
+    sha256, path = blob
+    with app.db_connection() as conn:
+        app._cas_drop_ref(conn, "files/test/cas_a.pdf")
+    # Koneksi berikutnya dari pool tidak boleh menjalankan callback yang tertinggal
+    with app.db_connection() as conn:
+        conn.execute("UPDATE file_blobs SET size = size WHERE sha256 = ?", (sha256,))
+        conn.commit()
+    assert path.exists() and _refcount(app, sha256) == 1
+
+
+def test_commit_unlinks_released_blob(app, blob):
+    sha256, path = blob
+    with app.db_connection() as conn:
+        app._cas_drop_ref(conn, "files/test/cas_a.pdf")
+        conn.commit()
+    assert not path.exists() and _refcount(app, sha256) is None
+
+
+def test_purge_rechecks_refcount(app, blob):
+    sha256, path = blob
+    with app.db_connection() as conn:
+        app._cas_drop_ref(conn, "files/test/cas_a.pdf")
+        # Referensi baru ke isi yang sama dari transaksi lain sebelum blob dihapus
+        app._cas_add_ref(conn, "files/test/cas_b.pdf", sha256, path.stat().st_size)
+        conn.commit()
+    assert path.exists() and _refcount(app, sha256) == 1
+    assert app.cas_purge_blobs([sha256]) == 0 and path.exists()
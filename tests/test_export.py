@@ -0,0 +1,60 @@
+import csv
+import io
+import os
+import zipfile
+
+import pytest
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def export_entries(tmp_path):
+    def entry(name, size):
+        path = tmp_path / name
+        if size is not None:
+            path.write_bytes(os.urandom(size))
+        return dict(project_id=1, item='ITEM', part_no='PN-1', project='P', customer='C', status='On Progress',
+                    document='FMEA', revision=None, file_name=name, file_path=str(path), archive_path=f"P/FMEA/{name}")
+    # Absolut: resolve_file_path tidak menambahkan root aplikasi
+    return [entry("a.pdf", MB), entry("big.pdf", 3 * MB), entry("hilang.pdf", None),
+            entry("b.pdf", MB), entry("c.pdf", MB)]
+
+
+def _index(volume):
+    with zipfile.ZipFile(volume) as archive:
+        return list(csv.DictReader(io.StringIO(archive.read("index.csv").decode("utf-8-sig"))))
+
+
+def test_export_splits_into_standalone_volumes(app, export_entries):
+    result = app.write_export_archive(export_entries, volume_bytes=2 * MB + 1024)
+    try:
+        assert (result['files'], result['missing']) == (4, 1)
+        members = []
+        for volume in result['volumes']:
+            assert volume.stat().st_size <= 3 * MB + 4096
+            with zipfile.ZipFile(volume) as archive:
+                assert archive.testzip() is None
+                members.append(sorted(n for n in archive.namelist() if n != "index.csv"))
+        # File yang lebih besar dari satu volume mendapat volume sendiri
+        assert members == [["P/FMEA/a.pdf"], ["P/FMEA/big.pdf"], ["P/FMEA/b.pdf", "P/FMEA/c.pdf"]]
+        index = {row['file_name']: row['volume'] for row in _index(result['volumes'][-1])}
+        names = [volume.name for volume in result['volumes']]
+        assert index == {"a.pdf": names[0], "big.pdf": names[1], "hilang.pdf": "", "b.pdf": names[2], "c.pdf": names[2]}
+    finally:
+        for volume in result['volumes']:
+            volume.unlink()
+
+
+def test_single_volume_keeps_plain_name(app, export_entries):
+    result = app.write_export_archive(export_entries[:1])
+    assert len(result['volumes']) == 1 and "_part" not in result['volumes'][0].name
+    result['volumes'][0].unlink()
+
+
+def test_canceled_export_leaves_no_files(app, export_entries):
+    before = set(app.EXPORT_DIR.iterdir()) if app.EXPORT_DIR.exists() else set()
+    result = app.write_export_archive(export_entries, progress_callback=lambda done, total: done >= 2,
+                                      volume_bytes=2 * MB)
+    assert result is None
+    assert set(app.EXPORT_DIR.iterdir()) == before
@@ -0,0 +1,39 @@
+import pytest
+
+
+@pytest.fixture(scope="module")
+def registry(app):
+    return app.DocTypeRegistry(["FMEA PROCESS", "PIS PACKING", "CONTROL PLAN"])
+
+
+def test_benchmark_only_differs_on_shadowed_prefixes(app):
+    result = app.benchmark_filename_parsing(n_files=5000, seed=11)
+    assert result['other_differences'] == 0
+
+
+@pytest.mark.parametrize("filename, expected", [
+    ("FMEA ENGINE BRACKET YHA (062A) BS-062A-2 Rev.0.pdf", ("FMEA", "ENGINE BRACKET YHA (062A)", "BS-062A-2")),
+    ("FMEA CYLINDER LINER RDBSD-N REV.0.pdf", ("FMEA", "CYLINDER LINER", "RDBSD-N")),
+    ("FMEA CASE DIFF REV.1.pdf", ("FMEA", "CASE DIFF", "")),
+    ("fmea process housing pump BS-001A-1.PDF", ("FMEA PROCESS", "housing pump", "BS-001A-1")),
+    ("PIS PACKING COVER REAR.xlsx", ("PIS PACKING", "COVER REAR", "")),
+])
+def test_extract_doc_info(app, registry, filename, expected):
+    info = app.extract_doc_info_from_filename(filename, registry)
+    assert (info['doc_type'], info['part_name'], info['part_number']) == expected
+
+
+def test_unknown_doc_type(app, registry):
+    assert app.extract_doc_info_from_filename("SCAN 0001.pdf", registry) is None
+
+
+def test_same_as_linear_parser_without_shadowing(app):
+    # Tanpa jenis dokumen yang saling menjadi awalan, hasil regex = pencocokan linear lama
+    registry = app.DocTypeRegistry(["CHECK SHEET", "WORK INSTRUCTION"])
+    names = [name for name in registry.names
+             if not any(other != name and name.upper().startswith(other.upper()) for other in registry.names)]
+    for doc in names:
+        for rest in ["ENGINE BRACKET BS-062A-2 Rev.0", "CASE DIFF", "GEAR Y4L 12-345X-1 REV 3"]:
+            filename = f"{doc} {rest}.pdf"
+            assert (app.extract_doc_info_from_filename(filename, registry)
+                    == app._extract_doc_info_linear(filename, registry.names))
@@ -0,0 +1,112 @@
+import datetime
+import hashlib
+import io
+import json
+import time
+
+import pytest
+
+
+def _insert_job(app, status='queued', kind='test', params=None):
+    with app.db_connection() as conn:
+        job_id = conn.execute(
+            "INSERT INTO jobs (kind, status, created_by, created_at, total, params) VALUES (?, ?, '1829', ?, 1, ?)",
+            (kind, status, datetime.datetime.now().isoformat(), json.dumps(params or {}))
+        ).lastrowid
+        conn.execute("INSERT INTO job_items (job_id, seq, file_name) VALUES (?, 0, 'a.pdf')", (job_id,))
+        conn.commit()
+    return job_id
+
+
+def _job(app, job_id):
+    return app.fetchall("SELECT * FROM jobs WHERE id = ?", (job_id,))[0]
+
+
+@pytest.fixture
+def queue(app):
+    # Tanpa thread worker: test memanggil claim/_execute langsung
+    yield app.JobQueue({}, workers=0)
+    with app.db_connection() as conn:
+        conn.execute("UPDATE jobs SET status = 'done' WHERE status IN ('queued', 'running')")
+        conn.commit()
+
+
+def test_claim_sets_owner_token(app, queue):
+    job_id = _insert_job(app)
+    job = queue.claim()
+    assert job['id'] == job_id and job['token']
+    assert _job(app, job_id)['claim_token'] == job['token'] and _job(app, job_id)['status'] == 'running'
+    assert queue.owns(job)
+
+
+def test_stale_job_moves_to_new_owner(app, queue):
+    job_id = _insert_job(app)
+    old = queue.claim()
+    with app.db_connection() as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - app.JOB_STALE_SECONDS - 1, job_id))
+        conn.commit()
+    new = app.JobQueue({}, workers=0).claim()
+    assert new['id'] == job_id and new['token'] != old['token']
+    with pytest.raises(app.JobOwnershipLost):
+        queue.update_item(old, 0, status='uploaded')
+    assert app.fetchall("SELECT status FROM job_items WHERE job_id = ?", (job_id,))[0]['status'] == 'queued'
+    queue.update_item(new, 0, status='uploaded')
+    assert _job(app, job_id)['processed'] == 1
+
+
+def test_final_status_and_audit_share_transaction(app, queue):
+    def handler(job_queue, job):
+        job['audit'].append((job['created_by'], "test job selesai", {"job_id": job['id']}))
+        return 'done'
+    queue.handlers['test'] = handler
+    job_id = _insert_job(app)
+    queue._execute(queue.claim())
+    job = _job(app, job_id)
+    assert job['status'] == 'done' and job['claim_token'] is None
+    # Tanpa flush_audit_log: event sudah tersimpan bersama status akhir
+    logs = app.fetchall("SELECT details FROM audit_logs WHERE action = 'test job selesai'")
+    assert [json.loads(row['details'])['job_id'] for row in logs] == [job_id]
+
+
+def test_lost_job_does_not_write_final_status(app, queue):
+    def handler(job_queue, job):
+        with app.db_connection() as conn:
+            conn.execute("UPDATE jobs SET claim_token = 'other-worker' WHERE id = ?", (job['id'],))
+            conn.commit()
+        job_queue.update_item(job, 0, status='uploaded')
+        return 'done'
+    queue.handlers['test'] = handler
+    job_id = _insert_job(app)
+    queue._execute(queue.claim())
+    job = _job(app, job_id)
+    assert job['status'] == 'running' and job['claim_token'] == 'other-worker'
+    assert queue.stats()['lost'] == 1
+
+
+def test_resume_reuses_committed_upload(app, queue, monkeypatch):
+    data = b"%PDF-resume"
+    with app.db_connection() as conn:
+        project_id = conn.execute("INSERT INTO projects (item, part_no, project, customer) VALUES (?, ?, ?, ?)",
+                                  ("GEAR SHAFT RESUME", "KV-321A-4", "TEST JOB", "CUST")).lastrowid
+        conn.commit()
+    job_id = _insert_job(app, kind='auto_upload')
+    job = queue.claim()
+    # Proses sebelumnya mati setelah upload di-commit, item masih 'processing'
+    with app.db_connection() as conn:
+        conn.execute("UPDATE job_items SET file_name = ?, status = 'processing' WHERE job_id = ?",
+                     ("FMEA GEAR SHAFT RESUME KV-321A-4 Rev.0.pdf", job_id))
+        conn.execute(
+            "INSERT INTO revision_history (project_id, doc_column, revision_number, file_path, timestamp, uploaded_by, "
+            "upload_source, file_sha256) VALUES (?, 'FMEA', -1, 'files/resume.pdf', ?, '1829', 'auto_upload', ?)",
+            (project_id, datetime.datetime.now().isoformat(), hashlib.sha256(data).hexdigest())
+        )
+        conn.commit()
+
+    def fail_upload(*args, **kwargs):
+        raise AssertionError("upload tidak boleh diulang")
+    monkeypatch.setattr(app, 'auto_upload_document', fail_upload)
+
+    canceled = app._run_auto_upload_items(queue, job, app._pending_job_items(job_id), lambda entry: io.BytesIO(data))
+    assert canceled is False
+    item = app.fetchall("SELECT status, project_id, file_path FROM job_items WHERE job_id = ?", (job_id,))[0]
+    assert item == {'status': 'pending_approval', 'project_id': project_id, 'file_path': 'files/resume.pdf'}
@@ -0,0 +1,50 @@
+import sqlite3
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index', 'trigger')")}
+
+
+def test_migrations_apply_in_order_on_empty_db(app):
+    conn = sqlite3.connect(":memory:")
+    applied = app.run_migrations(conn)
+    assert applied == [version for version, _ in app.MIGRATIONS]
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == app.SCHEMA_VERSION
+    assert {'projects', 'project_documents', 'revision_history', 'data_version', 'jobs', 'job_items',
+            'upload_aliases', 'idx_projects_part_no_key'} <= _tables(conn)
+
+
+def test_migrations_are_idempotent(memory_db, app):
+    schema = sorted(memory_db.execute("SELECT type, name, sql FROM sqlite_master").fetchall())
+    assert app.run_migrations(memory_db) == []
+    assert sorted(memory_db.execute("SELECT type, name, sql FROM sqlite_master").fetchall()) == schema
+
+
+def test_upgrade_from_older_version_keeps_data(app):
+    # Database yang berhenti di migrasi 9 (sebelum part_no_key), lalu di-upgrade
+    conn = sqlite3.connect(":memory:")
+    for version, migrate in app.MIGRATIONS:
+        if version > 9:
+            break
+        migrate(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+    conn.executemany("INSERT INTO projects (id, item, part_no, project, customer) VALUES (?, ?, ?, ?, ?)",
+                     [(1, "ENGINE BRACKET", "bs-062a-2", "P1", "C1"), (2, "CASE DIFF", None, "P2", "C2")])
+    conn.commit()
+
+    assert app.run_migrations(conn) == [version for version, _ in app.MIGRATIONS if version > 9]
+    rows = conn.execute("SELECT id, item, part_no, part_no_key FROM projects ORDER BY id").fetchall()
+    assert rows == [(1, "ENGINE BRACKET", "bs-062a-2", "BS062A2"), (2, "CASE DIFF", None, None)]
+    job_columns = {info[1] for info in conn.execute("PRAGMA table_info(jobs)")}
+    assert {'claim_token', 'result'} <= job_columns
+
+
+def test_data_version_counts_writes(memory_db):
+    def version(table):
+        row = memory_db.execute("SELECT version FROM data_version WHERE table_name = ?", (table,)).fetchone()
+        return row[0] if row else 0
+
+    before = version('projects')
+    memory_db.execute("INSERT INTO projects (id, item, part_no) VALUES (1, 'A', 'B')")
+    memory_db.execute("UPDATE projects SET item = 'C' WHERE id = 1")
+    assert version('projects') > before
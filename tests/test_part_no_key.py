@@ -0,0 +1,34 @@
+import pytest
+
+PART_NUMBERS = [
+    "BS-062A-2", "bs 062a 2", "BS062A2", "RD_12.5/7", "  kv-001x-9  ", "55311-0W010", "A-B_C.D/E F",
+    "", "   ", "-", None, "12", "ÇX-1",
+]
+
+
+@pytest.mark.parametrize("part_no", PART_NUMBERS)
+def test_sql_expression_matches_python(memory_db, app, part_no):
+    sql_key = memory_db.execute(f"SELECT {app.part_no_key_sql('?')}", (part_no,)).fetchone()[0]
+    assert sql_key == app.part_no_key(part_no)
+
+
+def test_triggers_keep_column_in_sync(memory_db, app):
+    memory_db.execute("INSERT INTO projects (id, item, part_no) VALUES (1, 'ITEM', 'bs-062a-2')")
+    memory_db.execute("INSERT INTO projects (id, item, part_no) VALUES (2, 'ITEM', NULL)")
+    memory_db.execute("UPDATE projects SET part_no = 'rd 12 5' WHERE id = 2")
+    rows = memory_db.execute("SELECT id, part_no, part_no_key FROM projects ORDER BY id").fetchall()
+    assert [(pid, key) for pid, _, key in rows] == [(pid, app.part_no_key(part_no)) for pid, part_no, _ in rows]
+
+
+def test_lookup_uses_index(memory_db, app):
+    plan = app.explain_query_plan(memory_db, app.PART_NO_KEY_LOOKUP_SQL, ("BS062A2",))
+    assert any('idx_projects_part_no_key' in detail for detail in plan)
+
+
+def test_find_matching_project_fast_path(app):
+    with app.db_connection() as conn:
+        conn.execute("INSERT INTO projects (item, part_no, project, customer) VALUES (?, ?, ?, ?)",
+                     ("FLANGE YOKE", "KV-777N-3", "TEST KEY", "CUST"))
+        conn.commit()
+    match = app.find_matching_project("FLANGE YOKE", "kv 777n 3")
+    assert match['part_no'] == "KV-777N-3" and match['matched_by'] == 'part_no_key'
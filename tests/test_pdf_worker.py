@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+pdf_worker = pytest.importorskip("pdf_worker")
+
+
+class FakeProcessPool:
+    """Pengganti ProcessPoolExecutor: probe submit(int, 0) menunggu future yang dikendalikan test."""
+    submitted = None
+
+    def __init__(self, *args, **kwargs):
+        self.probe = Future()
+        self.closed = False
+
+    def submit(self, fn, *args):
+        self.submitted.set()
+        return self.probe
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    created = []
+    submitted = threading.Event()
+
+    def factory(*args, **kwargs):
+        created.append(FakeProcessPool())
+        created[-1].submitted = submitted
+        return created[-1]
+
+    monkeypatch.setattr(pdf_worker, "ProcessPoolExecutor", factory)
+    yield created, submitted
+
+
+def _executor_in_thread(pool):
+    result = {}
+    worker = threading.Thread(target=lambda: result.setdefault('executor', pool.executor))
+    worker.start()
+    return worker, result
+
+
+def test_probe_runs_outside_lock(fake_pool):
+    fake_pool, submitted = fake_pool
+    pool = pdf_worker.PdfRenderPool(2)
+    worker, result = _executor_in_thread(pool)
+    assert submitted.wait(5)
+    # Selama probe berjalan, lock tidak dipegang
+    assert pool._lock.acquire(timeout=1)
+    pool._lock.release()
+    fake_pool[0].probe.set_result(0)
+    worker.join(5)
+    assert result['executor'] is fake_pool[0] and pool.mode == 'process'
+
+
+def test_failed_probe_falls_back_to_threads(fake_pool):
+    fake_pool, submitted = fake_pool
+    pool = pdf_worker.PdfRenderPool(2)
+    worker, result = _executor_in_thread(pool)
+    assert submitted.wait(5)
+    fake_pool[0].probe.set_exception(OSError("no workers"))
+    worker.join(5)
+    assert isinstance(result['executor'], ThreadPoolExecutor) and pool.mode == 'thread'
+    assert fake_pool[0].closed
+    # reset() tidak mencoba process pool lagi
+    pool.reset()
+    assert isinstance(pool.executor, ThreadPoolExecutor) and len(fake_pool) == 1
+    pool.shutdown()
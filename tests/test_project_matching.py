@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def projects():
+    rng = random.Random(7)
+    words = ["ENGINE", "BRACKET", "CYLINDER", "LINER", "CASE", "DIFF", "CARRIER", "REAR", "FRONT", "COVER", "GEAR"]
+    rows = []
+    for i in range(1, 401):
+        item = " ".join(rng.sample(words, rng.randint(1, 4)))
+        part_no = f"{rng.choice(['BS', 'RD', 'KV'])}-{rng.randrange(1000):03d}{rng.choice('ABX')}-{rng.randrange(10)}"
+        rows.append((i, item, part_no if rng.random() < 0.8 else None, f"PROJECT {i % 9}", f"CUST {i % 4}"))
+    return rows
+
+
+def test_benchmark_reports_identical_output(app):
+    result = app.benchmark_project_matching(n_projects=1000, n_queries=20, seed=3)
+    assert result['identical_output'] is True
+
+
+@pytest.mark.parametrize("min_similarity", [60, 80, 95])
+def test_index_candidates_keep_every_scan_match(app, projects, min_similarity):
+    index = app.ProjectMatchIndex(projects)
+    rng = random.Random(min_similarity)
+    queries = [(item, part_no or "") for _, item, part_no, _, _ in rng.sample(projects, 25)]
+    queries += [(item[:-1] + "X", (part_no or "").replace("-", " ")) for _, item, part_no, _, _ in rng.sample(projects, 25)]
+    queries += [("UNKNOWN PART", "ZZ-1"), ("", ""), ("GEAR", "")]
+    for part_name, part_number in queries:
+        expected = app._match_projects_scan(projects, part_name, part_number, min_similarity)
+        pool = index.candidates(part_name, part_number, min_similarity)
+        assert app._match_projects_scan(pool, part_name, part_number, min_similarity) == expected
+
+
+def test_find_matching_project_sees_new_projects(app):
+    with app.db_connection() as conn:
+        conn.execute("INSERT INTO projects (item, part_no, project, customer) VALUES (?, ?, ?, ?)",
+                     ("HOUSING PUMP LOWER", None, "TEST MATCH", "CUST"))
+        conn.commit()
+    match = app.find_matching_project("HOUSING PUMP LOWER", "")
+    assert match is not None and match['item'] == "HOUSING PUMP LOWER" and match['matched_by'] == 'fuzzy'
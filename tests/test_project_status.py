@@ -0,0 +1,35 @@
+import threading
+
+
+def _project_with_docs(app, missing=()):
+    names = app.get_doc_registry().names
+    with app.db_connection() as conn:
+        project_id = conn.execute("INSERT INTO projects (item, part_no, project, customer, status) VALUES (?, ?, ?, ?, ?)",
+                                  ("STATUS ITEM", "ST-1", "TEST STATUS", "CUST", "On Progress")).lastrowid
+        conn.executemany("INSERT INTO project_documents (project_id, doc_name, has_file) VALUES (?, ?, ?)",
+                         [(project_id, name, int(name not in missing)) for name in names])
+        conn.commit()
+    return project_id
+
+
+def _status(app, project_id):
+    return app.fetchall("SELECT status FROM projects WHERE id = ?", (project_id,))[0]['status']
+
+
+def test_incomplete_project_keeps_status(app):
+    project_id = _project_with_docs(app, missing=app.get_doc_registry().names[:1])
+    assert app.update_project_status_if_complete(project_id, '1829') is False
+    assert _status(app, project_id) == "On Progress"
+
+
+def test_complete_project_becomes_done_from_worker_thread(app):
+    # Dipanggil dari thread tanpa ScriptRunContext seperti worker JobQueue
+    project_id = _project_with_docs(app)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(app.update_project_status_if_complete(project_id, '1829')))
+    worker.start()
+    worker.join()
+    assert results == [True]
+    assert _status(app, project_id) == "Done"
+    # Sudah Done: tidak diubah atau dicatat lagi
+    assert app.update_project_status_if_complete(project_id, '1829') is False
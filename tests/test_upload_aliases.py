@@ -0,0 +1,58 @@
+import pytest
+
+
+@pytest.fixture
+def aliased_db(memory_db, app):
+    memory_db.executemany("INSERT INTO projects (id, item, part_no, status) VALUES (?, ?, ?, ?)",
+                          [(1, "ENGINE BRACKET", "BS-062A-2", "On Progress"), (2, "CASE DIFF", None, "On Progress")])
+    app.record_upload_aliases(memory_db, [
+        (*app.upload_alias_key("engine  bracket", "bs 062a 2"), "FMEA", 1),
+        (*app.upload_alias_key("CASE DIFF", ""), "FMEA", 2),
+    ], "1829")
+    memory_db.commit()
+    return memory_db
+
+
+def _aliases(conn):
+    return conn.execute("SELECT part_name_key, part_no_key, project_id, confirmations FROM upload_aliases "
+                        "ORDER BY project_id").fetchall()
+
+
+def test_alias_key_is_normalized(app):
+    assert app.upload_alias_key(" engine  bracket ", "bs-062a-2") == ("ENGINE BRACKET", "BS062A2")
+    assert app.upload_alias_key("CASE DIFF", "") == ("CASE DIFF", "")
+
+
+def test_confirmations_count_per_project(aliased_db, app):
+    key = app.upload_alias_key("ENGINE BRACKET", "BS-062A-2")
+    app.record_upload_aliases(aliased_db, [(*key, "FMEA", 1)], "1829")
+    assert _aliases(aliased_db)[0] == ("ENGINE BRACKET", "BS062A2", 1, 2)
+    # Dikonfirmasi ke proyek lain: alias pindah dan hitungan mulai dari 1
+    app.record_upload_aliases(aliased_db, [(*key, "FMEA", 2)], "1829")
+    assert ("ENGINE BRACKET", "BS062A2", 2, 1) in _aliases(aliased_db)
+
+
+def test_unrelated_update_keeps_alias(aliased_db):
+    aliased_db.execute("UPDATE projects SET status = 'Done', item = item WHERE id = 1")
+    assert len(_aliases(aliased_db)) == 2
+
+
+@pytest.mark.parametrize("change", [
+    "UPDATE projects SET item = 'ENGINE BRACKET RH' WHERE id = 1",
+    "UPDATE projects SET part_no = 'BS-062A-3' WHERE id = 1",
+    "DELETE FROM projects WHERE id = 1",
+])
+def test_project_change_drops_alias(aliased_db, change):
+    aliased_db.execute(change)
+    assert [row[2] for row in _aliases(aliased_db)] == [2]
+
+
+def test_find_matching_project_prefers_alias(app):
+    with app.db_connection() as conn:
+        project_id = conn.execute("INSERT INTO projects (item, part_no, project, customer) VALUES (?, ?, ?, ?)",
+                                  ("DRUM BRAKE LH", "RD-555C-1", "TEST ALIAS", "CUST")).lastrowid
+        app.record_upload_aliases(conn, [(*app.upload_alias_key("OLD DRUM NAME", "X-1"), "FMEA", project_id)], "1829")
+        conn.commit()
+    match = app.find_matching_project("old drum name", "x 1", doc_type="FMEA")
+    assert match['project_id'] == project_id and match['matched_by'] == 'alias'
+    assert app.find_matching_project("old drum name", "x 1", doc_type="PIS") is None